@@ -1,12 +1,24 @@
-import pandas as pd
+import numpy as np
 import os
 import sys
 
+from config import get_data_dir
+from data_store import has_cleaned_data
+from instrumentation import instrumented, stage
+from report_engine import ReportEngine
+
 # File Path
-data_dir = r"c:\Users\tim01\Desktop\TTC"
-cleaned_file = os.path.join(data_dir, "TTC_Subway_Delay_Data_Combined_Cleaned.csv")
+data_dir = get_data_dir()
+
+def _sum_count(engine, dim):
+    """engine 彙總 -> 舊報表格式 (sum / count 欄位)"""
+    stats = engine.aggregate([dim])[["Total Delay", "Incidents"]]
+    stats.columns = ["sum", "count"]
+    return stats
+
 
-def analyze():
+@instrumented("analyze")
+def analyze(engine=None):
     # Write directly to file to avoid encoding issues with shell redirection
     output_path = os.path.join(data_dir, "analysis_results.txt")
     with open(output_path, 'w', encoding='utf-8') as f:
@@ -14,22 +26,18 @@ def analyze():
         sys.stdout = f
 
         print("Loading data...")
-        if not os.path.exists(cleaned_file):
-            print("Cleaned file not found!")
-            return
-
-        try:
-            df = pd.read_csv(cleaned_file, encoding='utf-8')
-        except UnicodeDecodeError:
-            # Fallback if file was somehow saved with default encoding
-            df = pd.read_csv(cleaned_file, encoding='cp1252')
-        df['Date'] = pd.to_datetime(df['Date'])
-        
-        # Ensure Min Delay is numeric
-        df['Min Delay'] = pd.to_numeric(df['Min Delay'], errors='coerce').fillna(0)
-
-        print(f"\nData Loaded. Total Rows: {len(df)}")
-        print(f"Total Delay Minutes: {df['Min Delay'].sum()}")
+        if engine is None:
+            if not has_cleaned_data():
+                print("Cleaned file not found!")
+                return
+            # Typed columns + derived features (Month, DayOfWeek, peak flags) come from the shared loader
+            engine = ReportEngine()
+
+        with stage("analyze.load") as rec:
+            totals = engine.totals()
+            rec["rows_out"] = int(totals["Incidents"])
+        print(f"\nData Loaded. Total Rows: {totals['Incidents']}")
+        print(f"Total Delay Minutes: {totals['Total Delay']}")
 
         # ==========================================
         # 1. Time Dimension
@@ -38,41 +46,25 @@ def analyze():
         print("1. TIME DIMENSION ANALYSIS")
         print("="*40)
 
-        # A. Monthly
-        df['Month'] = df['Date'].dt.to_period('M')
-        monthly = df.groupby('Month')['Min Delay'].agg(['sum', 'count']).sort_values('sum', ascending=False)
-        print("\n[Worst Months by Total Delay Minutes]")
-        print(monthly.head(5))
-
-        # B. Daily (Day of Week)
-        # Ensure Day column is consistent or re-derive
-        df['DayOfWeek'] = df['Date'].dt.day_name()
-        daily = df.groupby('DayOfWeek')['Min Delay'].agg(['sum', 'count']).sort_values('sum', ascending=False)
-        print("\n[Worst Days of Week by Total Delay Minutes]")
-        print(daily)
-
-        # C. Peak vs Off-Peak
-        # Peak: Mon-Fri, 06:00-09:00 & 15:00-19:00
-        # Parse Time
-        def is_peak(row):
-            day = row['DayOfWeek']
-            if day in ['Saturday', 'Sunday']:
-                return 'Off-Peak'
-            
-            try:
-                # Time format HH:MM
-                h = int(str(row['Time']).split(':')[0])
-                if (6 <= h < 9) or (15 <= h < 19):
-                    return 'Peak'
-            except:
-                pass # Invalid time parsing
-                
-            return 'Off-Peak'
-
-        df['Period'] = df.apply(is_peak, axis=1)
-        peak_stats = df.groupby('Period')['Min Delay'].agg(['sum', 'count', 'mean'])
-        print("\n[Peak vs Off-Peak Stats]")
-        print(peak_stats)
+        with stage("analyze.time"):
+            # A. Monthly
+            monthly = _sum_count(engine, 'Month').sort_values('sum', ascending=False)
+            print("\n[Worst Months by Total Delay Minutes]")
+            print(monthly.head(5))
+
+            # B. Daily (Day of Week)
+            daily = _sum_count(engine, 'DayOfWeek').sort_values('sum', ascending=False)
+            print("\n[Worst Days of Week by Total Delay Minutes]")
+            print(daily)
+
+            # C. Peak vs Off-Peak
+            # Peak: Mon-Fri, 06:00-09:00 & 15:00-19:00
+            peak_stats = _sum_count(engine, 'Is Weekday Rush')
+            peak_stats['mean'] = peak_stats['sum'] / peak_stats['count']
+            peak_stats.index = np.where(peak_stats.index, 'Peak', 'Off-Peak')
+            peak_stats.index.name = 'Period'
+            print("\n[Peak vs Off-Peak Stats]")
+            print(peak_stats.sort_index())
 
 
         # ==========================================
@@ -82,10 +74,11 @@ def analyze():
         print("2. SPATIAL DIMENSION ANALYSIS")
         print("="*40)
 
-        # Group by Line
-        line_stats = df.groupby('Line')['Min Delay'].agg(['sum', 'count']).sort_values('sum', ascending=False)
-        print("\n[Delays by Subway Line]")
-        print(line_stats)
+        with stage("analyze.spatial"):
+            # Group by Line
+            line_stats = _sum_count(engine, 'Line').sort_values('sum', ascending=False)
+            print("\n[Delays by Subway Line]")
+            print(line_stats)
 
 
         # ==========================================
@@ -95,15 +88,18 @@ def analyze():
         print("3. CAUSE ANALYSIS")
         print("="*40)
 
-        # Top 10 by Frequency
-        print("\n[Top 10 Causes by FREQUENCY (Count)]")
-        top_freq = df['Code Description'].value_counts().head(10)
-        print(top_freq)
+        with stage("analyze.causes"):
+            causes = _sum_count(engine, 'Code Description')
+
+            # Top 10 by Frequency
+            print("\n[Top 10 Causes by FREQUENCY (Count)]")
+            top_freq = causes['count'].sort_values(ascending=False).head(10)
+            print(top_freq)
 
-        # Top 10 by Duration
-        print("\n[Top 10 Causes by DURATION (Total Minutes)]")
-        top_dur = df.groupby('Code Description')['Min Delay'].sum().sort_values(ascending=False).head(10)
-        print(top_dur)
+            # Top 10 by Duration
+            print("\n[Top 10 Causes by DURATION (Total Minutes)]")
+            top_dur = causes['sum'].rename('Min Delay').sort_values(ascending=False).head(10)
+            print(top_dur)
     
     # Reset stdout
     sys.stdout = sys.__stdout__
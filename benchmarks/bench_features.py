@@ -0,0 +1,149 @@
+"""
+向量化特徵 vs. 舊版逐列 apply 的效能比較
+
+用法:
+    python benchmarks/bench_features.py            # 1x, 10x, 100x 原始資料列數
+    python benchmarks/bench_features.py 1 10       # 自訂倍數
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import clean_data  # noqa: E402
+from features import (  # noqa: E402
+    WEEKDAY_PEAK_WINDOWS,
+    extract_hour,
+    is_weekday,
+    map_code_descriptions,
+    peak_mask,
+    peak_weight,
+    valid_station_mask,
+)
+
+EXCLUDE_KEYWORDS = [
+    'APPROACHING', ' TO ', 'BUILDING', 'TRACK LEVEL',
+    'CENTRE TRACK', 'TAIL TRACK', 'CROSSOVER',
+    'YARD', 'LOOP', 'SIDING', 'POCKET'
+]
+
+
+# ---------- 舊版逐列實作 (僅供比較) ----------
+
+def legacy_is_peak_hour(time_str):
+    try:
+        h = int(str(time_str).split(":")[0])
+        if (7 <= h < 9) or (16 <= h < 19):
+            return True
+    except:
+        pass
+    return False
+
+
+def legacy_get_code_desc(code, mapping):
+    if pd.isna(code) or code == "nan" or code == "":
+        return "Unknown Code"
+    code = str(code).strip()
+    if code in mapping:
+        return mapping[code]
+    prefix = code[:2]
+    prefix_map = {
+        "MU": "Miscellaneous / Transportation",
+        "TU": "Track / Signal",
+        "PU": "Plant / Equipment",
+        "EU": "Equipment",
+        "SU": "Subway Service",
+        "ER": "SRT Equipment",
+    }
+    if prefix in prefix_map:
+        return f"{prefix_map[prefix]} - Unknown Subcode"
+    return "Unknown Code"
+
+
+def legacy_is_peak(row):
+    if row['DayOfWeek'] in ['Saturday', 'Sunday']:
+        return 'Off-Peak'
+    try:
+        h = int(str(row['Time']).split(':')[0])
+        if (6 <= h < 9) or (15 <= h < 19):
+            return 'Peak'
+    except:
+        pass
+    return 'Off-Peak'
+
+
+def legacy_is_valid_station(name):
+    upper = str(name).upper()
+    for keyword in EXCLUDE_KEYWORDS:
+        if keyword in upper:
+            return False
+    return True
+
+
+# ---------- Benchmark ----------
+
+def load_raw():
+    frames = [clean_data.read_source(f) for f in clean_data.find_data_files()]
+    df = pd.concat(frames, ignore_index=True)
+    df["Date"] = pd.to_datetime(df["Date"])
+    df["Code"] = df["Code"].astype(str).str.strip().str.upper()
+    df["DayOfWeek"] = df["Date"].dt.day_name()
+    return df
+
+
+def cases(code_map):
+    """(名稱, 舊版, 向量化)"""
+    return [
+        ("Is Peak Hour",
+         lambda d: d["Time"].apply(legacy_is_peak_hour),
+         lambda d: peak_mask(extract_hour(d["Time"]))),
+        ("Code Description",
+         lambda d: d["Code"].apply(lambda c: legacy_get_code_desc(c, code_map)),
+         lambda d: map_code_descriptions(d["Code"], code_map)),
+        ("Weekday Period",
+         lambda d: d.apply(legacy_is_peak, axis=1),
+         lambda d: np.where(peak_mask(extract_hour(d["Time"]), WEEKDAY_PEAK_WINDOWS,
+                                      weekday=is_weekday(d["Date"])), "Peak", "Off-Peak")),
+        ("Hour",
+         lambda d: d["Time"].apply(lambda x: int(str(x).split(":")[0]) if pd.notna(x) else 0),
+         lambda d: extract_hour(d["Time"])),
+        ("Peak Weight",
+         lambda d: d["Is Peak Hour"].apply(lambda x: 1.5 if x else 1.0),
+         lambda d: peak_weight(d["Is Peak Hour"])),
+        ("Valid Station",
+         lambda d: d["Station"].apply(legacy_is_valid_station),
+         lambda d: valid_station_mask(d["Station"], EXCLUDE_KEYWORDS)),
+    ]
+
+
+def timed(fn, df):
+    start = time.perf_counter()
+    fn(df)
+    return time.perf_counter() - start
+
+
+def main(scales):
+    print("Loading raw source files...")
+    raw = load_raw()
+    raw["Is Peak Hour"] = peak_mask(extract_hour(raw["Time"]))
+    code_map = clean_data.load_codes()
+    print(f"Base rows: {len(raw)}\n")
+
+    print(f"{'Feature':<18}{'Scale':>6}{'Rows':>11}{'Row-wise (s)':>15}{'Vectorized (s)':>17}{'Speedup':>10}")
+    print("-" * 77)
+    for scale in scales:
+        df = pd.concat([raw] * scale, ignore_index=True)
+        for name, legacy, vectorized in cases(code_map):
+            t_old = timed(legacy, df)
+            t_new = timed(vectorized, df)
+            print(f"{name:<18}{scale:>5}x{len(df):>11,}{t_old:>15.3f}{t_new:>17.4f}{t_old / t_new:>9.0f}x")
+        print("-" * 77)
+
+
+if __name__ == "__main__":
+    main([int(a) for a in sys.argv[1:]] or [1, 10, 100])
@@ -0,0 +1,206 @@
+"""
+整條流程在不同資料量下的效能基準 (牆鐘時間 + 峰值記憶體)
+
+對每個列數先用 synthetic_data 產生合成原始檔，再把每個階段放在獨立的子行程中執行
+(clean_and_merge -> calculate_metrics -> interactive_charts.main)，
+峰值記憶體才不會被前一個階段影響；子行程以環境變數 TTC_DATA_DIR 指向合成資料夾。報表階段開始前清掉 memo_cache，量到的是冷啟動。
+結果存成 benchmarks/results/pipeline-<時間>-<commit>.json，可用 --compare 比較兩次結果。
+
+用法:
+    python benchmarks/bench_pipeline.py                        # 100k, 1M, 10M 列
+    python benchmarks/bench_pipeline.py --rows 100000 --stages clean metrics
+    python benchmarks/bench_pipeline.py --compare old.json new.json
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+bench_dir = os.path.dirname(os.path.abspath(__file__))
+repo_dir = os.path.dirname(bench_dir)
+sys.path.insert(0, repo_dir)
+sys.path.insert(0, bench_dir)
+
+from config import DATA_DIR_ENV  # noqa: E402
+from instrumentation import peak_rss_mb  # noqa: E402
+
+results_dir = os.path.join(bench_dir, "results")
+default_work_dir = os.path.join(tempfile.gettempdir(), "ttc_bench")
+
+DEFAULT_ROWS = [100_000, 1_000_000, 10_000_000]
+STAGES = ["clean", "metrics", "charts"]
+
+
+# ---------- 子行程：執行單一階段 ----------
+
+def run_clean():
+    import clean_data
+    import data_store
+    clean_data.clean_and_merge()
+    return sum(p["rows"] for p in data_store.load_manifest()["partitions"].values())
+
+
+def run_metrics():
+    import advanced_metrics
+    advanced_metrics.calculate_metrics()
+
+
+def run_charts():
+    import interactive_charts
+    os.makedirs(interactive_charts.output_dir, exist_ok=True)
+    interactive_charts.main()
+
+
+STAGE_FUNCTIONS = {"clean": run_clean, "metrics": run_metrics, "charts": run_charts}
+
+
+def run_stage(stage):
+    """子行程以 TTC_DATA_DIR 指向合成資料夾，各模組 import 時就讀到該路徑"""
+    baseline = peak_rss_mb()
+    start = time.perf_counter()
+    with open(os.devnull, "w", encoding="utf-8") as sink, contextlib.redirect_stdout(sink):
+        rows = STAGE_FUNCTIONS[stage]()
+    result = {
+        "stage": stage,
+        "seconds": round(time.perf_counter() - start, 3),
+        "peak_mb": peak_rss_mb(),
+        "baseline_mb": baseline,
+    }
+    if rows is not None:
+        result["cleaned_rows"] = int(rows)
+    print(json.dumps(result))
+
+
+# ---------- 主行程 ----------
+
+def _git_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=repo_dir,
+                             capture_output=True, text=True, check=True)
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _environment():
+    import numpy
+    import pandas
+    env = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "pandas": pandas.__version__,
+        "numpy": numpy.__version__,
+    }
+    try:
+        import pyarrow
+        env["pyarrow"] = pyarrow.__version__
+    except ImportError:
+        env["pyarrow"] = None
+    return env
+
+
+def prepare_dataset(rows, work_dir, seed, regenerate, profile):
+    """合成資料依 (列數, seed) 放在各自的資料夾；已存在時沿用 (相同輸入才能跨版本比較)"""
+    import synthetic_data
+    out_dir = os.path.join(work_dir, f"rows-{rows}-seed-{seed}")
+    done_marker = os.path.join(out_dir, ".generated")
+    if regenerate or not os.path.exists(done_marker):
+        shutil.rmtree(out_dir, ignore_errors=True)
+        start = time.perf_counter()
+        if profile[0] is None:
+            profile[0] = synthetic_data.load_profile()
+        synthetic_data.make_dataset(rows, out_dir, seed=seed, profile=profile[0])
+        open(done_marker, "w").close()
+        print(f"  generated {rows:,} rows in {time.perf_counter() - start:.1f}s -> {out_dir}")
+    return out_dir
+
+
+def bench(rows_list, stages, work_dir, seed=0, regenerate=False):
+    results = {
+        "commit": _git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "environment": _environment(),
+        "seed": seed,
+        "runs": [],
+    }
+    profile = [None]
+    for rows in rows_list:
+        print(f"\n[{rows:,} rows]")
+        data_dir = prepare_dataset(rows, work_dir, seed, regenerate, profile)
+        run = {"rows": rows, "stages": {}}
+        for stage in stages:
+            if stage != "clean":
+                shutil.rmtree(os.path.join(data_dir, "memo_cache"), ignore_errors=True)
+            proc = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--stage", stage],
+                cwd=data_dir, env={**os.environ, DATA_DIR_ENV: data_dir}, capture_output=True, text=True,
+            )
+            if proc.returncode != 0:
+                print(f"  {stage:<8} FAILED\n{proc.stderr[-2000:]}")
+                run["stages"][stage] = {"error": proc.stderr[-2000:]}
+                continue
+            result = json.loads(proc.stdout.strip().splitlines()[-1])
+            run["stages"][stage] = result
+            if "cleaned_rows" in result:
+                run["cleaned_rows"] = result["cleaned_rows"]
+            peak = f"{result['peak_mb']:.0f} MB" if result["peak_mb"] is not None else "n/a"
+            print(f"  {stage:<8} {result['seconds']:>9.2f}s   peak {peak}")
+        results["runs"].append(run)
+    return results
+
+
+def save_results(results):
+    os.makedirs(results_dir, exist_ok=True)
+    stamp = results["timestamp"].replace(":", "").replace("-", "")
+    path = os.path.join(results_dir, f"pipeline-{stamp}-{results['commit'] or 'nogit'}.json")
+    with open(path, "w", encoding="utf-8") as fh:
+        json.dump(results, fh, indent=2)
+    return path
+
+
+def compare(old_path, new_path):
+    """兩次結果逐 (列數, 階段) 比較時間與峰值記憶體 (new / old)"""
+    with open(old_path, "r", encoding="utf-8") as fh:
+        old = json.load(fh)
+    with open(new_path, "r", encoding="utf-8") as fh:
+        new = json.load(fh)
+    print(f"old: {old['commit']} ({old['timestamp']})   new: {new['commit']} ({new['timestamp']})")
+    print(f"{'rows':>12} {'stage':<8} {'old s':>9} {'new s':>9} {'ratio':>7} {'old MB':>8} {'new MB':>8}")
+    old_runs = {run["rows"]: run["stages"] for run in old["runs"]}
+    for run in new["runs"]:
+        for stage, result in run["stages"].items():
+            before = old_runs.get(run["rows"], {}).get(stage)
+            if not before or "error" in before or "error" in result:
+                continue
+            ratio = result["seconds"] / before["seconds"] if before["seconds"] else float("nan")
+            print(f"{run['rows']:>12,} {stage:<8} {before['seconds']:>9.2f} {result['seconds']:>9.2f} "
+                  f"{ratio:>6.2f}x {before['peak_mb'] or 0:>8.0f} {result['peak_mb'] or 0:>8.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the TTC pipeline on synthetic data")
+    parser.add_argument("--rows", type=int, nargs="+", default=DEFAULT_ROWS, help="raw row counts")
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=STAGES)
+    parser.add_argument("--work-dir", default=default_work_dir, help="where synthetic datasets are kept")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--regenerate", action="store_true", help="regenerate synthetic data even if present")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="compare two result files")
+    # 內部使用：在子行程中執行單一階段
+    parser.add_argument("--stage", choices=STAGES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.stage:
+        run_stage(args.stage)
+    elif args.compare:
+        compare(*args.compare)
+    else:
+        results = bench(args.rows, args.stages, args.work_dir, args.seed, args.regenerate)
+        print(f"\nResults saved to {save_results(results)}")
@@ -0,0 +1,125 @@
+"""
+合成 TTC 延遲原始資料產生器 (供 bench_pipeline.py 使用)
+
+從真實原始檔學習分佈後重新抽樣：
+    - (Station, Line, Bound) 成組抽樣：保留原始站名的各種寫法與車站 / 路線的對應
+    - (Code, Min Delay, Min Gap) 成組抽樣：保留代碼與延遲長度的關係 (含 Min Delay = 0 的列)
+    - Time / Vehicle 依原始分佈抽樣 (保留小時分佈)
+    - Date 在指定年份內均勻分佈，Day 由 Date 推得
+輸出與真實資料相同的檔案格式：第一年為 2024 xlsx 格式 (列數太多時改寫成同欄位的 CSV)，
+其餘年份合併成一個 2025 CSV 格式 (含 _id)；代碼表直接從真實資料夾複製。
+
+用法:
+    python benchmarks/synthetic_data.py 100000 out_dir
+    python benchmarks/synthetic_data.py 1000000 out_dir --years 2024 2026 --seed 1
+"""
+
+import argparse
+import os
+import shutil
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import clean_data  # noqa: E402
+
+# 原始檔欄位 (2024 xlsx 與 2025 CSV 相同，CSV 另有 _id)
+SOURCE_COLUMNS = ["Date", "Time", "Day", "Station", "Code", "Min Delay", "Min Gap", "Bound", "Line", "Vehicle"]
+LOCATION_COLUMNS = ["Station", "Line", "Bound"]
+INCIDENT_COLUMNS = ["Code", "Min Delay", "Min Gap"]
+
+# openpyxl 寫 xlsx 很慢，超過此列數時第一年改寫成 CSV
+XLSX_MAX_ROWS = 200_000
+
+CODE_FILES = ["ttc-subway-delay-codes.xlsx", "Code Descriptions.csv"]
+
+
+def load_profile(source_dir=clean_data.data_dir):
+    """讀取真實原始檔 (與 clean_data.find_data_files 相同的檔名規則) 作為抽樣來源"""
+    files = []
+    for name in sorted(os.listdir(source_dir)):
+        lower = name.lower()
+        if all(k in lower for k in ("ttc", "subway", "delay", "data")) and "cleaned" not in lower \
+                and lower.endswith((".csv", ".xlsx")):
+            files.append(os.path.join(source_dir, name))
+    if not files:
+        raise FileNotFoundError(f"no TTC subway delay data files in {source_dir}")
+    profile = pd.concat([clean_data.read_source(f)[SOURCE_COLUMNS] for f in files], ignore_index=True)
+    profile["Date"] = pd.to_datetime(profile["Date"])
+    return profile
+
+
+def generate(profile, rows, years=(2024, 2025), seed=0):
+    """依 profile 抽樣產生 rows 列原始資料 (依 Date、Time 排序)"""
+    rng = np.random.default_rng(seed)
+    n = len(profile)
+
+    def sample(columns):
+        picked = profile[columns].iloc[rng.integers(0, n, rows)]
+        return picked.reset_index(drop=True)
+
+    start, end = pd.Timestamp(f"{years[0]}-01-01"), pd.Timestamp(f"{years[-1]}-12-31")
+    days = (end - start).days + 1
+    dates = start + pd.to_timedelta(rng.integers(0, days, rows), unit="D")
+
+    df = pd.concat([sample(LOCATION_COLUMNS), sample(INCIDENT_COLUMNS), sample(["Time"]), sample(["Vehicle"])], axis=1)
+    df["Date"] = dates
+    df["Day"] = df["Date"].dt.day_name()
+    df = df.sort_values(["Date", "Time"], kind="stable").reset_index(drop=True)
+    return df[SOURCE_COLUMNS]
+
+
+def write_sources(df, out_dir, source_dir=clean_data.data_dir):
+    """
+    依真實資料的檔案格式寫出：第一年 -> ttc-subway-delay-data-<year>.xlsx (或 .csv)，
+    之後 -> TTC Subway Delay Data since <year>.csv (含 _id)；並複製代碼表
+    回傳寫出的檔案清單
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    written = []
+    first_year = df["Date"].dt.year.min()
+    first = df[df["Date"].dt.year == first_year]
+    rest = df[df["Date"].dt.year != first_year]
+
+    if len(first):
+        out = first.assign(Date=first["Date"].dt.normalize())
+        if len(first) <= XLSX_MAX_ROWS:
+            path = os.path.join(out_dir, f"ttc-subway-delay-data-{first_year}.xlsx")
+            out.to_excel(path, index=False)
+        else:
+            path = os.path.join(out_dir, f"ttc-subway-delay-data-{first_year}.csv")
+            out.to_csv(path, index=False)
+        written.append(path)
+
+    if len(rest):
+        out = rest.assign(Date=rest["Date"].dt.strftime("%Y-%m-%d"))
+        out.insert(0, "_id", np.arange(1, len(out) + 1))
+        path = os.path.join(out_dir, f"TTC Subway Delay Data since {first_year + 1}.csv")
+        out.to_csv(path, index=False)
+        written.append(path)
+
+    for name in CODE_FILES:
+        src = os.path.join(source_dir, name)
+        if os.path.exists(src):
+            shutil.copy2(src, os.path.join(out_dir, name))
+    return written
+
+
+def make_dataset(rows, out_dir, years=(2024, 2025), seed=0, profile=None):
+    if profile is None:
+        profile = load_profile()
+    return write_sources(generate(profile, rows, years, seed), out_dir)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate synthetic TTC subway delay source files")
+    parser.add_argument("rows", type=int, help="number of raw rows")
+    parser.add_argument("out_dir", help="output directory")
+    parser.add_argument("--years", type=int, nargs=2, default=(2024, 2025), metavar=("FIRST", "LAST"))
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    for path in make_dataset(args.rows, args.out_dir, tuple(args.years), args.seed):
+        print(f"Wrote {path}")
@@ -2,12 +2,35 @@ import pandas as pd
 import os
 import numpy as np
 import glob
+import hashlib
+import io
+import json
+import argparse
+import contextlib
+from concurrent.futures import ProcessPoolExecutor
+
+from config import get_data_dir
+from data_store import PartitionWriter, save_cleaned, to_store_schema
+from features import PEAK_DEFINITIONS, CodeLookup, add_derived_features, map_code_descriptions
+from instrumentation import instrumented, stage
+from station_names import get_normalizer, normalize_stations
 
 # Define file paths
-data_dir = r"c:\Users\tim01\Desktop\TTC"
+data_dir = get_data_dir()
 codes_excel = os.path.join(data_dir, "ttc-subway-delay-codes.xlsx")
 codes_csv = os.path.join(data_dir, "Code Descriptions.csv")
 output_file = os.path.join(data_dir, "TTC_Subway_Delay_Data_Combined_Cleaned.csv")
+# Compiled code lookup (parsed codes + prefix fallback), rebuilt only when a codes file changes
+code_lookup_file = os.path.join(data_dir, "code_lookup.json")
+
+# Incremental ingestion cache: per-source cleaned rows + fingerprints
+ingest_dir = os.path.join(data_dir, "ingest_cache")
+ingest_manifest = os.path.join(ingest_dir, "manifest.json")
+# Bump whenever clean_frame output changes so cached sources are rebuilt
+INGEST_VERSION = 4
+
+# Streaming mode: rows per chunk (peak memory scales with this, not with total input size)
+DEFAULT_CHUNK_SIZE = 50_000
 
 
 def load_codes():
@@ -72,129 +95,228 @@ def load_codes():
     return code_map
 
 
-def get_code_desc(code, mapping):
-    if pd.isna(code) or code == "nan" or code == "":
-        return "Unknown Code"
-    code = str(code).strip()
+def _code_sources_fingerprint(previous=None):
+    """
+    代碼檔的指紋；size/mtime 與上次相同時沿用上次的 sha256，避免每次都讀檔計算
+    檔案不存在時為 None
+    """
+    fps = {}
+    for path in (codes_excel, codes_csv):
+        name = os.path.basename(path)
+        if not os.path.exists(path):
+            fps[name] = None
+            continue
+        stat = os.stat(path)
+        old = (previous or {}).get(name)
+        if old and old["size"] == stat.st_size and old["mtime"] == stat.st_mtime_ns:
+            fps[name] = old
+            continue
+        fps[name] = file_fingerprint(path)[0]
+    return fps
+
+
+def _same_sources(a, b):
+    """內容相同即可 (只有 mtime 改變不需要重建)"""
+    if set(a) != set(b):
+        return False
+    return all(
+        (a[k] is None and b[k] is None)
+        or (a[k] is not None and b[k] is not None and a[k]["sha256"] == b[k]["sha256"])
+        for k in a
+    )
+
+
+def load_code_lookup(rebuild=False):
+    """
+    回傳 CodeLookup
+    代碼檔內容沒變時直接讀 code_lookup.json，不再解析 Excel；否則呼叫 load_codes() 並更新快取
+    """
+    cached = None
+    if not rebuild and os.path.exists(code_lookup_file):
+        try:
+            with open(code_lookup_file, "r", encoding="utf-8") as fh:
+                cached = json.load(fh)
+        except (OSError, ValueError):
+            cached = None
+
+    sources = _code_sources_fingerprint(cached["sources"] if cached else None)
+    if cached and _same_sources(cached["sources"], sources):
+        lookup = CodeLookup(cached["codes"], cached["prefix_map"])
+        print(f"Loaded {len(lookup)} codes from {os.path.basename(code_lookup_file)} (codes files unchanged).")
+        if sources != cached["sources"]:
+            # 只有 mtime 改變：記下新的 mtime，下次不必再算 sha256
+            _save_code_lookup(lookup, sources)
+        return lookup
+
+    lookup = CodeLookup(load_codes())
+    _save_code_lookup(lookup, sources)
+    return lookup
+
+
+def _save_code_lookup(lookup, sources):
+    tmp = code_lookup_file + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as fh:
+        json.dump(
+            {
+                "sources": sources,
+                "codes": lookup.mapping,
+                "prefix_map": lookup.prefix_map,
+                "fallback": lookup.fallback,
+            },
+            fh,
+            indent=2,
+            ensure_ascii=False,
+            default=str,
+        )
+    os.replace(tmp, code_lookup_file)
+
 
-    if code in mapping:
-        return mapping[code]
+def is_data_file(path):
+    """檔名 (不分大小寫) 含 ttc / subway / delay / data 的 .csv / .xlsx 原始檔 (不含清洗後的輸出)"""
+    fname = os.path.basename(path).lower()
+    return (
+        all(word in fname for word in ("ttc", "subway", "delay", "data"))
+        and fname.endswith((".csv", ".xlsx"))
+        and "cleaned" not in fname
+    )
 
-    # Heuristic Fallback
-    prefix = code[:2]
-    prefix_map = {
-        "MU": "Miscellaneous / Transportation",
-        "TU": "Track / Signal",
-        "PU": "Plant / Equipment",
-        "EU": "Equipment",
-        "SU": "Subway Service",
-        "ER": "SRT Equipment",
-    }
-    if prefix in prefix_map:
-        return f"{prefix_map[prefix]} - Unknown Subcode"
 
-    return "Unknown Code"
+def list_data_files():
+    """data_dir 中所有原始資料檔 (依檔名排序)；pipeline 也以此決定 clean 階段的輸入"""
+    return [f for f in sorted(glob.glob(os.path.join(data_dir, "*"))) if is_data_file(f)]
 
 
 def find_data_files():
     # Find files matching "ttc subway delay data" (case insensitive)
     # This matches user requirement: "判斷 檔案 名稱為 ttc subway delay data"
-    all_files = glob.glob(os.path.join(data_dir, "*"))
-    data_files = []
-
     print("Scanning for data files...")
-    for f in all_files:
-        fname = os.path.basename(f).lower()
-        # Simple heuristic or specific keywords
-        if (
-            "ttc" in fname
-            and "subway" in fname
-            and "delay" in fname
-            and "data" in fname
-        ):
-            if f.endswith(".csv") or f.endswith(".xlsx"):
-                # Exclude the output file itself if it exists
-                if "cleaned" in fname:
-                    continue
-                print(f"Found data file: {os.path.basename(f)}")
-                data_files.append(f)
+    data_files = list_data_files()
+    for f in data_files:
+        print(f"Found data file: {os.path.basename(f)}")
     return data_files
 
 
-def is_peak_hour(time_str):
-    """判斷是否為尖峰時段 (07:00-09:00 或 16:00-19:00)"""
-    try:
-        h = int(str(time_str).split(":")[0])
-        if (7 <= h < 9) or (16 <= h < 19):
-            return True
-    except:
-        pass
-    return False
-
-
-def clean_and_merge():
-    # 1. Identify Files
-    files = find_data_files()
-    if not files:
-        print("No data files found!")
-        return
-
-    # 2. Load Data
-    dfs = []
-    for f in files:
-        try:
-            if f.endswith(".xlsx"):
-                d = pd.read_excel(f)
-            else:
-                d = pd.read_csv(f)
+def file_fingerprint(path, prefix_size=None):
+    """
+    計算檔案指紋 (size / mtime / sha256)
+    prefix_size: 若指定，額外回傳前 prefix_size bytes 的 sha256 (判斷是否僅在尾端追加)
+    """
+    stat = os.stat(path)
+    h = hashlib.sha256()
+    prefix_digest = None
+    remaining = prefix_size
+    with open(path, "rb") as fh:
+        for block in iter(lambda: fh.read(1 << 20), b""):
+            if remaining is not None and remaining <= len(block):
+                h.update(block[:remaining])
+                prefix_digest = h.hexdigest()
+                h.update(block[remaining:])
+                remaining = None
+                continue
+            h.update(block)
+            if remaining is not None:
+                remaining -= len(block)
+    if remaining == 0:
+        prefix_digest = h.hexdigest()
+
+    fp = {"size": stat.st_size, "mtime": stat.st_mtime_ns, "sha256": h.hexdigest()}
+    return fp, prefix_digest
+
+
+def read_source(path):
+    """讀取單一原始資料檔"""
+    if path.endswith(".xlsx"):
+        d = pd.read_excel(path)
+    else:
+        d = pd.read_csv(path)
 
-            # Standardize columns? 2025 has _id
-            if "_id" in d.columns:
-                d.drop(columns=["_id"], inplace=True)
+    # Standardize columns? 2025 has _id
+    if "_id" in d.columns:
+        d.drop(columns=["_id"], inplace=True)
+    return d
 
-            dfs.append(d)
-        except Exception as e:
-            print(f"Error reading {f}: {e}")
 
-    # 3. Merge
-    if not dfs:
-        return
+def _iter_excel_chunks(path, chunksize):
+    """以 openpyxl read-only 模式逐列讀取第一個工作表，每 chunksize 列產生一個 DataFrame"""
+    from openpyxl import load_workbook
 
-    df_combined = pd.concat(dfs, ignore_index=True)
-    total_original_rows = len(df_combined)
-    print(f"\n--- Total Rows Loaded: {total_original_rows} ---")
+    wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = wb.worksheets[0].iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        batch = []
+        for row in rows:
+            if all(v is None for v in row):
+                continue
+            batch.append(row)
+            if len(batch) == chunksize:
+                yield pd.DataFrame(batch, columns=header).infer_objects()
+                batch = []
+        if batch:
+            yield pd.DataFrame(batch, columns=header).infer_objects()
+    finally:
+        wb.close()
+
+
+def iter_source_chunks(path, chunksize=DEFAULT_CHUNK_SIZE):
+    """分批讀取單一原始資料檔 (與 read_source 相同欄位)，一次最多 chunksize 列"""
+    if path.endswith(".xlsx"):
+        chunks = _iter_excel_chunks(path, chunksize)
+    else:
+        chunks = pd.read_csv(path, chunksize=chunksize)
+    for d in chunks:
+        if "_id" in d.columns:
+            d = d.drop(columns=["_id"])
+        yield d
+
+
+def read_csv_tail(path, offset):
+    """只解析 append-only CSV 在 offset 之後新增的列 (沿用第一行的欄位名稱)"""
+    with open(path, "rb") as fh:
+        header = fh.readline()
+        fh.seek(offset)
+        tail = fh.read()
+    d = pd.read_csv(io.BytesIO(header + tail))
+    if "_id" in d.columns:
+        d.drop(columns=["_id"], inplace=True)
+    return d
+
+
+def clean_frame(df, code_map, verbose=True):
+    """
+    對一批原始資料執行完整清洗流程
+    trim -> 日期 -> 路線改名 -> 只留地鐵 -> 代碼對照 -> 刪除 Min Delay = 0 -> 衍生欄位
+    code_map 可為 dict 或 CodeLookup
+
+    回傳 (df_kept, stats)；stats 為驗證用的列數統計，可跨檔案相加。
+    """
+    total_original_rows = len(df)
 
     # 4. Standardize / Trim Strings
-    print("Trimming string columns...")
     cat_cols = ["Station", "Code", "Bound", "Line", "Vehicle"]
     # Check if columns exist before processing
     for col in cat_cols:
-        if col in df_combined.columns:
+        if col in df.columns:
             # Convert to string, trim whitespace, upper case for consistency
-            df_combined[col] = df_combined[col].astype(str).str.strip().str.upper()
+            df[col] = df[col].astype(str).str.strip().str.upper()
             # Replace 'NAN', 'NONE' strings with real NaN
-            df_combined[col] = df_combined[col].replace(["NAN", "NONE", ""], np.nan)
-        
-        # Specific Normalization for Station Name
-        if "Station" in df_combined.columns:
-            # Remove " STATION" suffix if exists
-            df_combined["Station"] = df_combined["Station"].str.replace(r"\s+STATION$", "", regex=True)
-            # Standardize common variations
-            station_map = {
-                "ST GEORGE": "ST. GEORGE",
-                "ST CLAIR": "ST. CLAIR",
-                "ST ANDREW": "ST. ANDREW",
-                "ST PATRICK": "ST. PATRICK",
-                "BLOOR-YONGE": "BLOOR", # Often referred as Bloor Station
-                "KENNEDY BD": "KENNEDY",
-                "VMC": "VAUGHAN METROPOLITAN CENTRE",
-            }
-            # Optional: More aggressive cleaning
-            # df_combined["Station"] = df_combined["Station"].replace(station_map)
+            df[col] = df[col].replace(["NAN", "NONE", ""], np.nan)
+
+    # Specific Normalization for Station Name
+    # 別名表 (ST GEORGE -> ST. GEORGE, VMC -> VAUGHAN METROPOLITAN CENTRE ...) + 模糊比對，
+    # 每個不重複名稱只解析一次 (見 station_names.py)
+    if "Station" in df.columns:
+        raw_unique = df["Station"].nunique()
+        with stage("clean.normalize_stations", rows_in=len(df), unique=raw_unique):
+            df["Station"] = normalize_stations(df["Station"])
+        if verbose:
+            print(f"Station names: {raw_unique} raw -> {df['Station'].nunique()} normalized")
 
     # Date Standardize
-    if "Date" in df_combined.columns:
-        df_combined["Date"] = pd.to_datetime(df_combined["Date"]).dt.date
+    if "Date" in df.columns:
+        df["Date"] = pd.to_datetime(df["Date"]).dt.date
 
     # 5. 路線名稱標準化 (Line Rename)
     # Line 1: Yonge-University - 地鐵 (Subway) - 營運中
@@ -203,7 +325,6 @@ def clean_and_merge():
     # Line 4: Sheppard - 地鐵 (Subway) - 營運中
     # Line 5: Eglinton Crosstown - 輕軌 (LRT) - 尚未開通
     # Line 6: Finch West - 輕軌 (LRT) - 營運中 (2025 年 12 月 7 日開通)
-    print("\n--- Renaming Lines ---")
     line_mapping = {
         "YU": "Line 1 Yonge-University",
         "YUS": "Line 1 Yonge-University",
@@ -212,16 +333,14 @@ def clean_and_merge():
         "SRT": "Line 3 Scarborough RT",  # 已關閉，會被過濾掉
     }
 
-    if "Line" in df_combined.columns:
-        # 記錄原始的 Line 分佈
-        print("Original Line Distribution:")
-        print(df_combined["Line"].value_counts())
+    if "Line" in df.columns:
+        if verbose:
+            # 記錄原始的 Line 分佈
+            print("Original Line Distribution:")
+            print(df["Line"].value_counts())
 
         # 應用映射
-        df_combined["Line"] = df_combined["Line"].replace(line_mapping)
-
-        print("\nAfter Renaming:")
-        print(df_combined["Line"].value_counts())
+        df["Line"] = df["Line"].replace(line_mapping)
 
     # 6. 只保留地鐵資料 (Filter Subway Only - Lines 1, 2, 4)
     subway_lines = [
@@ -230,53 +349,341 @@ def clean_and_merge():
         "Line 4 Sheppard",
     ]
 
-    print("\n--- Filtering Subway Lines Only ---")
-    rows_before_filter = len(df_combined)
-    df_combined = df_combined[df_combined["Line"].isin(subway_lines)].copy()
-    rows_after_filter = len(df_combined)
-
-    print(f"Rows before subway filter: {rows_before_filter}")
-    print(f"Rows after subway filter: {rows_after_filter}")
-    print(f"Rows removed (non-subway): {rows_before_filter - rows_after_filter}")
-
-    print("\nFinal Line Distribution (Subway Only):")
-    print(df_combined["Line"].value_counts())
+    df = df[df["Line"].isin(subway_lines)].copy()
+    rows_after_filter = len(df)
 
-    # 7. 新增尖峰時段欄位 (Add Peak Hour Column)
-    print("\n--- Adding Peak Hour Column ---")
-    if "Time" in df_combined.columns:
-        df_combined["Is Peak Hour"] = df_combined["Time"].apply(is_peak_hour)
-        peak_count = df_combined["Is Peak Hour"].sum()
-        offpeak_count = len(df_combined) - peak_count
-        print(f"Peak Hour incidents: {peak_count}")
-        print(f"Off-Peak incidents: {offpeak_count}")
+    if verbose:
+        print(f"Rows before subway filter: {total_original_rows}")
+        print(f"Rows after subway filter: {rows_after_filter}")
+        print(f"Rows removed (non-subway): {total_original_rows - rows_after_filter}")
 
     # 8. Map Codes
-    code_map = load_codes()
-    if "Code" in df_combined.columns:
-        df_combined["Code Description"] = df_combined["Code"].apply(
-            lambda c: get_code_desc(c, code_map)
-        )
+    if "Code" in df.columns:
+        with stage("clean.map_codes", rows_in=len(df)):
+            df["Code Description"] = map_code_descriptions(df["Code"], code_map)
 
     # 9. Filter Verification Logic
     # User Request: "delay = 0 刪除後的檔案數量" & "判斷加起來的line 數量應該是一樣的"
-
-    print("\n--- Filtering Data (Remove Min Delay = 0) ---")
     # Cast Min Delay to number just in case
-    df_combined["Min Delay"] = pd.to_numeric(
-        df_combined["Min Delay"], errors="coerce"
-    ).fillna(0)
+    df["Min Delay"] = pd.to_numeric(df["Min Delay"], errors="coerce").fillna(0)
 
-    subway_rows_before_delay_filter = len(df_combined)
+    keep_mask = df["Min Delay"] != 0
+    df_kept = df[keep_mask].copy()
+    count_kept = len(df_kept)
 
-    # Split Data
-    df_kept = df_combined[df_combined["Min Delay"] != 0].copy()
-    df_dropped = df_combined[df_combined["Min Delay"] == 0].copy()
+    # 衍生欄位 (Year / Month / DayOfWeek / Hour / 尖峰旗標 / Weighted Delay)
+    with stage("clean.derive_features", rows_in=count_kept):
+        df_kept = add_derived_features(df_kept)
+    count_dropped = rows_after_filter - count_kept
+
+    stats = {
+        "original": total_original_rows,
+        "subway": rows_after_filter,
+        "dropped": count_dropped,
+        "kept": count_kept,
+    }
+    return df_kept, stats
+
+
+def add_stats(a, b):
+    return {k: a.get(k, 0) + b.get(k, 0) for k in set(a) | set(b)}
+
+
+def summarize(df_kept):
+    """驗證報告用的分佈統計；可用 add_summary 跨檔案 / chunk 累加"""
+    unknown = df_kept["Code Description"].str.contains("Unknown Code")
+    return {
+        "lines": df_kept["Line"].value_counts(),
+        "peaks": {name: int(df_kept[name].sum()) for name in PEAK_DEFINITIONS},
+        "rows": len(df_kept),
+        "unknown_rows": int(unknown.sum()),
+        "unknown_codes": list(df_kept.loc[unknown, "Code"].unique()),
+    }
+
+
+def add_summary(a, b):
+    if a is None:
+        return b
+    lines = a["lines"].add(b["lines"], fill_value=0).astype("int64")
+    return {
+        "lines": lines.sort_values(ascending=False, kind="stable"),
+        "peaks": {k: a["peaks"][k] + b["peaks"].get(k, 0) for k in a["peaks"]},
+        "rows": a["rows"] + b["rows"],
+        "unknown_rows": a["unknown_rows"] + b["unknown_rows"],
+        "unknown_codes": a["unknown_codes"] + [c for c in b["unknown_codes"] if c not in a["unknown_codes"]],
+    }
 
-    count_kept = len(df_kept)
-    count_dropped = len(df_dropped)
 
-    print(f"Subway Rows (before delay filter): {subway_rows_before_delay_filter}")
+def _load_manifest():
+    if not os.path.exists(ingest_manifest):
+        return {"sources": {}}
+    with open(ingest_manifest, "r", encoding="utf-8") as fh:
+        return json.load(fh)
+
+
+def _save_manifest(manifest):
+    with open(ingest_manifest, "w", encoding="utf-8") as fh:
+        json.dump(manifest, fh, indent=2)
+
+
+def _cache_path(path):
+    return os.path.join(ingest_dir, os.path.basename(path) + ".pkl")
+
+
+def ingest_source(path, code_map, entry, rules, incremental):
+    """
+    清洗單一來源檔，並更新 ingest_cache 中該檔的快取
+    entry 為 manifest 中該檔先前的紀錄 (可為 None)；rules 為 {"codes": 代碼表指紋, "stations": 車站別名表版本}
+    回傳 (df_kept, stats, 新的 entry)；讀不到檔案時回傳 (None, None, None)，清洗錯誤則直接拋出
+
+    incremental=True 時：
+    - 內容未變 (size/mtime 或 sha256 相同) -> 直接使用快取
+    - 內容未變但代碼表改變 -> 沿用快取，只重算 Code Description
+    - CSV 僅在尾端追加 -> 只解析新增的部分並併入快取
+    - 其他情況 -> 重新解析整個檔案
+    """
+    name = os.path.basename(path)
+    cache_file = _cache_path(path)
+    usable = (
+        incremental
+        and entry is not None
+        and entry.get("stations") == rules["stations"]
+        and entry.get("version") == INGEST_VERSION
+        and os.path.exists(cache_file)
+    )
+    # Code Description 只由 Code 決定，代碼表改變時不必重新清洗
+    codes_changed = usable and entry.get("codes") != rules["codes"]
+
+    prefix_size = entry["size"] if usable and path.endswith(".csv") else None
+    fp, prefix_digest = file_fingerprint(path, prefix_size=prefix_size)
+
+    def cached_rows():
+        df = pd.read_pickle(cache_file)
+        if codes_changed:
+            df["Code Description"] = map_code_descriptions(df["Code"], code_map)
+        return df
+
+    if usable and fp["size"] == entry["size"] and fp["sha256"] == entry["sha256"]:
+        if not codes_changed:
+            print(f"[cached]   {name}: {entry['stats']['kept']} rows")
+            return pd.read_pickle(cache_file), entry["stats"], entry
+        df_kept, stats = cached_rows(), entry["stats"]
+        print(f"[remapped] {name}: {stats['kept']} rows (code table changed)")
+    elif usable and prefix_digest == entry["sha256"] and _ends_with_newline(path, entry["size"]):
+        # Append-only: only the new tail goes through the cleaning steps
+        with stage("clean.read", file=name, mode="tail") as rec:
+            try:
+                delta_raw = read_csv_tail(path, entry["size"])
+            except Exception as e:
+                print(f"Error reading {path}: {e}")
+                return None, None, None
+            rec["rows_out"] = len(delta_raw)
+        with stage("clean.clean_frame", rows_in=len(delta_raw), file=name) as rec:
+            delta_kept, delta_stats = clean_frame(delta_raw, code_map, verbose=False)
+            rec["rows_out"] = len(delta_kept)
+        df_kept = pd.concat([cached_rows(), delta_kept], ignore_index=True)
+        stats = add_stats(entry["stats"], delta_stats)
+        print(f"[appended] {name}: +{delta_stats['original']} raw rows, +{delta_stats['kept']} kept")
+    else:
+        with stage("clean.read", file=name) as rec:
+            try:
+                raw = read_source(path)
+            except Exception as e:
+                print(f"Error reading {path}: {e}")
+                return None, None, None
+            rec["rows_out"] = len(raw)
+        print(f"[parsed]   {name}: {len(raw)} raw rows")
+        with stage("clean.clean_frame", rows_in=len(raw), file=name) as rec:
+            df_kept, stats = clean_frame(raw, code_map, verbose=True)
+            rec["rows_out"] = len(df_kept)
+
+    os.makedirs(ingest_dir, exist_ok=True)
+    df_kept.to_pickle(cache_file)
+    return df_kept, stats, dict(fp, stats=stats, version=INGEST_VERSION, **rules)
+
+
+def _ingest_worker(path, code_map, entry, rules, incremental):
+    """
+    在子行程中清洗一個來源檔
+    輸出先收進字串 (由主行程依檔案順序印出)，資料轉成 categorical 等精簡型別再傳回，減少 pickle 傳輸量
+    """
+    log = io.StringIO()
+    with contextlib.redirect_stdout(log):
+        df_kept, stats, entry = ingest_source(path, code_map, entry, rules, incremental)
+    if df_kept is None:
+        return None, None, None, log.getvalue()
+    return to_store_schema(df_kept), stats, entry, log.getvalue()
+
+
+def load_sources(files, code_map, manifest, rules, incremental, workers=1):
+    """
+    清洗所有來源檔；workers > 1 時每個檔案交給一個 process (Excel 解析是主要耗時)
+    結果一律依 files 的順序回傳，輸出與單一 process 相同
+    """
+    jobs = [
+        (f, code_map, manifest["sources"].get(os.path.basename(f)), rules, incremental)
+        for f in files
+    ]
+    workers = max(1, min(workers, len(jobs)))
+    if workers == 1:
+        yield from (_ingest_worker(*job) for job in jobs)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # executor.map 保持輸入順序
+        yield from pool.map(_ingest_worker, *zip(*jobs))
+
+
+def _ends_with_newline(path, size):
+    if size == 0:
+        return False
+    with open(path, "rb") as fh:
+        fh.seek(size - 1)
+        return fh.read(1) == b"\n"
+
+
+def _codes_fingerprint(code_map):
+    # Code Description 依賴代碼表，代碼表變動時快取中的描述需重算
+    return hashlib.sha256(
+        json.dumps(code_map, sort_keys=True, default=str).encode("utf-8")
+    ).hexdigest()
+
+
+@instrumented("clean")
+def clean_and_merge(incremental=False, months=None, streaming=False, chunksize=DEFAULT_CHUNK_SIZE, workers=1):
+    # 1. Identify Files
+    files = find_data_files()
+    if not files:
+        print("No data files found!")
+        return
+
+    with stage("clean.load_codes") as rec:
+        code_map = load_code_lookup()
+        rec["rows_out"] = len(code_map)
+    if streaming:
+        stream_clean(files, code_map, months=months, chunksize=chunksize)
+        return
+    # Station 依賴車站別名表，別名表變動時整個快取失效
+    rules = {"codes": _codes_fingerprint(code_map.mapping), "stations": get_normalizer().version}
+
+    # 2. Load + clean each source (reusing the ingest cache in incremental mode)
+    manifest = _load_manifest()
+    parts = []
+    totals = {}
+    if workers > 1:
+        print(f"Loading {len(files)} files with {min(workers, len(files))} worker processes...")
+    for f, (df_part, stats, entry, log) in zip(files, load_sources(files, code_map, manifest, rules, incremental, workers)):
+        print(log, end="")
+        if df_part is None:
+            continue
+        manifest["sources"][os.path.basename(f)] = entry
+        parts.append(df_part)
+        totals = add_stats(totals, stats)
+
+    # 3. Merge
+    if not parts:
+        return
+
+    # Forget sources that no longer exist
+    names = {os.path.basename(f) for f in files}
+    manifest["sources"] = {k: v for k, v in manifest["sources"].items() if k in names}
+    _save_manifest(manifest)
+
+    with stage("clean.merge", rows_in=sum(len(p) for p in parts)) as rec:
+        df_kept = pd.concat(parts, ignore_index=True)
+        rec["rows_out"] = len(df_kept)
+    with stage("clean.verify", rows_in=len(df_kept)):
+        report_verification(totals, summarize(df_kept))
+
+    # 10. Save
+    print(f"\nSaving to {output_file}...")
+    with stage("clean.save_csv", rows_in=len(df_kept)):
+        df_kept.to_csv(output_file, index=False)
+    with stage("clean.save_partitions", rows_in=len(df_kept)) as rec:
+        result = save_cleaned(df_kept, months=months)
+        if result:
+            rec["written"], rec["unchanged"] = result
+    if result:
+        written, unchanged = result
+        print(f"Partitioned store: {written} partitions written, {unchanged} unchanged")
+
+    with stage("clean.validation_summary", rows_in=len(df_kept)):
+        write_validation_summary(totals, summarize(df_kept), df_kept.head())
+
+
+def stream_clean(files, code_map, months=None, chunksize=DEFAULT_CHUNK_SIZE):
+    """
+    串流模式：每個來源檔以 chunksize 列為單位走完同樣的清洗流程，
+    結果直接附加到輸出 CSV 與分區 dataset；驗證用的列數與路線分佈以累計值保存，
+    不把所有資料合併在記憶體中。
+    """
+    writer = PartitionWriter(months)
+    tmp_csv = output_file + ".tmp"
+    totals, summary, sample, columns = {}, None, None, None
+
+    print(f"\nStreaming in chunks of {chunksize} rows...")
+    try:
+        for f in files:
+            file_stats = {}
+            with stage("clean.stream", file=os.path.basename(f), chunksize=chunksize) as rec:
+                for raw in iter_source_chunks(f, chunksize):
+                    df_kept, stats = clean_frame(raw, code_map, verbose=False)
+                    file_stats = add_stats(file_stats, stats)
+                    if len(df_kept) == 0:
+                        continue
+
+                    # 輸出 CSV 欄位以第一個 chunk 為準
+                    if columns is None:
+                        columns = list(df_kept.columns)
+                        sample = df_kept.head()
+                        df_kept.to_csv(tmp_csv, index=False)
+                    else:
+                        df_kept = df_kept.reindex(columns=columns)
+                        df_kept.to_csv(tmp_csv, mode="a", header=False, index=False)
+                    writer.append(df_kept)
+                    summary = add_summary(summary, summarize(df_kept))
+                rec["rows_in"], rec["rows_out"] = file_stats.get("original", 0), file_stats.get("kept", 0)
+            print(f"[streamed] {os.path.basename(f)}: {file_stats.get('original', 0)} raw rows, "
+                  f"{file_stats.get('kept', 0)} kept")
+            totals = add_stats(totals, file_stats)
+    except BaseException:
+        # 中途失敗時不留下半份輸出
+        if os.path.exists(tmp_csv):
+            os.remove(tmp_csv)
+        raise
+
+    if summary is None:
+        print("No subway rows found!")
+        return
+
+    report_verification(totals, summary)
+
+    print(f"\nSaving to {output_file}...")
+    os.replace(tmp_csv, output_file)
+    with stage("clean.save_partitions", rows_in=summary["rows"]) as rec:
+        written, unchanged = writer.close()
+        rec["written"], rec["unchanged"] = written, unchanged
+    print(f"Partitioned store: {written} partitions written, {unchanged} unchanged")
+
+    write_validation_summary(totals, summary, sample)
+
+
+def report_verification(totals, summary):
+    total_original_rows = totals["original"]
+    subway_rows_before_delay_filter = totals["subway"]
+    rows_removed = total_original_rows - subway_rows_before_delay_filter
+    count_kept = totals["kept"]
+    count_dropped = totals["dropped"]
+
+    print(f"\n--- Total Rows Loaded: {total_original_rows} ---")
+    print(f"Rows removed (non-subway): {rows_removed}")
+
+    print("\nFinal Line Distribution (Subway Only):")
+    print(summary["lines"])
+
+    for name, peak_count in summary["peaks"].items():
+        print(f"{name}: {peak_count} peak / {summary['rows'] - peak_count} off-peak")
+
+    print(f"\nSubway Rows (before delay filter): {subway_rows_before_delay_filter}")
     print(f"Filtered (Kept) Count: {count_kept}")
     print(f"Dropped (Delay=0) Count: {count_dropped}")
 
@@ -288,16 +695,20 @@ def clean_and_merge():
             f"VERIFICATION FAILED: {count_kept} + {count_dropped} != {subway_rows_before_delay_filter}"
         )
 
-    # 10. Save
-    print(f"\nSaving to {output_file}...")
-    df_kept.to_csv(output_file, index=False)
+
+def write_validation_summary(totals, summary, sample):
+    total_original_rows = totals["original"]
+    subway_rows_before_delay_filter = totals["subway"]
+    rows_removed = total_original_rows - subway_rows_before_delay_filter
+    count_kept = totals["kept"]
+    count_dropped = totals["dropped"]
 
     # Validation Summary File
     with open("validation_summary.txt", "w", encoding="utf-8") as f:
         f.write("--- Clean Data Verification ---\n")
         f.write(f"Original Rows (all files): {total_original_rows}\n")
         f.write(f"After Subway Line Filter: {subway_rows_before_delay_filter}\n")
-        f.write(f"Non-Subway Rows Removed: {rows_before_filter - rows_after_filter}\n")
+        f.write(f"Non-Subway Rows Removed: {rows_removed}\n")
         f.write(f"Rows with Min Delay=0 (Dropped): {count_dropped}\n")
         f.write(f"Final Saved Rows: {count_kept}\n")
         f.write(
@@ -305,24 +716,66 @@ def clean_and_merge():
         )
 
         f.write("--- Line Distribution ---\n")
-        f.write(df_kept["Line"].value_counts().to_string() + "\n\n")
+        f.write(summary["lines"].to_string() + "\n\n")
 
         f.write("--- Peak Hour Distribution ---\n")
-        if "Is Peak Hour" in df_kept.columns:
-            f.write(f"Peak Hour incidents: {df_kept['Is Peak Hour'].sum()}\n")
-            f.write(f"Off-Peak incidents: {(~df_kept['Is Peak Hour']).sum()}\n\n")
+        peak_count = summary["peaks"]["Is Peak Hour"]
+        f.write(f"Peak Hour incidents: {peak_count}\n")
+        f.write(f"Off-Peak incidents: {summary['rows'] - peak_count}\n")
+        for name, count in summary["peaks"].items():
+            if name != "Is Peak Hour":
+                f.write(f"{name} incidents: {count}\n")
+        f.write("\n")
 
         # Check for unknown codes in the FINAL set
-        unknowns = df_kept[df_kept["Code Description"].str.contains("Unknown Code")]
-        f.write(f"Rows with Unknown Codes (in final data): {len(unknowns)}\n")
-        if len(unknowns) > 0:
-            f.write(f"Unique Unknowns: {unknowns['Code'].unique()}\n")
+        f.write(f"Rows with Unknown Codes (in final data): {summary['unknown_rows']}\n")
+        if summary["unknown_rows"] > 0:
+            f.write(f"Unique Unknowns: {summary['unknown_codes']}\n")
 
         f.write("\nSample Data:\n")
-        f.write(df_kept.head().to_string())
+        f.write(sample.to_string())
 
     print("Done. Check validation_summary.txt.")
 
 
 if __name__ == "__main__":
-    clean_and_merge()
+    parser = argparse.ArgumentParser(description="Clean and merge TTC subway delay data")
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="only parse new/changed source files (and new tails of append-only CSVs)",
+    )
+    parser.add_argument(
+        "--streaming",
+        action="store_true",
+        help="process each source in bounded-size chunks instead of loading everything into memory",
+    )
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=DEFAULT_CHUNK_SIZE,
+        help=f"rows per chunk in --streaming mode (default {DEFAULT_CHUNK_SIZE})",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="processes used to load and clean source files in parallel, one file per worker (default 1; not used with --streaming)",
+    )
+    parser.add_argument(
+        "--month",
+        action="append",
+        metavar="YYYY-MM",
+        help="only rewrite these year/month partitions of the cleaned store (repeatable)",
+    )
+    args = parser.parse_args()
+    if args.streaming and args.incremental:
+        parser.error("--streaming and --incremental cannot be combined")
+    months = [tuple(int(x) for x in m.split("-")) for m in args.month] if args.month else None
+    clean_and_merge(
+        incremental=args.incremental,
+        months=months,
+        streaming=args.streaming,
+        chunksize=args.chunk_size,
+        workers=args.workers,
+    )
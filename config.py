@@ -0,0 +1,18 @@
+"""
+TTC 地鐵延遲數據 - 共用設定
+所有腳本的資料夾都從這裡取得；設定環境變數 TTC_DATA_DIR 可改指其他資料夾
+(例如 benchmark 的合成資料)，不必修改各模組的路徑。
+
+環境變數:
+    TTC_DATA_DIR=<path>   原始檔、清洗結果、快取與報表輸出所在的資料夾
+"""
+
+import os
+
+DATA_DIR_ENV = "TTC_DATA_DIR"
+DEFAULT_DATA_DIR = r"c:\Users\tim01\Desktop\TTC"
+
+
+def get_data_dir():
+    """資料夾：TTC_DATA_DIR (有設定時) 或預設路徑；各模組在 import 時讀取一次"""
+    return os.environ.get(DATA_DIR_ENV) or DEFAULT_DATA_DIR
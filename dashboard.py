@@ -0,0 +1,306 @@
+"""
+TTC 地鐵延遲數據 - 即時互動儀表板 (本機伺服器)
+charts/*.html 是靜態快照，改一個過濾條件就得重新產生全部圖表；
+這裡在 query_service 上加一個網頁：選擇路線 / 車站 / 日期範圍 / 尖峰時段後，
+瀏覽器只向伺服器要該條件下的 figure JSON (彙總後的序列)，不傳原始資料、不重新產生整頁。
+
+圖表與 interactive_charts.py 相同 (同一組 prepare_* / build_*)，
+只是 prepare 收到的是 engine.filtered(where)：每個彙總都從記憶體中的 cube 套上過濾條件 roll-up，
+結果快取在記憶體 (回應與 roll-up，皆有上限)；只有未過濾的彙總會寫入 memo_cache。
+
+端點 (除 query_service 原有的之外):
+    /                 儀表板頁面
+    /plotly.min.js    plotly.js (離線可用)
+    /options          過濾選項 (路線、車站、日期範圍、尖峰定義、圖表清單)；可帶 line= 只列出該線的車站
+    /chart?chart=02_monthly_trend&line=...&start=...   單張圖的 figure JSON (過濾參數同 /aggregate)
+    /timeline?from=...&to=...&line=...                事故時間軸在縮放後視窗的 figure JSON
+                                                      (事故夠少時畫個別事故，否則分箱；見 timeline.py)
+
+用法:
+    python dashboard.py                 # http://127.0.0.1:8050
+    python dashboard.py --port 8080
+"""
+
+import argparse
+import asyncio
+import os
+from collections import OrderedDict
+
+import pandas as pd
+from plotly.offline import get_plotlyjs
+
+import interactive_charts
+from features import PEAK_DEFINITIONS, SCORING_PEAK
+from query_service import (
+    DEFAULT_HOST, RESPONSE_CACHE_SIZE, QueryError, QueryService, RawResponse, parse_filters, serve,
+)
+from report_engine import _freeze
+
+DEFAULT_PORT = 8050
+
+# 記憶體中保留的過濾檢視數 (每個檢視持有一個子 cube)
+VIEW_CACHE_SIZE = 32
+
+# 圖表名稱 (輸出檔名去掉 .html) -> (說明, prepare, build)
+DASHBOARD_CHARTS = OrderedDict(
+    (os.path.splitext(filename)[0], (label, prepare, build))
+    for filename, label, prepare, build in interactive_charts.CHARTS
+)
+
+
+class DashboardService(QueryService):
+    """QueryService + 儀表板頁面與單張圖的 figure JSON"""
+
+    def __init__(self, cache_size=RESPONSE_CACHE_SIZE):
+        super().__init__(cache_size)
+        self.views = OrderedDict()
+
+    def _refresh(self):
+        version = self.version
+        super()._refresh()
+        if self.version != version:
+            self.views.clear()
+
+    def view(self, where):
+        """過濾條件 -> FilteredEngine (同一條件重複使用，子 cube 只切一次)"""
+        key = _freeze(where)
+        view = self.views.get(key)
+        if view is None:
+            view = self.engine.filtered(where)
+            self.views[key] = view
+            if len(self.views) > VIEW_CACHE_SIZE:
+                self.views.popitem(last=False)
+        else:
+            self.views.move_to_end(key)
+        return view
+
+    def _page(self, params):
+        return RawResponse(PAGE, "text/html; charset=utf-8")
+
+    def _plotly(self, params):
+        return RawResponse(get_plotlyjs(), "application/javascript; charset=utf-8")
+
+    def _options(self, params):
+        cube = self.engine.cube
+        lines = [line for line in cube.members["Line"] if isinstance(line, str)]
+        where = {"Line": params["line"]} if params.get("line") else {}
+        stations = self.view(where).aggregate(["Station"]).index
+        dates = cube.members["Date"]
+        return {
+            "lines": lines,
+            "stations": sorted(str(s) for s in stations),
+            "start": str(dates.min())[:10],
+            "end": str(dates.max())[:10],
+            "peak_definitions": list(PEAK_DEFINITIONS),
+            "default_peak": SCORING_PEAK,
+            "charts": [{"name": name, "label": label} for name, (label, _, _) in DASHBOARD_CHARTS.items()],
+        }
+
+    def _chart(self, params):
+        name = params.get("chart", [None])[0]
+        if name not in DASHBOARD_CHARTS:
+            raise QueryError(f"chart: unknown chart {name!r} (choose from {', '.join(DASHBOARD_CHARTS)})")
+        _, prepare, build = DASHBOARD_CHARTS[name]
+        view = self.view(parse_filters(params))
+        if not view.totals()["Incidents"]:
+            raise QueryError("no incidents match these filters")
+        return RawResponse(build(prepare(view)).to_json())
+
+    def _timeline(self, params):
+        """時間軸縮放：只重算 [from, to) 視窗 (其餘過濾條件同 /chart)"""
+        window = [params.get(key, [None])[0] for key in ("from", "to")]
+        try:
+            window = tuple(pd.Timestamp(value) for value in window) if all(window) else None
+        except ValueError:
+            raise QueryError("from/to: invalid timestamp") from None
+        view = self.view(parse_filters(params))
+        if not view.totals()["Incidents"]:
+            raise QueryError("no incidents match these filters")
+        timeline = interactive_charts.prepare_incident_timeline(view, window)
+        return RawResponse(interactive_charts.build_incident_timeline(timeline).to_json())
+
+    ROUTES = {
+        **QueryService.ROUTES,
+        "/": _page,
+        "/plotly.min.js": _plotly,
+        "/options": _options,
+        "/chart": _chart,
+        "/timeline": _timeline,
+    }
+
+
+PAGE = """<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<title>TTC Subway Delay Dashboard</title>
+<script src="plotly.min.js"></script>
+<style>
+  body { font-family: Arial, sans-serif; margin: 0; background: #f5f6f8; color: #2C3E50; }
+  header { background: #2C3E50; color: white; padding: 12px 20px; }
+  header h1 { margin: 0; font-size: 20px; }
+  #filters { display: flex; flex-wrap: wrap; gap: 16px; padding: 12px 20px; background: white;
+             border-bottom: 1px solid #ddd; position: sticky; top: 0; z-index: 10; }
+  #filters label { display: flex; flex-direction: column; font-size: 12px; gap: 4px; }
+  #filters select[multiple] { min-width: 200px; }
+  #status { align-self: flex-end; font-size: 12px; color: #888; }
+  .chart { background: white; margin: 16px 20px; padding: 8px; border-radius: 4px; }
+  .chart .error { color: #E74C3C; padding: 16px; font-size: 14px; }
+</style>
+</head>
+<body>
+<header><h1>🚇 TTC Subway Delay Dashboard</h1></header>
+<div id="filters">
+  <label>Line<select id="line" multiple size="4"></select></label>
+  <label>Station<select id="station" multiple size="4"></select></label>
+  <label>From<input type="date" id="start"></label>
+  <label>To<input type="date" id="end"></label>
+  <label>Peak definition<select id="peak"></select></label>
+  <label>Period<select id="period">
+    <option value="">All hours</option><option value="peak">Peak only</option><option value="offpeak">Off-peak only</option>
+  </select></label>
+  <label><button id="reset" type="button">Reset</button></label>
+  <span id="status"></span>
+</div>
+<div id="charts"></div>
+<script>
+const $ = (id) => document.getElementById(id);
+const TIMELINE = "08_incident_timeline";
+let charts = [], options = null, timer = null, generation = 0, zoomTimer = null, zoomGeneration = 0;
+
+function selected(id) {
+  return Array.from($(id).selectedOptions).map((o) => o.value);
+}
+
+function fill(id, values, keep) {
+  const chosen = new Set(keep || []);
+  $(id).innerHTML = "";
+  for (const value of values) {
+    const option = new Option(value, value, false, chosen.has(value));
+    $(id).add(option);
+  }
+}
+
+function filterQuery() {
+  const params = new URLSearchParams();
+  for (const line of selected("line")) params.append("line", line);
+  for (const station of selected("station")) params.append("station", station);
+  if ($("start").value && $("start").value !== options.start) params.set("start", $("start").value);
+  if ($("end").value && $("end").value !== options.end) params.set("end", $("end").value);
+  if ($("period").value) {
+    params.set("period", $("period").value);
+    params.set("peak", $("peak").value);
+  }
+  return params;
+}
+
+async function refreshStations() {
+  const params = new URLSearchParams();
+  for (const line of selected("line")) params.append("line", line);
+  const data = await (await fetch("options?" + params)).json();
+  fill("station", data.stations, selected("station"));
+}
+
+async function update() {
+  const current = ++generation;
+  const started = performance.now();
+  const query = filterQuery();
+  $("status").textContent = "Updating...";
+  await Promise.all(charts.map(async (chart) => {
+    const params = new URLSearchParams(query);
+    params.set("chart", chart.name);
+    const response = await fetch("chart?" + params);
+    if (current !== generation) return;
+    const div = $("chart-" + chart.name);
+    if (!response.ok) {
+      Plotly.purge(div);
+      div.innerHTML = '<div class="error">' + chart.label + ": " + (await response.json()).error + "</div>";
+      return;
+    }
+    const figure = await response.json();
+    if (div.querySelector(".error")) div.innerHTML = "";
+    await Plotly.react(div, figure.data, figure.layout, {responsive: true});
+    if (chart.name === TIMELINE && !div.dataset.zoom) {
+      div.dataset.zoom = "1";
+      div.on("plotly_relayout", (event) => zoomTimeline(div, event));
+    }
+  }));
+  if (current === generation) {
+    $("status").textContent = "Updated in " + Math.round(performance.now() - started) + " ms";
+  }
+}
+
+// 時間軸縮放：只向伺服器要新視窗的資料 (放大到事故夠少時改畫個別事故)
+function zoomTimeline(div, event) {
+  let params = null;
+  if (event["xaxis.range[0]"] !== undefined) {
+    params = new URLSearchParams(filterQuery());
+    params.set("from", event["xaxis.range[0]"]);
+    params.set("to", event["xaxis.range[1]"]);
+  } else if (event["xaxis.autorange"]) {
+    params = new URLSearchParams(filterQuery());
+  } else {
+    return;
+  }
+  clearTimeout(zoomTimer);
+  zoomTimer = setTimeout(async () => {
+    const current = ++zoomGeneration;
+    const response = await fetch("timeline?" + params);
+    if (current !== zoomGeneration || !response.ok) return;
+    const figure = await response.json();
+    Plotly.react(div, figure.data, figure.layout, {responsive: true});
+  }, 200);
+}
+
+function schedule() {
+  clearTimeout(timer);
+  timer = setTimeout(update, 150);
+}
+
+function reset() {
+  for (const id of ["line", "station"]) for (const o of $(id).options) o.selected = false;
+  $("start").value = options.start;
+  $("end").value = options.end;
+  $("peak").value = options.default_peak;
+  $("period").value = "";
+  refreshStations().then(update);
+}
+
+async function init() {
+  options = await (await fetch("options")).json();
+  charts = options.charts;
+  fill("line", options.lines);
+  fill("station", options.stations);
+  fill("peak", options.peak_definitions, [options.default_peak]);
+  for (const id of ["start", "end"]) {
+    $(id).min = options.start;
+    $(id).max = options.end;
+  }
+  for (const chart of charts) {
+    const div = document.createElement("div");
+    div.className = "chart";
+    div.id = "chart-" + chart.name;
+    $("charts").appendChild(div);
+  }
+  $("line").addEventListener("change", () => refreshStations().then(schedule));
+  for (const id of ["station", "start", "end", "peak", "period"]) $(id).addEventListener("change", schedule);
+  $("reset").addEventListener("click", reset);
+  reset();
+}
+
+init();
+</script>
+</body>
+</html>
+"""
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve a live TTC delay dashboard backed by in-memory aggregates")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port, DashboardService()))
+    except KeyboardInterrupt:
+        print("Stopped")
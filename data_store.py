@@ -0,0 +1,363 @@
+"""
+TTC 地鐵延遲數據 - 共用資料存取層
+清洗後資料以 Hive 分區 (year=YYYY/month=MM) 的 Parquet dataset 保存：
+字串欄位字典編碼、Date 為真正的 date 型別，另有 _manifest.json 記錄每個分區的列數與內容 hash。
+所有分析腳本都透過 load_cleaned() / DelayQuery 載入，只讀需要的分區與欄位。
+"""
+
+import hashlib
+import json
+import os
+import shutil
+
+import pandas as pd
+
+from config import get_data_dir
+from features import DERIVED_COLUMNS, add_derived_features
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:  # 沒有 pyarrow 時退回 CSV
+    pa = None
+    ds = None
+    pq = None
+
+# 檔案路徑
+data_dir = get_data_dir()
+cleaned_csv = os.path.join(data_dir, "TTC_Subway_Delay_Data_Combined_Cleaned.csv")
+cleaned_dataset = os.path.join(data_dir, "cleaned_dataset")
+manifest_file = os.path.join(cleaned_dataset, "_manifest.json")
+
+# 低基數字串欄位 -> 字典編碼 (pandas categorical / Arrow dictionary)
+# Code Description 也是字典編碼：每列只存代碼，描述文字只在字典中存一次
+CATEGORY_COLUMNS = [
+    "Station", "Line", "Code", "Bound", "Day", "Time", "Vehicle",
+    "Code Description", "Month", "DayOfWeek",
+]
+# 分鐘數 (缺值視為 0)
+NUMERIC_COLUMNS = ["Min Delay", "Min Gap"]
+# 整數欄位的精簡型別
+INTEGER_DTYPES = {"Min Delay": "int32", "Min Gap": "int32", "Year": "int16", "Hour": "int8"}
+
+# 依 Date 排序後切成固定大小的 row group，讓 min/max 統計可用於跳過不需要的區塊
+ROW_GROUP_SIZE = 8192
+
+# Hive 分區欄位 (只存在於目錄名稱)
+PARTITION_KEYS = ["year", "month"]
+
+
+def to_store_schema(df):
+    """
+    把清洗後的 DataFrame 轉成標準的精簡型別
+    Date / Timestamp 為 datetime64、分鐘數 int32、Year int16、Hour int8、字串欄位為 categorical
+    """
+    df = df.copy()
+    for col in ("Date", "Timestamp"):
+        if col in df.columns:
+            df[col] = pd.to_datetime(df[col])
+    for col in NUMERIC_COLUMNS:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors="coerce").fillna(0)
+    for col, dtype in INTEGER_DTYPES.items():
+        if col in df.columns:
+            df[col] = df[col].astype(dtype)
+    for col in CATEGORY_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype("category")
+    return df
+
+
+def partition_name(year, month):
+    return f"year={int(year)}/month={int(month):02d}"
+
+
+def _content_hash(part):
+    """分區內容 hash (與 categorical 的類別集合無關)"""
+    hashed = pd.util.hash_pandas_object(part, index=False).to_numpy()
+    return hashlib.sha256(hashed.tobytes()).hexdigest()
+
+
+def _column_hash_bytes(series):
+    return pd.util.hash_pandas_object(series, index=False).to_numpy().tobytes()
+
+
+def _column_hashes(part):
+    """每個欄位各自的內容 hash (下游只依賴部分欄位時用來判斷是否需要重算)"""
+    return {col: hashlib.sha256(_column_hash_bytes(part[col])).hexdigest() for col in part.columns}
+
+
+def _normalize_type(field):
+    """
+    固定每個欄位的 Arrow 型別，讓分批寫出的檔案 schema 一致：
+    Date -> date32、字典索引一律 int32 (不隨類別數變成 int8/int16)、全空欄位 -> string
+    """
+    if field.name == "Date":
+        return pa.date32()
+    if pa.types.is_dictionary(field.type):
+        return pa.dictionary(pa.int32(), pa.string())
+    if pa.types.is_null(field.type):
+        return pa.large_string()
+    return field.type
+
+
+def _to_arrow(part, schema=None):
+    table = pa.Table.from_pandas(part, preserve_index=False)
+    if schema is None:
+        schema = pa.schema([pa.field(f.name, _normalize_type(f)) for f in table.schema])
+    return table.select(schema.names).cast(schema)
+
+
+def load_manifest():
+    if not os.path.exists(manifest_file):
+        return {"partitions": {}}
+    with open(manifest_file, "r", encoding="utf-8") as fh:
+        return json.load(fh)
+
+
+def _write_manifest(manifest):
+    digest = hashlib.sha256()
+    for name in sorted(manifest["partitions"]):
+        digest.update(f"{name}:{manifest['partitions'][name]['sha256']}".encode("utf-8"))
+    manifest["version"] = digest.hexdigest()
+    tmp = manifest_file + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as fh:
+        json.dump(manifest, fh, indent=2, sort_keys=True)
+    os.replace(tmp, manifest_file)
+
+
+def dataset_version(columns=None):
+    """
+    整個 dataset 的內容版本 (各分區 hash 的 hash)；沒有 dataset 時回傳 None
+    columns 若指定，只反映這些欄位的內容 (其他欄位改變時版本不變)
+    """
+    manifest = load_manifest()
+    if columns is None or "version" not in manifest:
+        return manifest.get("version")
+    digest = hashlib.sha256()
+    for name in sorted(manifest["partitions"]):
+        entry = manifest["partitions"][name]
+        column_hashes = entry.get("columns", {})
+        digest.update(name.encode("utf-8"))
+        for col in columns:
+            # 舊版 manifest 沒有欄位 hash 時退回整個分區的 hash
+            digest.update(f"{col}:{column_hashes.get(col, entry['sha256'])}".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def save_cleaned(df, months=None):
+    """
+    依 year/month 分區寫出 Parquet dataset；未安裝 pyarrow 時略過並回傳 None
+
+    只有內容 hash 改變的分區會被重寫；months 若指定 (例如 [(2025, 3)])，
+    只處理這些分區，其他分區保持不動。回傳 (寫入數, 未變動數)。
+    """
+    if pq is None:
+        print("pyarrow not installed, skipping columnar store.")
+        return None
+
+    df = to_store_schema(df)
+    dates = df["Date"]
+    keys = pd.DataFrame({"year": dates.dt.year, "month": dates.dt.month})
+
+    os.makedirs(cleaned_dataset, exist_ok=True)
+    manifest = load_manifest()
+    partitions = manifest["partitions"]
+    selected = None if months is None else {partition_name(y, m) for y, m in months}
+
+    written = unchanged = 0
+    seen = set()
+    for (year, month), idx in keys.groupby(["year", "month"]).groups.items():
+        name = partition_name(year, month)
+        if selected is not None and name not in selected:
+            continue
+        seen.add(name)
+        part = df.loc[idx].sort_values("Date", kind="stable")
+        sha = _content_hash(part)
+        part_dir = os.path.join(cleaned_dataset, name)
+        if partitions.get(name, {}).get("sha256") == sha and os.path.isdir(part_dir):
+            partitions[name].setdefault("columns", _column_hashes(part))
+            unchanged += 1
+            continue
+
+        # 先寫到 _staging (讀取時會被忽略) 再替換，避免讀到寫一半的分區
+        tmp_dir = os.path.join(cleaned_dataset, "_staging", name)
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+        pq.write_table(_to_arrow(part), os.path.join(tmp_dir, "part-0.parquet"),
+                       compression="zstd", row_group_size=ROW_GROUP_SIZE)
+        shutil.rmtree(part_dir, ignore_errors=True)
+        os.makedirs(os.path.dirname(part_dir), exist_ok=True)
+        os.replace(tmp_dir, part_dir)
+        partitions[name] = {"rows": len(part), "sha256": sha, "columns": _column_hashes(part)}
+        written += 1
+
+    # 資料中已不存在的分區 (只在全量寫入時清除)
+    if selected is None:
+        for name in [n for n in partitions if n not in seen]:
+            shutil.rmtree(os.path.join(cleaned_dataset, name), ignore_errors=True)
+            del partitions[name]
+
+    shutil.rmtree(os.path.join(cleaned_dataset, "_staging"), ignore_errors=True)
+    _write_manifest(manifest)
+    return written, unchanged
+
+
+class PartitionWriter:
+    """
+    串流寫入分區 dataset：append() 可呼叫多次 (每次一個 chunk)，close() 時才生效
+
+    每個 chunk 依 year/month 拆開後寫成該分區的 part-N.parquet (先放在 _staging)，
+    同時累積每個分區的列數與內容 hash，因此記憶體只需容納單一 chunk。
+    分區內容與 save_cleaned 一樣依 Date 排序：chunk 已依日期遞增時累積的 hash 即為排序後的 hash；
+    否則 close() 時把該分區讀回、排序後重寫並重算 hash (一次只需容納一個分區)，
+    所以同樣的資料不論是否串流，manifest hash 都相同。
+    close() 時內容 hash 與 manifest 相同的分區維持原檔，其餘整個替換。
+    """
+
+    def __init__(self, months=None):
+        if pq is None:
+            raise RuntimeError("pyarrow is required for streaming writes")
+        self.selected = None if months is None else {partition_name(y, m) for y, m in months}
+        self.staging = os.path.join(cleaned_dataset, "_staging")
+        shutil.rmtree(self.staging, ignore_errors=True)
+        self.schema = None
+        self.parts = {}  # 分區名稱 -> {"rows", "files", "digest"}
+
+    def append(self, df):
+        if len(df) == 0:
+            return
+        df = to_store_schema(df)
+        dates = df["Date"]
+        keys = pd.DataFrame({"year": dates.dt.year, "month": dates.dt.month})
+        for (year, month), idx in keys.groupby(["year", "month"]).groups.items():
+            name = partition_name(year, month)
+            if self.selected is not None and name not in self.selected:
+                continue
+            part = df.loc[idx]
+            table = _to_arrow(part, self.schema)
+            if self.schema is None:
+                self.schema = table.schema
+
+            state = self.parts.setdefault(name, {
+                "rows": 0, "files": 0, "digest": hashlib.sha256(),
+                "columns": {col: hashlib.sha256() for col in part.columns},
+                "dtypes": part.dtypes, "sorted": True, "last_date": None,
+            })
+            part_dates = part["Date"]
+            if state["sorted"] and not (
+                part_dates.is_monotonic_increasing
+                and (state["last_date"] is None or part_dates.iloc[0] >= state["last_date"])
+            ):
+                state["sorted"] = False
+            state["last_date"] = part_dates.iloc[-1]
+            part_dir = os.path.join(self.staging, name)
+            os.makedirs(part_dir, exist_ok=True)
+            pq.write_table(table, os.path.join(part_dir, f"part-{state['files']}.parquet"),
+                           compression="zstd", row_group_size=ROW_GROUP_SIZE)
+            state["digest"].update(pd.util.hash_pandas_object(part, index=False).to_numpy().tobytes())
+            for col, digest in state["columns"].items():
+                digest.update(_column_hash_bytes(part[col]))
+            state["rows"] += len(part)
+            state["files"] += 1
+
+    def _sort_partition(self, name, state):
+        """讀回 staging 中的分區，依 Date 穩定排序後重寫成單一檔案；回傳 (內容 hash, 欄位 hash)"""
+        part_dir = os.path.join(self.staging, name)
+        files = [os.path.join(part_dir, f"part-{i}.parquet") for i in range(state["files"])]
+        table = pa.concat_tables([pq.read_table(f) for f in files])
+        # 讀回的型別 (例如 Date 的時間單位) 還原成寫入前的型別，hash 才與 save_cleaned 一致
+        # (categorical 只還原型別、不沿用第一個 chunk 的類別集合)
+        dtypes = {col: "category" if isinstance(dtype, pd.CategoricalDtype) else dtype
+                  for col, dtype in state["dtypes"].items()}
+        part = table_to_frame(table).astype(dtypes).sort_values("Date", kind="stable")
+        shutil.rmtree(part_dir)
+        os.makedirs(part_dir)
+        pq.write_table(_to_arrow(part, self.schema), os.path.join(part_dir, "part-0.parquet"),
+                       compression="zstd", row_group_size=ROW_GROUP_SIZE)
+        return _content_hash(part), _column_hashes(part)
+
+    def close(self):
+        """把 staging 中的分區換上線並更新 manifest，回傳 (寫入數, 未變動數)"""
+        os.makedirs(cleaned_dataset, exist_ok=True)
+        manifest = load_manifest()
+        partitions = manifest["partitions"]
+
+        written = unchanged = 0
+        for name, state in sorted(self.parts.items()):
+            if state["sorted"]:
+                sha = state["digest"].hexdigest()
+                columns = {col: digest.hexdigest() for col, digest in state["columns"].items()}
+            else:
+                sha, columns = self._sort_partition(name, state)
+            part_dir = os.path.join(cleaned_dataset, name)
+            if partitions.get(name, {}).get("sha256") == sha and os.path.isdir(part_dir):
+                partitions[name].setdefault("columns", columns)
+                unchanged += 1
+                continue
+            shutil.rmtree(part_dir, ignore_errors=True)
+            os.makedirs(os.path.dirname(part_dir), exist_ok=True)
+            os.replace(os.path.join(self.staging, name), part_dir)
+            partitions[name] = {
+                "rows": state["rows"],
+                "sha256": sha,
+                "columns": columns,
+            }
+            written += 1
+
+        if self.selected is None:
+            for name in [n for n in partitions if n not in self.parts]:
+                shutil.rmtree(os.path.join(cleaned_dataset, name), ignore_errors=True)
+                del partitions[name]
+
+        shutil.rmtree(self.staging, ignore_errors=True)
+        _write_manifest(manifest)
+        return written, unchanged
+
+
+def _load_csv(columns=None):
+    """舊流程：解析 CSV (utf-8 失敗時改用 cp1252)"""
+    try:
+        df = pd.read_csv(cleaned_csv, encoding="utf-8", usecols=columns)
+    except UnicodeDecodeError:
+        df = pd.read_csv(cleaned_csv, encoding="cp1252", usecols=columns)
+    df = to_store_schema(df)
+
+    # 舊版 CSV 沒有衍生欄位時補算一次
+    if columns is None and any(col not in df.columns for col in DERIVED_COLUMNS):
+        df = to_store_schema(add_derived_features(df))
+    return df
+
+
+def open_dataset():
+    """回傳分區的 pyarrow Dataset (供分區 / filter / 欄位 pushdown)；沒有時回傳 None"""
+    if ds is None or not os.path.exists(manifest_file):
+        return None
+    return ds.dataset(cleaned_dataset, format="parquet", partitioning="hive")
+
+
+def has_cleaned_data():
+    return os.path.exists(manifest_file) or os.path.exists(cleaned_csv)
+
+
+def table_to_frame(table):
+    """Arrow table -> DataFrame (去掉只用於分區的 year / month 欄位)"""
+    drop = [k for k in PARTITION_KEYS if k in table.column_names]
+    if drop:
+        table = table.drop_columns(drop)
+    return table.to_pandas(date_as_object=False)
+
+
+def load_cleaned(columns=None):
+    """
+    載入清洗後資料 (所有腳本共用)
+
+    優先讀取分區 Parquet dataset；若不存在或未安裝 pyarrow 則退回 CSV。
+    回傳的 Date 為 datetime64、Min Delay/Min Gap 為整數、字串欄位為 categorical，
+    並包含清洗時算好的衍生欄位 (Timestamp / Month / DayOfWeek / Hour / 尖峰旗標 / Weighted Delay)。
+    """
+    dataset = open_dataset()
+    if dataset is not None:
+        return table_to_frame(dataset.to_table(columns=columns))
+    return _load_csv(columns)
@@ -0,0 +1,179 @@
+"""
+TTC 地鐵延遲數據 - 預先彙總的 OLAP Cube
+維度 Date × Hour × Station × Line × Code，以整數編碼後只保存有資料的 cell (稀疏儲存)。
+度量皆可加總：事故次數、Min Delay、Weighted Delay、Min Gap。
+
+由 Date / Hour / Code 決定的欄位 (Year, Month, DayOfWeek, 尖峰旗標, Code Description)
+以 cell 屬性保存，因此也能直接 rollup / 過濾，不需回頭掃原始資料。
+"""
+
+import numpy as np
+import pandas as pd
+
+DIMENSIONS = ["Date", "Hour", "Station", "Line", "Code"]
+ATTRIBUTES = ["Year", "Month", "DayOfWeek", "Is Peak Hour", "Is Weekday Rush", "Code Description"]
+
+# 度量名稱 -> 原始欄位 (Incidents 為列數)
+MEASURES = {
+    "Total Delay": "Min Delay",
+    "Weighted Delay": "Weighted Delay",
+    "Total Gap": "Min Gap",
+}
+
+# rollup 的 key 空間小於此值時用 dense bincount，否則排序後分組
+DENSE_LIMIT = 1 << 22
+
+
+def _member_mask(members, cond):
+    """
+    單一層級的過濾條件 -> 每個 member 是否保留
+    cond 可為：單一值、list/tuple/set、slice(start, stop) (含兩端)、或 callable(pd.Index) -> bool array
+    """
+    idx = pd.Index(members)
+    if callable(cond):
+        return np.asarray(cond(idx), dtype=bool)
+    if isinstance(cond, slice):
+        mask = np.ones(len(idx), dtype=bool)
+        if cond.start is not None:
+            mask &= np.asarray(idx >= cond.start, dtype=bool)
+        if cond.stop is not None:
+            mask &= np.asarray(idx <= cond.stop, dtype=bool)
+        return mask
+    if isinstance(cond, (list, tuple, set, frozenset)):
+        return np.asarray(idx.isin(list(cond)), dtype=bool)
+    return np.asarray(idx == cond, dtype=bool)
+
+
+class DelayCube:
+    """
+    稀疏 cube：每個有資料的 cell 保存各層級的整數座標與度量總和
+
+    coords[level]  -> 每個 cell 在該層級的 member 編號 (int32)
+    members[level] -> member 值 (已排序)
+    measures[name] -> 每個 cell 的度量
+    """
+
+    def __init__(self, coords, members, measures):
+        self.coords = coords
+        self.members = members
+        self.measures = measures
+
+    @classmethod
+    def from_frame(cls, df, dimensions=DIMENSIONS, attributes=ATTRIBUTES):
+        dimensions = [d for d in dimensions if d in df.columns]
+        attributes = [a for a in attributes if a in df.columns]
+
+        codes, members = {}, {}
+        for level in dimensions + attributes:
+            c, m = pd.factorize(df[level], sort=True, use_na_sentinel=False)
+            codes[level] = c.astype("int64")
+            members[level] = np.asarray(m, dtype=object) if isinstance(m, pd.Categorical) else np.asarray(m)
+
+        # 維度座標 -> 單一 cell key
+        shape = tuple(len(members[d]) for d in dimensions)
+        key = np.ravel_multi_index([codes[d] for d in dimensions], shape)
+        cell_keys, first_row, inverse = np.unique(key, return_index=True, return_inverse=True)
+
+        coords = {}
+        for d, c in zip(dimensions, np.unravel_index(cell_keys, shape)):
+            coords[d] = c.astype("int32")
+        # 屬性由維度決定，取每個 cell 的第一列即可
+        for a in attributes:
+            coords[a] = codes[a][first_row].astype("int32")
+
+        n_cells = len(cell_keys)
+        measures = {"Incidents": np.bincount(inverse, minlength=n_cells)}
+        for name, col in MEASURES.items():
+            if col not in df.columns:
+                continue
+            values = df[col].to_numpy()
+            sums = np.bincount(inverse, weights=values.astype("float64"), minlength=n_cells)
+            if values.dtype.kind in "iub":
+                sums = np.rint(sums).astype("int64")
+            measures[name] = sums
+        return cls(coords, members, measures)
+
+    def __len__(self):
+        return len(self.measures["Incidents"])
+
+    @property
+    def levels(self):
+        return list(self.coords)
+
+    def _cell_mask(self, where, dims=()):
+        mask = np.ones(len(self), dtype=bool)
+        for level, cond in (where or {}).items():
+            mask &= _member_mask(self.members[level], cond)[self.coords[level]]
+        # 與 groupby 相同：分組維度為缺值的 cell 不列入
+        for level in dims:
+            mask &= ~pd.isna(self.members[level])[self.coords[level]]
+        return mask
+
+    def slice(self, where):
+        """回傳只含符合條件 cell 的子 cube"""
+        mask = self._cell_mask(where)
+        return DelayCube(
+            {level: c[mask] for level, c in self.coords.items()},
+            self.members,
+            {name: m[mask] for name, m in self.measures.items()},
+        )
+
+    def _keys(self, dims, where):
+        """被選取 cell 的群組 key (dims 座標 ravel 後) 與 key 空間大小"""
+        mask = self._cell_mask(where, dims)
+        shape = tuple(len(self.members[d]) for d in dims)
+        key = np.ravel_multi_index([self.coords[d][mask].astype("int64") for d in dims], shape)
+        return mask, key, shape
+
+    def rollup(self, dims, where=None):
+        """
+        依 dims 彙總 (可搭配 where 過濾)，回傳以 dims 為 index 的 DataFrame
+        欄位：Incidents / Total Delay / Weighted Delay / Total Gap / Avg Delay
+        """
+        dims = list(dims)
+        if not dims:
+            mask = self._cell_mask(where)
+            result = pd.DataFrame({name: [m[mask].sum()] for name, m in self.measures.items()})
+            result["Avg Delay"] = result["Total Delay"] / result["Incidents"]
+            return result
+
+        mask, key, shape = self._keys(dims, where)
+        size = int(np.prod(shape))
+        if size <= DENSE_LIMIT:
+            # key 空間夠小：直接 bincount，不需排序
+            counts = np.bincount(key, minlength=size)
+            group_keys = np.flatnonzero(counts)
+            def group_sum(values):
+                return np.bincount(key, weights=values, minlength=size)[group_keys]
+        else:
+            group_keys, inverse = np.unique(key, return_inverse=True)
+            def group_sum(values):
+                return np.bincount(inverse, weights=values, minlength=len(group_keys))
+
+        data = {}
+        for name, m in self.measures.items():
+            sums = group_sum(m[mask])
+            data[name] = np.rint(sums).astype("int64") if m.dtype.kind in "iu" else sums
+        data["Avg Delay"] = data["Total Delay"] / data["Incidents"]
+
+        group_coords = np.unravel_index(group_keys, shape)
+        index_values = [self.members[d][c] for d, c in zip(dims, group_coords)]
+        if len(dims) == 1:
+            index = pd.Index(index_values[0], name=dims[0])
+        else:
+            index = pd.MultiIndex.from_arrays(index_values, names=dims)
+        return pd.DataFrame(data, index=index)
+
+    def dense(self, dims, measure="Total Delay", where=None):
+        """
+        依 dims 彙總成 dense NumPy 陣列 (沒有資料的格子為 0)
+        回傳 (array, [各維度的 member 值])
+        """
+        mask, key, shape = self._keys(list(dims), where)
+        values = self.measures[measure][mask]
+        flat = np.bincount(key, weights=values, minlength=int(np.prod(shape)))
+        if values.dtype.kind in "iu":
+            flat = np.rint(flat).astype("int64")
+        # 去掉缺值 member 的那一格
+        keep = [np.flatnonzero(~pd.isna(self.members[d])) for d in dims]
+        return flat.reshape(shape)[np.ix_(*keep)], [self.members[d][k] for d, k in zip(dims, keep)]
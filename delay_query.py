@@ -0,0 +1,217 @@
+"""
+TTC 地鐵延遲數據 - Lazy 查詢 API
+先組出查詢計畫 (過濾條件 + 需要的欄位)，collect() 時才把條件與欄位下推到 Parquet：
+Year / Date 條件會轉成 year=/month= 分區條件，只開需要的分區；
+其餘條件與欄位投影下推到檔案，並利用 row group 的 min/max 統計跳過不相關的區塊。
+
+範例:
+    DelayQuery().line("Line 2 Bloor-Danforth").weekdays_only().years(2025).group_by("Station").collect()
+"""
+
+import pandas as pd
+
+from data_store import ds, load_cleaned, open_dataset, table_to_frame
+
+WEEKDAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday"]
+
+# group_by 時需要的度量欄位
+MEASURE_COLUMNS = ["Min Delay", "Weighted Delay", "Min Gap"]
+
+
+def _as_date(value):
+    return pd.Timestamp(value).date()
+
+
+def _partition_term(column, op, value):
+    """Year / Date 條件對應的 year=/month= 分區條件 (其他欄位回傳 None)"""
+    year, month = ds.field("year"), ds.field("month")
+    if column == "Year" and op == "in":
+        return year.isin(list(value))
+    if column == "Date" and op in (">=", "<="):
+        y, m = value.year, value.month
+        if op == ">=":
+            return (year > y) | ((year == y) & (month >= m))
+        return (year < y) | ((year == y) & (month <= m))
+    return None
+
+
+class DelayQuery:
+    """
+    不可變的查詢計畫；每個方法回傳新的 DelayQuery
+
+    predicates: [(欄位, 運算子, 值)]，運算子為 "in" / ">=" / "<=" / "=="
+    """
+
+    def __init__(self, predicates=(), columns=None, dims=()):
+        self.predicates = tuple(predicates)
+        self.columns = tuple(columns) if columns is not None else None
+        self.dims = tuple(dims)
+
+    def _with(self, **changes):
+        params = {"predicates": self.predicates, "columns": self.columns, "dims": self.dims}
+        params.update(changes)
+        return DelayQuery(**params)
+
+    # ---------- 過濾條件 ----------
+
+    def where(self, column, op, value):
+        return self._with(predicates=self.predicates + ((column, op, value),))
+
+    def line(self, *lines):
+        return self.where("Line", "in", tuple(lines))
+
+    def station(self, *stations):
+        return self.where("Station", "in", tuple(stations))
+
+    def code(self, *codes):
+        return self.where("Code", "in", tuple(codes))
+
+    def years(self, *years):
+        return self.where("Year", "in", tuple(int(y) for y in years))
+
+    def date_range(self, start=None, end=None):
+        """含兩端的日期區間"""
+        query = self
+        if start is not None:
+            query = query.where("Date", ">=", _as_date(start))
+        if end is not None:
+            query = query.where("Date", "<=", _as_date(end))
+        return query
+
+    def weekdays_only(self):
+        return self.where("DayOfWeek", "in", tuple(WEEKDAYS))
+
+    def peak_only(self, definition="Is Peak Hour"):
+        return self.where(definition, "==", True)
+
+    def filter(self, where):
+        """
+        ReportEngine / DelayCube 形式的 where dict -> 查詢條件
+        值可為單一值、list/tuple/set、或 slice(start, stop) (含兩端；Date 以外的欄位同樣適用)
+        """
+        query = self
+        for column, cond in (where or {}).items():
+            if callable(cond):
+                raise ValueError(f"{column}: callable filters cannot be pushed down to storage")
+            if isinstance(cond, slice):
+                if column == "Date":
+                    query = query.date_range(cond.start, cond.stop)
+                    continue
+                if cond.start is not None:
+                    query = query.where(column, ">=", cond.start)
+                if cond.stop is not None:
+                    query = query.where(column, "<=", cond.stop)
+            elif isinstance(cond, (list, tuple, set, frozenset)):
+                query = query.where(column, "in", tuple(cond))
+            else:
+                query = query.where(column, "==", cond)
+        return query
+
+    # ---------- 投影 / 分組 ----------
+
+    def select(self, *columns):
+        return self._with(columns=columns)
+
+    def group_by(self, *dims):
+        return self._with(dims=dims)
+
+    def needed_columns(self):
+        """實際需要從儲存層讀取的欄位 (None 表示全部)"""
+        if self.dims:
+            return list(dict.fromkeys([*self.dims, *MEASURE_COLUMNS]))
+        if self.columns is not None:
+            return list(self.columns)
+        return None
+
+    # ---------- 執行 ----------
+
+    def _arrow_filter(self, partitions=True):
+        """predicates -> Arrow 運算式；partitions=False 時不含 year=/month= 分區條件"""
+        expr = None
+        for column, op, value in self.predicates:
+            field = ds.field(column)
+            if op == "in":
+                term = field.isin(list(value))
+            elif op == ">=":
+                term = field >= value
+            elif op == "<=":
+                term = field <= value
+            elif op == "==":
+                term = field == value
+            else:
+                raise ValueError(f"Unsupported operator: {op}")
+            partition_term = _partition_term(column, op, value) if partitions else None
+            if partition_term is not None:
+                term = partition_term & term
+            expr = term if expr is None else expr & term
+        return expr
+
+    def _pandas_mask(self, df):
+        mask = pd.Series(True, index=df.index)
+        for column, op, value in self.predicates:
+            col = df[column]
+            if column == "Date":
+                col = col.dt.date
+            if op == "in":
+                mask &= col.isin(list(value))
+            elif op == ">=":
+                mask &= col >= value
+            elif op == "<=":
+                mask &= col <= value
+            elif op == "==":
+                mask &= col == value
+            else:
+                raise ValueError(f"Unsupported operator: {op}")
+        return mask
+
+    def rows(self):
+        """執行過濾與欄位投影，回傳明細 DataFrame"""
+        columns = self.needed_columns()
+        dataset = open_dataset()
+        if dataset is not None:
+            return table_to_frame(dataset.to_table(columns=columns, filter=self._arrow_filter()))
+
+        # 沒有 Parquet：退回載入 CSV 後在 pandas 過濾
+        df = load_cleaned()
+        df = df[self._pandas_mask(df)]
+        return df if columns is None else df[columns]
+
+    def collect(self):
+        """有 group_by 時回傳彙總結果 (與 DelayCube.rollup 相同欄位)，否則回傳明細"""
+        df = self.rows()
+        if not self.dims:
+            return df
+        grouped = df.groupby(list(self.dims), observed=True)
+        result = pd.DataFrame({
+            "Incidents": grouped.size(),
+            "Total Delay": grouped["Min Delay"].sum(),
+            "Weighted Delay": grouped["Weighted Delay"].sum(),
+            "Total Gap": grouped["Min Gap"].sum(),
+        })
+        result["Avg Delay"] = result["Total Delay"] / result["Incidents"]
+        return result
+
+    def explain(self):
+        """列出查詢計畫與實際需要讀取的 row group 數"""
+        lines = [
+            f"columns: {self.needed_columns() or 'ALL'}",
+            f"filter: {self._arrow_filter() if ds is not None else self.predicates}",
+            f"group by: {list(self.dims) or '-'}",
+        ]
+        dataset = open_dataset()
+        if dataset is None:
+            lines.append("storage: CSV (no pushdown)")
+            return "\n".join(lines)
+
+        expr = self._arrow_filter()
+        all_fragments = list(dataset.get_fragments())
+        fragments = all_fragments if expr is None else list(dataset.get_fragments(filter=expr))
+        # 檔案內的欄位沒有 year / month，row group 統計只能用非分區條件
+        file_expr = self._arrow_filter(partitions=False)
+        row_groups = sum(
+            len(f.split_by_row_group(file_expr)) if file_expr is not None else f.metadata.num_row_groups
+            for f in fragments
+        )
+        lines.append(f"partitions: {len(fragments)}/{len(all_fragments)}")
+        lines.append(f"row groups: {row_groups}")
+        return "\n".join(lines)
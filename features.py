@@ -0,0 +1,189 @@
+"""
+TTC 地鐵延遲數據 - 向量化特徵計算
+取代各腳本中逐列 (row-wise) 的 apply / lambda：
+小時擷取、尖峰判斷、尖峰權重、代碼描述對照、車站名稱過濾。
+"""
+
+import re
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+# 尖峰時段 (起始小時, 結束小時)，結束不含
+PEAK_WINDOWS = ((7, 9), (16, 19))
+WEEKDAY_PEAK_WINDOWS = ((6, 9), (15, 19))
+PEAK_WEIGHT = 1.5
+
+# 具名尖峰定義：每個定義在清洗時存成一個布林欄位
+PEAK_DEFINITIONS = {
+    # 相對損害評分使用：每天 07:00-09:00, 16:00-19:00
+    "Is Peak Hour": {"windows": PEAK_WINDOWS, "weekdays_only": False},
+    # 通勤尖峰：週一至週五 06:00-09:00, 15:00-19:00
+    "Is Weekday Rush": {"windows": WEEKDAY_PEAK_WINDOWS, "weekdays_only": True},
+}
+# 決定 Peak Weight 的尖峰定義
+SCORING_PEAK = "Is Peak Hour"
+
+DERIVED_COLUMNS = ["Timestamp", "Year", "Month", "DayOfWeek", "Hour", *PEAK_DEFINITIONS, "Peak Weight", "Weighted Delay"]
+
+# 代碼前綴 fallback (對照表查不到時使用)
+CODE_PREFIX_FALLBACK = {
+    "MU": "Miscellaneous / Transportation",
+    "TU": "Track / Signal",
+    "PU": "Plant / Equipment",
+    "EU": "Equipment",
+    "SU": "Subway Service",
+    "ER": "SRT Equipment",
+}
+UNKNOWN_CODE = "Unknown Code"
+
+
+def _map_uniques(series, fn):
+    """
+    只對不重複值計算 fn，再廣播回每一列
+    fn 接收 pd.Series (不重複值)，回傳等長的 array；缺值位置回傳 NaN
+    """
+    codes, uniques = pd.factorize(series)
+    values = np.asarray(fn(pd.Series(np.asarray(uniques, dtype=object))))
+    if values.dtype.kind in "iub":
+        values = values.astype("float64")
+    out = np.empty(len(codes), dtype=values.dtype)
+    valid = codes >= 0
+    out[valid] = values[codes[valid]]
+    out[~valid] = np.nan
+    return out
+
+
+def extract_hour(times):
+    """'HH:MM' -> 小時 (float，無法解析時為 NaN)"""
+    times = pd.Series(times)
+
+    def parse(uniques):
+        # str.split 在空 Series 上仍回傳 Series (str.partition 會回傳沒有欄位的 DataFrame)
+        head = uniques.astype(str).str.split(":", n=1).str[0]
+        return pd.to_numeric(head, errors="coerce").to_numpy(dtype="float64")
+
+    return _map_uniques(times, parse)
+
+
+def extract_minutes(times):
+    """'HH:MM' -> 當天第幾分鐘 (float，無法解析時為 NaN；缺分鐘時視為整點)"""
+    times = pd.Series(times)
+
+    def parse(uniques):
+        parts = uniques.astype(str).str.split(":", n=2)
+        hours = pd.to_numeric(parts.str[0], errors="coerce")
+        minutes = pd.to_numeric(parts.str[1], errors="coerce").fillna(0)
+        return (hours * 60 + minutes).to_numpy(dtype="float64")
+
+    return _map_uniques(times, parse)
+
+
+def is_weekday(dates):
+    """週一至週五為 True"""
+    return (pd.to_datetime(pd.Series(dates)).dt.dayofweek < 5).to_numpy()
+
+
+def peak_mask(hours, windows=PEAK_WINDOWS, weekday=None):
+    """
+    尖峰判斷 (NumPy mask)
+    hours: 小時陣列 (NaN 視為非尖峰)
+    weekday: 若提供布林陣列，只有平日才算尖峰
+    """
+    h = np.asarray(hours, dtype="float64")
+    mask = np.zeros(len(h), dtype=bool)
+    for start, end in windows:
+        mask |= (h >= start) & (h < end)
+    if weekday is not None:
+        mask &= np.asarray(weekday, dtype=bool)
+    return mask
+
+
+def peak_weight(mask, multiplier=PEAK_WEIGHT):
+    """尖峰 x multiplier，離峰 x 1.0"""
+    return np.where(np.asarray(mask, dtype=bool), multiplier, 1.0)
+
+
+class CodeLookup:
+    """
+    代碼 -> 描述的查詢表
+    對照表與前兩碼 fallback ("<類別> - Unknown Subcode") 在建立時一次準備好，
+    describe() 只需對不重複代碼做一次 index 查詢再廣播回整欄。
+    """
+
+    def __init__(self, mapping, prefix_map=CODE_PREFIX_FALLBACK):
+        self.mapping = dict(mapping)
+        self.prefix_map = dict(prefix_map)
+        self.fallback = {p: f"{desc} - Unknown Subcode" for p, desc in self.prefix_map.items()}
+        self._codes = pd.Index(list(self.mapping), dtype=object)
+        self._descriptions = np.asarray(list(self.mapping.values()), dtype=object)
+
+    def __len__(self):
+        return len(self.mapping)
+
+    def _lookup(self, uniques):
+        keys = uniques.astype(str).str.strip()
+        pos = self._codes.get_indexer(keys)
+        desc = pd.Series(self._descriptions[pos], index=keys.index).where(pos >= 0)
+        desc = desc.fillna(keys.str[:2].map(self.fallback))
+        desc[keys.isin(["nan", ""])] = UNKNOWN_CODE
+        return desc.fillna(UNKNOWN_CODE).to_numpy(dtype=object)
+
+    def describe(self, codes):
+        """整欄代碼 -> 描述 (查不到時 fallback，否則 Unknown Code)"""
+        codes = pd.Series(codes)
+        out = _map_uniques(codes, self._lookup)
+        out[pd.isna(out)] = UNKNOWN_CODE
+        return pd.Series(out, index=codes.index, dtype=object)
+
+
+def map_code_descriptions(codes, mapping, prefix_map=CODE_PREFIX_FALLBACK):
+    """
+    整欄代碼 -> 描述
+    mapping 可為 dict 或已建好的 CodeLookup
+    """
+    lookup = mapping if isinstance(mapping, CodeLookup) else CodeLookup(mapping, prefix_map)
+    return lookup.describe(codes)
+
+
+@lru_cache(maxsize=None)
+def _keyword_pattern(keywords):
+    return re.compile("|".join(re.escape(k) for k in keywords), re.IGNORECASE)
+
+
+def valid_station_mask(stations, exclude_keywords):
+    """車站名稱不含任何排除關鍵字時為 True (單一編譯過的 regex)"""
+    pattern = _keyword_pattern(tuple(exclude_keywords))
+    hit = _map_uniques(
+        pd.Series(stations),
+        lambda uniques: uniques.astype(str).str.contains(pattern).to_numpy(dtype=bool),
+    )
+    return ~(hit == 1)
+
+
+def add_derived_features(df, peak_definitions=PEAK_DEFINITIONS, scoring_peak=SCORING_PEAK,
+                         multiplier=PEAK_WEIGHT):
+    """
+    衍生欄位 (清洗時計算一次並隨資料保存)
+    Timestamp (Date + Time) / Year / Month / DayOfWeek / Hour、每個具名尖峰定義一個布林欄位、
+    Peak Weight、Weighted Delay
+    """
+    dates = pd.to_datetime(df["Date"])
+    hours = extract_hour(df["Time"])
+    weekday = (dates.dt.dayofweek < 5).to_numpy()
+
+    minutes = np.nan_to_num(extract_minutes(df["Time"]), nan=0)
+    df["Timestamp"] = dates.dt.normalize() + pd.to_timedelta(minutes, unit="min")
+
+    df["Year"] = dates.dt.year
+    df["Month"] = dates.dt.strftime("%Y-%m")
+    df["DayOfWeek"] = dates.dt.day_name()
+    df["Hour"] = np.nan_to_num(hours, nan=0).astype("int64")
+
+    for name, spec in peak_definitions.items():
+        df[name] = peak_mask(hours, spec["windows"], weekday=weekday if spec["weekdays_only"] else None)
+
+    df["Peak Weight"] = peak_weight(df[scoring_peak], multiplier)
+    df["Weighted Delay"] = df["Min Delay"] * df["Peak Weight"]
+    return df
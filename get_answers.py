@@ -1,62 +1,60 @@
-import pandas as pd
 import os
 import sys
 
+from config import get_data_dir
+from instrumentation import instrumented, stage
+from report_engine import ReportEngine
+
 # File Path
-data_dir = r"c:\Users\tim01\Desktop\TTC"
-cleaned_file = os.path.join(data_dir, "TTC_Subway_Delay_Data_Combined_Cleaned.csv")
+data_dir = get_data_dir()
+output_file = os.path.join(data_dir, "answers.txt")
+
+def answers(engine):
+    """五個問題的答案 (get_answers 與 query_service 共用)"""
+    # 1. Monthly
+    top_month = engine.aggregate(['Month'])['Total Delay'].idxmax()
+
+    # 2. Daily
+    top_day = engine.aggregate(['DayOfWeek'])['Total Delay'].idxmax()
+
+    # 3. Peak/OffPeak
+    period_stats = engine.aggregate(['Is Weekday Rush'])['Total Delay']
+
+    # 4. Line
+    top_line = engine.aggregate(['Line'])['Total Delay'].idxmax()
+
+    # 5. Top 10 Causes
+    top_causes = engine.aggregate(['Code Description'])['Total Delay'].sort_values(ascending=False).head(10)
 
-def get_answers():
+    return {
+        "Top Month": top_month,
+        "Top Day": top_day,
+        "Peak Delay": period_stats.get(True, 0),
+        "Off-Peak Delay": period_stats.get(False, 0),
+        "Top Line": top_line,
+        "Top Causes": [(str(c).replace('\n', ' ').strip(), val) for c, val in top_causes.items()],
+    }
+
+@instrumented("answers")
+def get_answers(engine=None):
     sys.stdout.reconfigure(encoding='utf-8')
-    try:
-        df = pd.read_csv(cleaned_file, encoding='utf-8')
-    except:
-        df = pd.read_csv(cleaned_file, encoding='cp1252')
-        
-    df['Date'] = pd.to_datetime(df['Date'])
-    df['Min Delay'] = pd.to_numeric(df['Min Delay'], errors='coerce').fillna(0)
+    if engine is None:
+        engine = ReportEngine()
 
     # Write to file
-    with open(r'c:\Users\tim01\Desktop\TTC\answers.txt', 'w', encoding='utf-8') as f:
+    with open(output_file, 'w', encoding='utf-8') as f:
         sys.stdout = f
         
-        print("--- ANSWERS START ---")
-        
-        # 1. Monthly
-        df['Month'] = df['Date'].dt.to_period('M')
-        top_month = df.groupby('Month')['Min Delay'].sum().idxmax()
-        print(f"Top Month: {top_month}")
-
-        # 2. Daily
-        df['DayOfWeek'] = df['Date'].dt.day_name()
-        top_day = df.groupby('DayOfWeek')['Min Delay'].sum().idxmax()
-        print(f"Top Day: {top_day}")
-
-        # 3. Peak/OffPeak
-        def is_peak(row):
-            day = row['DayOfWeek']
-            if day in ['Saturday', 'Sunday']: return 'Off-Peak'
-            try:
-                h = int(str(row['Time']).split(':')[0])
-                if (6 <= h < 9) or (15 <= h < 19): return 'Peak'
-            except: pass
-            return 'Off-Peak'
-
-        df['Period'] = df.apply(is_peak, axis=1)
-        period_stats = df.groupby('Period')['Min Delay'].sum()
-        print(f"Peak Delay: {period_stats.get('Peak', 0)}")
-        print(f"Off-Peak Delay: {period_stats.get('Off-Peak', 0)}")
+        with stage("answers.report"):
+            print("--- ANSWERS START ---")
 
-        # 4. Line
-        top_line = df.groupby('Line')['Min Delay'].sum().idxmax()
-        print(f"Top Line: {top_line}")
+            result = answers(engine)
+            for key in ["Top Month", "Top Day", "Peak Delay", "Off-Peak Delay", "Top Line"]:
+                print(f"{key}: {result[key]}")
 
-        # 5. Top 10 Causes
-        top_causes = df.groupby('Code Description')['Min Delay'].sum().sort_values(ascending=False).head(10)
-        print("Top 10 Causes by Duration:")
-        for c, val in top_causes.items():
-            safe_c = str(c).replace('\n', ' ').strip()
-            print(f"CAUSE: {safe_c} || MINS: {val}")
+            print("Top 10 Causes by Duration:")
+            for safe_c, val in result["Top Causes"]:
+                print(f"CAUSE: {safe_c} || MINS: {val}")
 
         print("--- ANSWERS END ---")
         sys.stdout = sys.__stdout__
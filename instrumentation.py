@@ -0,0 +1,175 @@
+"""
+TTC 地鐵延遲數據 - 階段計時 / 記憶體紀錄
+各腳本把主要步驟包在 stage(...) 中 (或以 @instrumented 裝飾)，每個階段結束時寫一行 JSON 到
+instrumentation.jsonl：牆鐘時間、CPU 時間、RSS 與峰值 RSS、輸入 / 輸出列數。
+報表內容仍照舊輸出到結果檔，計時資料不會混進 stdout。
+
+環境變數:
+    TTC_TRACE=0           不記錄
+    TTC_TRACE=<path>      改寫到指定檔案
+    TTC_PROFILE=1         每個最外層階段另外以 cProfile 輸出到 profiles/<stage>-<pid>.prof
+    TTC_PROFILE=<dir>     .prof 輸出到指定資料夾 (可用 pstats / snakeviz 開啟)
+
+用法:
+    with stage("clean.read", file=name) as rec:
+        raw = read_source(path)
+        rec["rows_out"] = len(raw)
+"""
+
+import cProfile
+import contextlib
+import functools
+import json
+import os
+import sys
+import time
+
+from config import get_data_dir
+
+data_dir = get_data_dir()
+trace_file = os.path.join(data_dir, "instrumentation.jsonl")
+profile_dir = os.path.join(data_dir, "profiles")
+
+# 同一次執行的識別 (子行程各自有自己的 pid)
+RUN_ID = f"{time.strftime('%Y%m%dT%H%M%S')}-{os.getpid()}"
+
+_stack = []
+
+
+def _proc_status(field):
+    """Linux: /proc/self/status 中的記憶體欄位 (MB)；其他平台回傳 None"""
+    try:
+        with open("/proc/self/status", "r", encoding="ascii") as fh:
+            for line in fh:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def rss_mb():
+    """目前 RSS (MB)；非 Linux 需要 psutil，否則回傳 None"""
+    value = _proc_status("VmRSS")
+    if value is not None:
+        return value
+    try:
+        import psutil
+    except ImportError:
+        return None
+    return psutil.Process().memory_info().rss / (1024 * 1024)
+
+
+def peak_rss_mb():
+    """
+    行程的峰值 RSS (MB)
+    Linux 讀 VmHWM (ru_maxrss 會沿用 fork 前父行程的峰值)，其他 Unix 用 resource，Windows 需要 psutil
+    """
+    value = _proc_status("VmHWM")
+    if value is not None:
+        return value
+    try:
+        import resource
+    except ImportError:
+        resource = None
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+    try:
+        import psutil
+    except ImportError:
+        return None
+    info = psutil.Process().memory_info()
+    return getattr(info, "peak_wset", info.rss) / (1024 * 1024)
+
+
+def _trace_path():
+    setting = os.environ.get("TTC_TRACE", "")
+    if setting == "0":
+        return None
+    return setting or trace_file
+
+
+def _profile_path(name):
+    setting = os.environ.get("TTC_PROFILE", "")
+    if not setting or setting == "0":
+        return None
+    directory = profile_dir if setting == "1" else setting
+    return os.path.join(directory, f"{name}-{os.getpid()}.prof")
+
+
+def _emit(record):
+    path = _trace_path()
+    if path is None or not os.path.isdir(os.path.dirname(os.path.abspath(path))):
+        return
+    # 一行一次寫入 (append)，多個行程同時寫也不會交錯
+    with open(path, "a", encoding="utf-8") as fh:
+        fh.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+
+
+def _round(value, digits=1):
+    return None if value is None else round(value, digits)
+
+
+@contextlib.contextmanager
+def stage(name, rows_in=None, **fields):
+    """
+    記錄一個階段；yield 的 dict 可在階段內補上 rows_out 或其他欄位
+    最外層階段在 TTC_PROFILE 設定時另外以 cProfile 記錄
+    """
+    record = {"rows_in": rows_in, "rows_out": None, **fields}
+    parent = _stack[-1] if _stack else None
+    _stack.append(name)
+
+    profile_path = _profile_path(name) if parent is None else None
+    profiler = None
+    if profile_path is not None:
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:  # 已有其他 profiler 在執行
+            profiler = None
+
+    rss_before = rss_mb()
+    wall, cpu = time.perf_counter(), time.process_time()
+    ok = False
+    try:
+        yield record
+        ok = True
+    finally:
+        wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+        _stack.pop()
+        if profiler is not None:
+            profiler.disable()
+            os.makedirs(os.path.dirname(profile_path), exist_ok=True)
+            profiler.dump_stats(profile_path)
+            record["profile"] = profile_path
+        rss_after = rss_mb()
+        _emit({
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "run": RUN_ID,
+            "pid": os.getpid(),
+            "script": os.path.basename(sys.argv[0]) if sys.argv and sys.argv[0] else None,
+            "stage": name,
+            "parent": parent,
+            "ok": ok,
+            "wall_s": round(wall, 4),
+            "cpu_s": round(cpu, 4),
+            "rss_mb": _round(rss_after),
+            "rss_delta_mb": _round(rss_after - rss_before) if rss_after is not None and rss_before is not None else None,
+            "peak_rss_mb": _round(peak_rss_mb()),
+            **record,
+        })
+
+
+def instrumented(name=None):
+    """函式層級的 stage (預設以 module.function 命名)"""
+    def decorate(fn):
+        stage_name = name or f"{fn.__module__}.{fn.__name__}"
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with stage(stage_name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
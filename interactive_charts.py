@@ -1,17 +1,36 @@
 """
 TTC 地鐵延遲數據 - 互動式圖表生成器
 使用 Plotly 產生互動式 HTML 圖表
+
+每張圖分成兩步：prepare_* 從共用引擎取出小型彙總表 (主行程)，
+build_* 只用這些彙總表畫圖 (可在 process pool 中平行執行)。
+所有 HTML 共用 charts/ 目錄中的一份 plotly.min.js，不再各自內嵌整個 plotly.js。
 """
 
+import numpy as np
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
+from plotly.offline import get_plotlyjs
 from plotly.subplots import make_subplots
+import plotly.io as pio
+import plotly
+import argparse
+import hashlib
+import json
 import os
+from concurrent.futures import ProcessPoolExecutor
+from importlib import metadata
+
+from config import get_data_dir
+from instrumentation import instrumented, stage
+from report_engine import ReportEngine
+from rolling import ROLLING_WINDOWS, rolling_reliability
+from scoring import DEFAULT_CONFIG, reliability, scored
+from timeline import incident_timeline, marker_sizes
 
 # 檔案路徑
-data_dir = r"c:\Users\tim01\Desktop\TTC"
-cleaned_file = os.path.join(data_dir, "TTC_Subway_Delay_Data_Combined_Cleaned.csv")
+data_dir = get_data_dir()
 output_dir = os.path.join(data_dir, "charts")
 
 # 建立輸出資料夾
@@ -24,37 +43,34 @@ COLORS = {
     "Line 4 Sheppard": "#A349A4",          # 紫色
 }
 
+# 共用的 plotly.js (所有 HTML 以 <script src="plotly.min.js"> 引用)
+PLOTLY_BUNDLE = "plotly.min.js"
+
+# 靜態圖片 (README / 報告用)；manifest 記錄每張圖的 spec hash，沒變的圖不重新輸出
+STATIC_FORMAT = "png"
+STATIC_WIDTH = 1200
+STATIC_SCALE = 1.5
+# 批次輸出 (pio.write_images) 需要的最低版本
+STATIC_MIN_PLOTLY = "6.1"
+STATIC_MIN_KALEIDO = "1.0"
+static_manifest = os.path.join(output_dir, "_static_manifest.json")
+
+
 def load_data():
-    """載入並預處理數據"""
-    try:
-        df = pd.read_csv(cleaned_file, encoding="utf-8")
-    except:
-        df = pd.read_csv(cleaned_file, encoding="cp1252")
-    
-    df["Date"] = pd.to_datetime(df["Date"])
-    df["Min Delay"] = pd.to_numeric(df["Min Delay"], errors="coerce").fillna(0)
-    df["Month"] = df["Date"].dt.to_period("M").astype(str)
-    df["DayOfWeek"] = df["Date"].dt.day_name()
-    df["Hour"] = df["Time"].apply(lambda x: int(str(x).split(":")[0]) if pd.notna(x) else 0)
-    
-    # 尖峰時段加權
-    if "Is Peak Hour" not in df.columns:
-        df["Is Peak Hour"] = df["Hour"].apply(lambda h: (7 <= h < 9) or (16 <= h < 19))
-    
-    df["Peak Weight"] = df["Is Peak Hour"].apply(lambda x: 1.5 if x else 1.0)
-    df["Weighted Delay"] = df["Min Delay"] * df["Peak Weight"]
-    
-    return df
+    """載入數據並建立共用彙總引擎 (Month / DayOfWeek / Hour / 尖峰加權已在清洗時計算)"""
+    return ReportEngine()
 
 
-def chart_line_comparison(df):
-    """圖表 1: 路線延遲比較 (柱狀圖 + 餅圖)"""
-    
-    line_stats = df.groupby("Line").agg({
-        "Min Delay": ["sum", "count", "mean"],
-        "Weighted Delay": "sum"
-    }).reset_index()
+def prepare_line_comparison(engine):
+    line_stats = engine.aggregate(["Line"])[
+        ["Total Delay", "Incidents", "Avg Delay", "Weighted Delay"]
+    ].reset_index()
     line_stats.columns = ["Line", "Total Delay", "Incident Count", "Avg Delay", "Weighted Penalty"]
+    return line_stats
+
+
+def build_line_comparison(line_stats):
+    """圖表 1: 路線延遲比較 (柱狀圖 + 餅圖)"""
     
     fig = make_subplots(
         rows=1, cols=2,
@@ -93,19 +109,21 @@ def chart_line_comparison(df):
         showlegend=False,
         height=500
     )
-    
-    fig.write_html(os.path.join(output_dir, "01_line_comparison.html"))
-    print("[OK] Chart 1: Line Comparison generated")
+    return fig
 
 
-def chart_monthly_trend(df):
-    """圖表 2: 月度趨勢圖"""
-    
-    monthly = df.groupby(["Month", "Line"]).agg({
-        "Min Delay": "sum",
-        "Date": "count"
-    }).reset_index()
+def _monthly_trend(engine):
+    monthly = engine.aggregate(["Month", "Line"])[["Total Delay", "Incidents"]].reset_index()
     monthly.columns = ["Month", "Line", "Total Delay", "Incident Count"]
+    return monthly
+
+
+def prepare_monthly_trend(engine):
+    return engine.memo("monthly_trend", {}, _monthly_trend)
+
+
+def build_monthly_trend(monthly):
+    """圖表 2: 月度趨勢圖"""
     
     fig = px.line(
         monthly,
@@ -123,22 +141,27 @@ def chart_monthly_trend(df):
         legend_title_text="Line",
         height=500
     )
-    
-    fig.write_html(os.path.join(output_dir, "02_monthly_trend.html"))
-    print("[OK] Chart 2: Monthly Trend generated")
+    return fig
 
 
-def chart_hourly_heatmap(df):
-    """圖表 3: 時段熱力圖"""
-    
-    # 星期排序
-    day_order = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
-    
-    hourly = df.groupby(["DayOfWeek", "Hour"])["Min Delay"].sum().reset_index()
-    hourly_pivot = hourly.pivot(index="DayOfWeek", columns="Hour", values="Min Delay").fillna(0)
+# 星期排序
+DAY_ORDER = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+
+
+def _hourly_pivot(engine):
+    values, (days, hours) = engine.cube.dense(["DayOfWeek", "Hour"], "Total Delay")
+    hourly_pivot = pd.DataFrame(values, index=days, columns=hours)
     
     # 按星期排序
-    hourly_pivot = hourly_pivot.reindex(day_order)
+    return hourly_pivot.reindex(DAY_ORDER)
+
+
+def prepare_hourly_heatmap(engine):
+    return engine.memo("hourly_heatmap", {"days": DAY_ORDER}, _hourly_pivot)
+
+
+def build_hourly_heatmap(hourly_pivot):
+    """圖表 3: 時段熱力圖"""
     
     fig = px.imshow(
         hourly_pivot,
@@ -150,43 +173,28 @@ def chart_hourly_heatmap(df):
     )
     
     fig.update_layout(height=400)
-    
-    fig.write_html(os.path.join(output_dir, "03_hourly_heatmap.html"))
-    print("[OK] Chart 3: Hourly Heatmap generated")
+    return fig
 
 
-def chart_station_reliability(df):
-    """圖表 4: 車站可靠性排名 (水平柱狀圖)"""
-    
-    # 過濾條件
-    MIN_INCIDENTS = 50
-    EXCLUDE_KEYWORDS = ["APPROACHING", " TO ", "BUILDING", "TRACK LEVEL", "CENTRE TRACK"]
-    
-    station_stats = df.groupby("Station").agg({
-        "Weighted Delay": "sum",
-        "Min Delay": "count"
-    }).reset_index()
-    station_stats.columns = ["Station", "Weighted Penalty", "Incident Count"]
-    
-    # 過濾
-    def is_valid(name):
-        for kw in EXCLUDE_KEYWORDS:
-            if kw in str(name).upper():
-                return False
-        return True
-    
-    station_stats = station_stats[
-        (station_stats["Incident Count"] >= MIN_INCIDENTS) &
-        (station_stats["Station"].apply(is_valid))
-    ]
-    
-    max_penalty = station_stats["Weighted Penalty"].max()
-    station_stats["Reliability Score"] = 100 - (station_stats["Weighted Penalty"] / max_penalty * 100)
+# 圖表用的車站評分設定 (排除關鍵字較少)
+CHART_SCORING = DEFAULT_CONFIG.replace(
+    exclude_keywords=["APPROACHING", " TO ", "BUILDING", "TRACK LEVEL", "CENTRE TRACK"]
+)
+
+
+def prepare_station_reliability(engine):
+    station_stats = scored(reliability(engine, "Station", CHART_SCORING))
     
     # Top 15 最差 + Top 15 最好
     worst = station_stats.nsmallest(15, "Reliability Score")
     best = station_stats.nlargest(15, "Reliability Score")
+    return worst, best
+
+
+def build_station_reliability(data):
+    """圖表 4: 車站可靠性排名 (水平柱狀圖)"""
     
+    worst, best = data
     fig = make_subplots(
         rows=1, cols=2,
         subplot_titles=("⚠️ 15 Least Reliable Stations", "✅ 15 Most Reliable Stations"),
@@ -228,21 +236,20 @@ def chart_station_reliability(df):
     )
     
     fig.update_xaxes(range=[0, 100])
-    
-    fig.write_html(os.path.join(output_dir, "04_station_reliability.html"))
-    print("[OK] Chart 4: Station Reliability generated")
+    return fig
 
 
-def chart_peak_comparison(df):
-    """圖表 5: 尖峰 vs 離峰比較"""
-    
-    peak_stats = df.groupby("Is Peak Hour").agg({
-        "Min Delay": ["sum", "count", "mean"]
-    }).reset_index()
+def prepare_peak_comparison(engine):
+    peak_stats = engine.aggregate(["Is Peak Hour"])[["Total Delay", "Incidents", "Avg Delay"]].reset_index()
     peak_stats.columns = ["Is Peak Hour", "Total Delay", "Incident Count", "Avg Delay"]
     peak_stats["Period"] = peak_stats["Is Peak Hour"].apply(
         lambda x: "Peak (07-09, 16-19)" if x else "Off-Peak"
     )
+    return peak_stats
+
+
+def build_peak_comparison(peak_stats):
+    """圖表 5: 尖峰 vs 離峰比較"""
     
     fig = make_subplots(
         rows=1, cols=3,
@@ -289,19 +296,17 @@ def chart_peak_comparison(df):
         height=400,
         showlegend=False
     )
-    
-    fig.write_html(os.path.join(output_dir, "05_peak_comparison.html"))
-    print("[OK] Chart 5: Peak Comparison generated")
+    return fig
 
 
-def chart_delay_causes(df):
-    """圖表 6: 延遲原因分析 (Sunburst)"""
-    
-    cause_stats = df.groupby("Code Description").agg({
-        "Min Delay": ["sum", "count"]
-    }).reset_index()
+def prepare_delay_causes(engine):
+    cause_stats = engine.aggregate(["Code Description"])[["Total Delay", "Incidents"]].reset_index()
     cause_stats.columns = ["Cause", "Total Delay", "Count"]
-    cause_stats = cause_stats.nlargest(15, "Total Delay")
+    return cause_stats.nlargest(15, "Total Delay")
+
+
+def build_delay_causes(cause_stats):
+    """圖表 6: 延遲原因分析 (Sunburst)"""
     
     fig = px.sunburst(
         cause_stats,
@@ -316,19 +321,27 @@ def chart_delay_causes(df):
     fig.update_traces(
         hovertemplate="<b>%{label}</b><br>Total Delay: %{value:,.0f} min<extra></extra>"
     )
-    
-    fig.write_html(os.path.join(output_dir, "06_delay_causes.html"))
-    print("[OK] Chart 6: Delay Causes generated")
+    return fig
 
 
-def create_dashboard(df):
-    """圖表 7: 綜合儀表板"""
-    
+def prepare_dashboard(engine):
     # 統計數據
-    total_incidents = len(df)
-    total_delay = df["Min Delay"].sum()
-    avg_delay = df["Min Delay"].mean()
-    peak_incidents = df["Is Peak Hour"].sum()
+    totals = engine.totals()
+    return {
+        "total_incidents": totals["Incidents"],
+        "total_delay": totals["Total Delay"],
+        "avg_delay": totals["Avg Delay"],
+        "peak_incidents": engine.aggregate(["Is Peak Hour"])["Incidents"].get(True, 0),
+    }
+
+
+def build_dashboard(stats):
+    """圖表 0: 綜合儀表板"""
+    
+    total_incidents = stats["total_incidents"]
+    total_delay = stats["total_delay"]
+    avg_delay = stats["avg_delay"]
+    peak_incidents = stats["peak_incidents"]
     
     fig = make_subplots(
         rows=2, cols=2,
@@ -373,29 +386,265 @@ def create_dashboard(df):
         title_font_size=28,
         height=500
     )
+    return fig
+
+
+# 滾動視窗圖表中顯示的車站數 (全期最不可靠的幾個)
+ROLLING_STATIONS = 10
+
+
+def prepare_rolling_reliability(engine):
+    lines = rolling_reliability(engine, "Line")
+    worst = scored(reliability(engine, "Station")).nsmallest(ROLLING_STATIONS, "Reliability Score")["Station"]
+    stations = rolling_reliability(engine, "Station")
+    stations = stations[stations["Station"].isin(set(worst))]
+    return lines.dropna(subset=["Reliability Score"]), stations.dropna(subset=["Reliability Score"])
+
+
+def build_rolling_reliability(data):
+    """圖表 7: 滾動 30 / 90 天可靠性分數 (下拉選單切換路線 / 車站與視窗)"""
+    
+    lines, stations = data
+    fig = go.Figure()
+    groups = []
+    for entity, frame in (("Line", lines), ("Station", stations)):
+        for size in ROLLING_WINDOWS:
+            window = frame[frame["Window"] == size]
+            traces = []
+            for name, series in window.groupby(entity, sort=True):
+                traces.append(len(fig.data))
+                fig.add_trace(go.Scatter(
+                    x=series["Date"],
+                    y=series["Reliability Score"],
+                    mode="lines",
+                    name=name,
+                    line_color=COLORS.get(name) if entity == "Line" else None,
+                    visible=not groups,
+                    hovertemplate=f"<b>{name}</b><br>%{{x|%Y-%m-%d}}<br>{size}-day score: %{{y:.1f}}<extra></extra>",
+                ))
+            label = f"{'Lines' if entity == 'Line' else f'{ROLLING_STATIONS} least reliable stations'} ({size}-day)"
+            groups.append((label, traces))
+    
+    buttons = []
+    for label, traces in groups:
+        visible = [False] * len(fig.data)
+        for i in traces:
+            visible[i] = True
+        buttons.append(dict(label=label, method="update", args=[{"visible": visible}]))
     
-    fig.write_html(os.path.join(output_dir, "00_dashboard.html"))
-    print("[OK] Chart 0: Dashboard generated")
+    fig.update_layout(
+        title_text="📉 Rolling Reliability Score",
+        updatemenus=[dict(buttons=buttons, direction="down", x=0, xanchor="left", y=1.12, yanchor="top")],
+        yaxis=dict(title="Reliability Score", range=[0, 100]),
+        hovermode="closest",
+        height=550
+    )
+    return fig
 
 
-def main():
+def prepare_incident_timeline(engine, window=None):
+    return incident_timeline(engine, window)
+
+
+def build_incident_timeline(timeline):
+    """
+    圖表 8: 事故時間軸 (WebGL Scattergl)
+    個別事故：點的大小依延遲分鐘；分箱：每個 (時間箱, 車站, 路線) 一個點，大小依事故數
+    """
+    
+    data = timeline["data"]
+    start, end = timeline["window"]
+    fig = go.Figure()
+    for line, rows in data.groupby("Line", sort=True):
+        if timeline["mode"] == "points":
+            fig.add_trace(go.Scattergl(
+                x=rows["Timestamp"],
+                y=rows["Station"],
+                mode="markers",
+                name=line,
+                marker=dict(
+                    color=COLORS.get(line, "#888"),
+                    size=marker_sizes(rows["Min Delay"], smallest=4, largest=18),
+                    opacity=0.7,
+                    line=dict(width=0.5, color="#555"),
+                ),
+                customdata=np.column_stack([rows["Min Delay"], rows["Code Description"].astype(object)]),
+                hovertemplate="<b>%{y}</b><br>%{x|%Y-%m-%d %H:%M}<br>Delay: %{customdata[0]} min"
+                              "<br>%{customdata[1]}<extra>" + line + "</extra>",
+            ))
+        else:
+            half_bin = pd.Timedelta(timeline["width"]) / 2
+            fig.add_trace(go.Scattergl(
+                x=rows["Bin"] + half_bin,
+                y=rows["Station"],
+                mode="markers",
+                name=line,
+                marker=dict(
+                    color=COLORS.get(line, "#888"),
+                    size=marker_sizes(rows["Incidents"]),
+                    opacity=0.6,
+                ),
+                customdata=np.column_stack([rows["Incidents"], rows["Total Delay"]]),
+                hovertemplate="<b>%{y}</b><br>%{x|%Y-%m-%d %H:%M} (" + timeline["width"] + " bin)"
+                              "<br>Incidents: %{customdata[0]}<br>Total Delay: %{customdata[1]:,.0f} min"
+                              "<extra>" + line + "</extra>",
+            ))
+    
+    if timeline["mode"] == "points":
+        detail = "individual incidents, size = delay"
+    else:
+        detail = f"binned by {timeline['width']}, size = incidents; zoom in for individual incidents"
+    stations = timeline["stations"]
+    fig.update_layout(
+        title_text=f"🕒 Incident Timeline ({timeline['incidents']:,} incidents; {detail})",
+        xaxis=dict(title="Time", range=[start, end], type="date"),
+        yaxis=dict(title="Station", categoryorder="array", categoryarray=stations[::-1], type="category"),
+        hovermode="closest",
+        legend_title_text="Line",
+        height=max(500, 18 * len(stations) + 150),
+        uirevision="incident_timeline"
+    )
+    return fig
+
+
+# 圖表註冊表：(輸出檔名, 說明, prepare(engine) -> 彙總資料, build(彙總資料) -> Figure)
+CHARTS = [
+    ("00_dashboard.html", "Chart 0: Dashboard", prepare_dashboard, build_dashboard),
+    ("01_line_comparison.html", "Chart 1: Line Comparison", prepare_line_comparison, build_line_comparison),
+    ("02_monthly_trend.html", "Chart 2: Monthly Trend", prepare_monthly_trend, build_monthly_trend),
+    ("03_hourly_heatmap.html", "Chart 3: Hourly Heatmap", prepare_hourly_heatmap, build_hourly_heatmap),
+    ("04_station_reliability.html", "Chart 4: Station Reliability", prepare_station_reliability, build_station_reliability),
+    ("05_peak_comparison.html", "Chart 5: Peak Comparison", prepare_peak_comparison, build_peak_comparison),
+    ("06_delay_causes.html", "Chart 6: Delay Causes", prepare_delay_causes, build_delay_causes),
+    ("07_rolling_reliability.html", "Chart 7: Rolling Reliability", prepare_rolling_reliability, build_rolling_reliability),
+    ("08_incident_timeline.html", "Chart 8: Incident Timeline", prepare_incident_timeline, build_incident_timeline),
+]
+
+
+def ensure_plotly_bundle():
+    """把 plotly.js 寫到 charts/ 一次 (版本不同時覆蓋)"""
+    bundle = get_plotlyjs()
+    path = os.path.join(output_dir, PLOTLY_BUNDLE)
+    if os.path.exists(path) and os.path.getsize(path) == len(bundle.encode("utf-8")):
+        return
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(bundle)
+
+
+def render_chart(filename, label, build, data, with_spec=False):
+    """
+    畫圖並寫出 HTML (引用共用的 plotly.min.js)；可在子行程執行
+    with_spec=True 時一併回傳 figure JSON，供主行程輸出靜態圖片
+    """
+    with stage("charts.build", chart=filename):
+        fig = build(data)
+    with stage("charts.write_html", chart=filename):
+        fig.write_html(os.path.join(output_dir, filename), include_plotlyjs="directory")
+    return f"[OK] {label} generated", fig.to_json() if with_spec else None
+
+
+def generate_charts(engine, workers=None, static=False):
+    """
+    在主行程依序 prepare (只需要 engine 的彙總)，再把 build + 寫檔平行交給 process pool
+    workers 預設為 CPU 數；結果依 CHARTS 順序列印
+    static=True 時所有圖表最後一次批次輸出 PNG (見 export_static)
+    """
+    ensure_plotly_bundle()
+    jobs = []
+    for filename, label, prepare, build in CHARTS:
+        with stage("charts.prepare", chart=filename):
+            jobs.append((filename, label, build, prepare(engine), static))
+
+    workers = min(workers or os.cpu_count() or 1, len(jobs))
+    if workers <= 1:
+        results = [render_chart(*job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(render_chart, *zip(*jobs)))
+    for message, _ in results:
+        print(message)
+
+    if static:
+        specs = [
+            (os.path.splitext(filename)[0] + "." + STATIC_FORMAT, spec)
+            for (filename, *_), (_, spec) in zip(jobs, results)
+        ]
+        with stage("charts.export_static", rows_in=len(specs)):
+            export_static(specs)
+
+
+def _spec_hash(spec, width, scale):
+    """figure JSON + 輸出參數 + plotly 版本 -> hash"""
+    key = json.dumps([spec, width, scale, plotly.__version__])
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+
+def export_static(specs, width=STATIC_WIDTH, scale=STATIC_SCALE):
+    """
+    批次輸出靜態圖片：specs 為 [(輸出檔名, figure JSON)]，可包含任意數量的圖 (例如每條路線 / 每個車站的變化版本)
+    只有 spec hash 與上次不同 (或檔案不存在) 的圖會重畫，
+    並以一次 pio.write_images 呼叫完成，整批共用同一個 Kaleido 瀏覽器 session。
+    """
+    try:
+        import kaleido  # noqa: F401
+    except ImportError:
+        print("kaleido not installed, skipping static export (pip install kaleido).")
+        return
+    # pio.write_images (整批共用一個 session) 是 plotly 6.1 / kaleido 1.0 才有的 API
+    if not hasattr(pio, "write_images") or int(metadata.version("kaleido").split(".")[0]) < 1:
+        raise RuntimeError(
+            f"static export requires plotly>={STATIC_MIN_PLOTLY} and kaleido>={STATIC_MIN_KALEIDO} "
+            f"(found plotly {plotly.__version__}, kaleido {metadata.version('kaleido')}); "
+            f'pip install -U "plotly>={STATIC_MIN_PLOTLY}" "kaleido>={STATIC_MIN_KALEIDO}"'
+        )
+
+    manifest = {}
+    if os.path.exists(static_manifest):
+        with open(static_manifest, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+
+    pending = []
+    for filename, spec in specs:
+        digest = _spec_hash(spec, width, scale)
+        path = os.path.join(output_dir, filename)
+        if manifest.get(filename) == digest and os.path.exists(path):
+            continue
+        pending.append((filename, path, json.loads(spec), digest))
+
+    skipped = len(specs) - len(pending)
+    if pending:
+        pio.write_images(
+            [fig for _, _, fig, _ in pending],
+            [path for _, path, _, _ in pending],
+            format=STATIC_FORMAT,
+            width=width,
+            height=[fig.get("layout", {}).get("height") for _, _, fig, _ in pending],
+            scale=scale,
+        )
+        for filename, _, _, digest in pending:
+            manifest[filename] = digest
+        with open(static_manifest, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+
+    print(f"[OK] Static images: {len(pending)} rendered, {skipped} unchanged")
+
+
+@instrumented("charts")
+def main(engine=None, workers=None, static=False):
     print("=" * 50)
     print("  TTC 互動式圖表生成器")
     print("=" * 50)
     
-    print("\n載入數據...")
-    df = load_data()
-    print(f"已載入 {len(df)} 筆資料\n")
+    with stage("charts.load") as rec:
+        if engine is None:
+            print("\n載入數據...")
+            engine = load_data()
+        rec["rows_out"] = int(engine.totals()["Incidents"])
+    print(f"已載入 {rec['rows_out']} 筆資料\n")
     
     print("生成圖表中...\n")
     
-    create_dashboard(df)
-    chart_line_comparison(df)
-    chart_monthly_trend(df)
-    chart_hourly_heatmap(df)
-    chart_station_reliability(df)
-    chart_peak_comparison(df)
-    chart_delay_causes(df)
+    generate_charts(engine, workers, static=static)
     
     print("\n" + "=" * 50)
     print(f"All charts saved to: {output_dir}")
@@ -404,5 +653,8 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
-
+    parser = argparse.ArgumentParser(description="Generate interactive TTC delay charts")
+    parser.add_argument("--workers", type=int, default=None, help="chart builder processes (default: CPU count)")
+    parser.add_argument("--static", action="store_true", help=f"also export {STATIC_FORMAT.upper()} images (needs kaleido)")
+    args = parser.parse_args()
+    main(workers=args.workers, static=args.static)
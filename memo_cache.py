@@ -0,0 +1,115 @@
+"""
+TTC 地鐵延遲數據 - 彙總結果的磁碟快取 (memoization)
+key = (dataset 版本, 彙總名稱, 參數)；資料與參數都沒變時直接讀回上次的結果，不必重新載入資料、建 cube。
+
+每個結果存成 memo_cache/<key>.pkl；讀取時更新檔案 mtime，
+總大小超過上限時從最久沒用到的檔案開始刪除 (LRU)。
+用檔案 mtime 而不是共用索引檔記錄使用時間，多個行程同時讀寫也不會互相覆蓋。
+"""
+
+import hashlib
+import json
+import os
+import pickle
+from functools import lru_cache
+
+from config import get_data_dir
+from data_store import dataset_version
+
+data_dir = get_data_dir()
+cache_dir = os.path.join(data_dir, "memo_cache")
+
+# 彙總邏輯改變時 +1，讓舊結果全部失效
+MEMO_VERSION = 1
+# 快取目錄大小上限
+MAX_CACHE_BYTES = 256 * 1024 * 1024
+
+
+def memo_key(name, params, version):
+    """彙總名稱 + 參數 + dataset 版本 -> 檔名用的 hash"""
+    payload = json.dumps([MEMO_VERSION, name, params, version], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class MemoCache:
+    """
+    directory: 快取目錄 (預設 cache_dir)
+    max_bytes: 目錄大小上限 (超過時依 LRU 淘汰)
+    """
+
+    def __init__(self, directory=None, max_bytes=MAX_CACHE_BYTES):
+        self.directory = directory or cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.pkl")
+
+    def get(self, key):
+        """回傳 (是否命中, 值)；命中時更新 mtime 作為最近使用時間"""
+        path = self._path(key)
+        try:
+            with open(path, "rb") as fh:
+                value = pickle.load(fh)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            self.misses += 1
+            return False, None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        self.hits += 1
+        return True, value
+
+    def put(self, key, value):
+        if not os.path.isdir(os.path.dirname(self.directory)):
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        tmp = f"{self._path(key)}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as fh:
+            pickle.dump(value, fh, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, self._path(key))
+        self.evict()
+
+    def evict(self):
+        """總大小超過 max_bytes 時，從最舊 (mtime 最小) 的檔案開始刪除；回傳刪除數"""
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".pkl"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+        return removed
+
+    def memoize(self, name, params, compute, columns=None):
+        """
+        有快取就回傳快取，否則 compute() 後存入
+        columns: 結果依賴的 dataset 欄位 (只有這些欄位改變才失效)；沒有 Parquet dataset 時不快取
+        """
+        version = dataset_version(columns)
+        if version is None:
+            return compute()
+        key = memo_key(name, params, version)
+        hit, value = self.get(key)
+        if hit:
+            return value
+        value = compute()
+        self.put(key, value)
+        return value
+
+
+@lru_cache(maxsize=None)
+def get_cache():
+    """共用的 MemoCache (每個 process 一個)"""
+    return MemoCache()
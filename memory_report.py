@@ -0,0 +1,107 @@
+"""
+TTC 地鐵延遲數據 - 記憶體用量報告
+比較舊做法 (每個腳本 pd.read_csv 整份清洗後 CSV，字串為 object、日期為字串)
+與目前共用 loader 的精簡型別 (categorical / int32 / int16 / int8 / datetime64) 的記憶體用量。
+
+用法:
+    python memory_report.py
+"""
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+from config import get_data_dir
+from data_store import cleaned_csv, has_cleaned_data, load_cleaned
+from report_engine import CUBE_COLUMNS, ReportEngine
+
+data_dir = get_data_dir()
+output_file = os.path.join(data_dir, "memory_report.txt")
+
+# 各腳本目前實際載入的資料 (報表腳本都透過 ReportEngine 只讀 cube 需要的欄位)
+SCRIPT_COLUMNS = {
+    "clean_data.py (full cleaned frame)": None,
+    "analyze_delays.py": CUBE_COLUMNS,
+    "advanced_metrics.py": CUBE_COLUMNS,
+    "get_answers.py": CUBE_COLUMNS,
+    "interactive_charts.py": CUBE_COLUMNS,
+}
+
+
+def _mb(nbytes):
+    return nbytes / (1024 * 1024)
+
+
+def load_legacy():
+    """舊版讀法：所有字串欄位為 Python object"""
+    try:
+        df = pd.read_csv(cleaned_csv, encoding="utf-8")
+    except UnicodeDecodeError:
+        df = pd.read_csv(cleaned_csv, encoding="cp1252")
+    for col in df.columns:
+        if df[col].dtype.kind not in "iufb":
+            df[col] = df[col].astype(object)
+    return df
+
+
+def cube_nbytes(cube):
+    arrays = [*cube.coords.values(), *cube.measures.values()]
+    return sum(a.nbytes for a in arrays)
+
+
+def main():
+    if not has_cleaned_data() or not os.path.exists(cleaned_csv):
+        print("Cleaned data not found! Run clean_data.py first.")
+        return
+
+    print("Loading legacy (object) and compact frames...")
+    legacy = load_legacy()
+    compact = load_cleaned()
+    legacy_usage = legacy.memory_usage(deep=True, index=False)
+    compact_usage = compact.memory_usage(deep=True, index=False)
+
+    with open(output_file, "w", encoding="utf-8") as f:
+        sys.stdout = f
+
+        print("=" * 72)
+        print("MEMORY FOOTPRINT: LEGACY OBJECT FRAME vs. COMPACT SCHEMA")
+        print("=" * 72)
+        print(f"Rows: {len(compact)}\n")
+
+        print(f"{'Column':<20}{'Legacy dtype':<16}{'Legacy MB':>11}{'Compact dtype':>18}{'Compact MB':>12}")
+        print("-" * 77)
+        for col in compact.columns:
+            old_dtype = str(legacy[col].dtype) if col in legacy.columns else "-"
+            old_mb = _mb(legacy_usage[col]) if col in legacy.columns else np.nan
+            print(f"{col:<20}{old_dtype:<16}{old_mb:>11.3f}{str(compact[col].dtype):>18}"
+                  f"{_mb(compact_usage[col]):>12.3f}")
+        print("-" * 77)
+        print(f"{'Total':<36}{_mb(legacy_usage.sum()):>11.3f}{'':>18}{_mb(compact_usage.sum()):>12.3f}")
+
+        print("\n" + "=" * 72)
+        print("PER-SCRIPT FOOTPRINT")
+        print("=" * 72)
+        print("Legacy: every script loaded the whole CSV with object strings.")
+        print("Compact: columns the script now loads through the shared loader.\n")
+
+        engine = ReportEngine(compact[CUBE_COLUMNS])
+        cube_mb = _mb(cube_nbytes(engine.cube))
+
+        print(f"{'Script':<38}{'Legacy MB':>11}{'Compact MB':>12}{'Reduction':>11}")
+        print("-" * 72)
+        for script, columns in SCRIPT_COLUMNS.items():
+            after = compact_usage.sum() if columns is None else compact_usage[columns].sum()
+            before = legacy_usage.sum()
+            print(f"{script:<38}{_mb(before):>11.3f}{_mb(after):>12.3f}{1 - after / before:>10.1%}")
+        print("-" * 72)
+        print(f"DelayCube arrays shared by the report scripts: {cube_mb:.3f} MB "
+              f"({len(engine.cube)} cells)")
+
+    sys.stdout = sys.__stdout__
+    print(f"Memory report saved to {output_file}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+TTC 地鐵延遲數據 - 期間比較 (年 / 季 / 月 / ISO 週 / 去年同期)
+
+一次彙總：cube 依 [實體 × 日期] roll-up 後，把日期轉成期間 (Period) 再 groupby 一次，
+得到 實體 × 期間 的度量表；任何「本期 vs 前 lag 期」的比較都只是把期間索引平移 lag 後 reindex，
+所有實體、所有期間同時算出，不需要逐組過濾。
+
+用法:
+    python period_compare.py                               # 系統全體逐年比較
+    python period_compare.py --period month_yoy --by Station
+"""
+
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from config import get_data_dir
+
+data_dir = get_data_dir()
+output_file = os.path.join(data_dir, "period_comparison.csv")
+
+# 比較名稱 -> (pandas 期間頻率, 與前幾期比較)
+# W-SUN 為週一至週日，與 ISO 週的範圍相同
+COMPARISONS = {
+    "year": ("Y", 1),
+    "quarter": ("Q", 1),
+    "month": ("M", 1),
+    "week": ("W-SUN", 1),
+    "quarter_yoy": ("Q", 4),
+    "month_yoy": ("M", 12),
+    "week_yoy": ("W-SUN", 52),  # 52 週前 (遇到 53 週的年份會差一週)
+}
+
+MEASURES = ["Incidents", "Total Delay", "Weighted Delay"]
+
+
+def _label(periods, freq):
+    """期間 -> 顯示用標籤 (ISO 週為 2025-W07)"""
+    periods = pd.PeriodIndex(periods)
+    if freq.startswith("W"):
+        iso = periods.start_time.isocalendar()
+        return [f"{y}-W{w:02d}" for y, w in zip(iso["year"], iso["week"])]
+    return periods.astype(str).tolist()
+
+
+def _period_table(engine, freq, entity):
+    dims = ["Date"] + ([entity] if entity else [])
+    daily = engine.aggregate(dims)[MEASURES].reset_index()
+    daily["Period"] = pd.DatetimeIndex(daily["Date"]).to_period(freq)
+    keys = ([entity] if entity else []) + ["Period"]
+    return daily.groupby(keys, sort=True, observed=True)[MEASURES].sum()
+
+
+def period_table(engine, freq="Y", entity=None):
+    """
+    實體 × 期間的度量表 (單一 groupby)：index 為 [entity,] Period，欄位為 Incidents / Total Delay / Weighted Delay
+    entity 為 None 時是系統全體
+    """
+    return engine.memo(
+        "period_table", {"freq": freq, "entity": entity},
+        lambda e: _period_table(e, freq, entity),
+    )
+
+
+def compare_periods(engine, comparison="year", entity=None):
+    """
+    每個 (實體, 期間) 與前 lag 期比較，回傳長表格：
+    [entity,] Period, Previous, 各度量的本期 / Prev / Change %，以及加權平均延遲 (Avg Impact)
+    沒有前期資料的列 Prev 為 NaN
+    """
+    freq, lag = COMPARISONS[comparison]
+    table = period_table(engine, freq, entity)
+    periods = table.index.get_level_values("Period")
+    previous = periods - lag
+
+    # 把期間平移 lag 後 reindex：所有實體 / 期間的前期值一次取得
+    if entity:
+        prev_index = pd.MultiIndex.from_arrays([table.index.get_level_values(entity), previous])
+    else:
+        prev_index = pd.PeriodIndex(previous, name="Period")
+    prev = table.reindex(prev_index)
+
+    result = pd.DataFrame(index=range(len(table)))
+    if entity:
+        result[entity] = table.index.get_level_values(entity)
+    result["Period"] = _label(periods, freq)
+    result["Previous"] = _label(previous, freq)
+
+    current_values = table.to_numpy(dtype="float64")
+    prev_values = prev.to_numpy(dtype="float64")
+    with np.errstate(divide="ignore", invalid="ignore"):
+        change = (current_values - prev_values) / prev_values * 100
+        impact = current_values[:, 2] / current_values[:, 0]
+        prev_impact = prev_values[:, 2] / prev_values[:, 0]
+        impact_change = (impact - prev_impact) / prev_impact * 100
+    change[~np.isfinite(change)] = np.nan
+
+    for i, measure in enumerate(MEASURES):
+        result[measure] = current_values[:, i]
+        result[f"Prev {measure}"] = prev_values[:, i]
+        result[f"{measure} Change %"] = change[:, i]
+    result["Avg Impact"] = impact
+    result["Prev Avg Impact"] = prev_impact
+    result["Avg Impact Change %"] = np.where(np.isfinite(impact_change), impact_change, np.nan)
+    return result
+
+
+def latest_comparison(engine, comparison="year", entity=None):
+    """最新一期 (且有前期資料) 的比較結果；沒有可比較的期間時回傳空表"""
+    result = compare_periods(engine, comparison, entity)
+    result = result[result["Prev Incidents"].notna()]
+    if result.empty:
+        return result
+    return result[result["Period"] == result["Period"].max()]
+
+
+if __name__ == "__main__":
+    from report_engine import ReportEngine
+
+    parser = argparse.ArgumentParser(description="Compare delay metrics between periods for every line/station/code")
+    parser.add_argument("--period", choices=sorted(COMPARISONS), default="year", help="comparison (default: year)")
+    parser.add_argument("--by", choices=["Line", "Station", "Code"], default=None, help="entity (default: whole system)")
+    parser.add_argument("--output", default=output_file, help="CSV output path")
+    args = parser.parse_args()
+
+    result = compare_periods(ReportEngine(), args.period, args.by)
+    result.to_csv(args.output, index=False, encoding="utf-8-sig")
+    print(f"{len(result)} rows ({args.period}{' by ' + args.by if args.by else ''}) saved to {args.output}")
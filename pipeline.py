@@ -0,0 +1,240 @@
+"""
+TTC 地鐵延遲數據 - 增量建置流程
+把 clean -> analyze / metrics / answers / charts 定義成有輸入、輸出的階段 (stage)：
+每個階段的輸入 (原始資料檔、代碼表、程式碼、上游 dataset 中用到的欄位) 取 hash，
+與上次成功執行時相同且輸出都在時就跳過；互不相依的下游階段同時執行。
+
+例如只改代碼表時：clean 只重算 Code Description (見 clean_data --incremental)，
+下游只有用到 Code Description 的 analyze / answers / charts 會重跑，metrics 會被跳過。
+
+用法:
+    python pipeline.py                 # 只跑有變動的階段
+    python pipeline.py --dry-run       # 列出會執行哪些階段
+    python pipeline.py --force charts  # 強制重跑指定階段
+"""
+
+import argparse
+import glob
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from clean_data import list_data_files
+from config import get_data_dir
+from data_store import cleaned_csv, dataset_version, manifest_file
+
+data_dir = get_data_dir()
+repo_dir = os.path.dirname(os.path.abspath(__file__))
+state_file = os.path.join(data_dir, "pipeline_state.json")
+log_dir = os.path.join(data_dir, "pipeline_logs")
+
+# 所有報表共用的程式碼
+REPORT_CODE = ["report_engine.py", "delay_cube.py", "delay_query.py", "data_store.py", "features.py",
+               "memo_cache.py", "scoring.py", "instrumentation.py"]
+
+
+class Stage:
+    """
+    name:    階段名稱
+    command: 要執行的腳本與參數 (相對於 repo)
+    files:   輸入檔案 (data_dir 內的 glob pattern，或回傳檔案路徑清單的函式)
+    code:    會影響輸出的程式碼 / 設定檔 (相對於 repo)
+    columns: 讀取上游 dataset 的哪些欄位 (None 表示不讀 dataset)
+    deps:    上游階段
+    outputs: 輸出檔案 (任何一個不存在時必定重跑)
+    """
+
+    def __init__(self, name, command, files=(), code=(), columns=None, deps=(), outputs=()):
+        self.name = name
+        self.command = list(command)
+        self.files = list(files)
+        self.code = list(code)
+        self.columns = columns
+        self.deps = list(deps)
+        self.outputs = list(outputs)
+
+
+STAGES = [
+    Stage(
+        "clean",
+        ["clean_data.py", "--incremental"],
+        # 原始檔與 clean_data.py 用同一個判斷規則
+        files=[list_data_files, "ttc-subway-delay-codes.xlsx", "Code Descriptions.csv"],
+        code=["clean_data.py", "features.py", "data_store.py", "station_names.py", "station_aliases.json",
+              "instrumentation.py"],
+        outputs=[cleaned_csv, manifest_file],
+    ),
+    Stage(
+        "analyze",
+        ["analyze_delays.py"],
+        code=["analyze_delays.py", *REPORT_CODE],
+        columns=["Month", "DayOfWeek", "Is Weekday Rush", "Line", "Code Description", "Min Delay"],
+        deps=["clean"],
+        outputs=[os.path.join(data_dir, "analysis_results.txt")],
+    ),
+    Stage(
+        "metrics",
+        ["advanced_metrics.py"],
+        code=["advanced_metrics.py", "period_compare.py", *REPORT_CODE],
+        # totals / 路線與車站評分 (scoring) / 尖峰比較 (Is Peak Hour) / 逐年比較 (period_compare: Year, Date)
+        columns=["Line", "Station", "Date", "Year", "DayOfWeek", "Hour", "Is Peak Hour",
+                 "Min Delay", "Weighted Delay"],
+        deps=["clean"],
+        outputs=[os.path.join(data_dir, "advanced_metrics_results.txt")],
+    ),
+    Stage(
+        "answers",
+        ["get_answers.py"],
+        code=["get_answers.py", *REPORT_CODE],
+        columns=["Month", "DayOfWeek", "Is Weekday Rush", "Line", "Code Description", "Min Delay"],
+        deps=["clean"],
+        outputs=[os.path.join(data_dir, "answers.txt")],
+    ),
+    Stage(
+        "charts",
+        ["interactive_charts.py"],
+        code=["interactive_charts.py", "rolling.py", "timeline.py", *REPORT_CODE],
+        columns=["Line", "Date", "Month", "DayOfWeek", "Hour", "Station", "Is Peak Hour",
+                 "Code Description", "Min Delay", "Weighted Delay", "Timestamp"],
+        deps=["clean"],
+        outputs=[os.path.join(data_dir, "charts", "00_dashboard.html")],
+    ),
+]
+
+
+# ---------- 指紋 ----------
+
+def _load_state():
+    if not os.path.exists(state_file):
+        return {"stages": {}, "files": {}}
+    with open(state_file, "r", encoding="utf-8") as fh:
+        return json.load(fh)
+
+
+def _save_state(state):
+    tmp = state_file + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as fh:
+        json.dump(state, fh, indent=2, sort_keys=True)
+    os.replace(tmp, state_file)
+
+
+def _file_sha(path, cache):
+    """檔案 sha256；size / mtime 與上次相同時沿用快取，不重讀檔案"""
+    stat = os.stat(path)
+    cached = cache.get(path)
+    if cached and cached["size"] == stat.st_size and cached["mtime"] == stat.st_mtime_ns:
+        return cached["sha256"]
+    h = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for block in iter(lambda: fh.read(1 << 20), b""):
+            h.update(block)
+    cache[path] = {"size": stat.st_size, "mtime": stat.st_mtime_ns, "sha256": h.hexdigest()}
+    return cache[path]["sha256"]
+
+
+def stage_fingerprint(stage, file_cache):
+    """階段所有輸入的 hash (指令、輸入檔、程式碼、上游欄位)"""
+    digest = hashlib.sha256(json.dumps(stage.command).encode("utf-8"))
+    inputs = []
+    for pattern in stage.files:
+        if callable(pattern):
+            inputs += pattern()
+        else:
+            inputs += [p for p in glob.glob(os.path.join(data_dir, pattern)) if "cleaned" not in p.lower()]
+    inputs += [os.path.join(repo_dir, p) for p in stage.code]
+    for path in sorted(set(inputs)):
+        sha = _file_sha(path, file_cache) if os.path.exists(path) else "missing"
+        digest.update(f"{os.path.basename(path)}:{sha}".encode("utf-8"))
+    if stage.columns is not None:
+        digest.update(f"dataset:{dataset_version(stage.columns)}".encode("utf-8"))
+    return digest.hexdigest()
+
+
+# ---------- 執行 ----------
+
+def run_stage(stage):
+    """以子行程執行階段腳本，輸出寫到 pipeline_logs/<stage>.log；回傳 (成功與否, 秒數)"""
+    os.makedirs(log_dir, exist_ok=True)
+    start = time.perf_counter()
+    with open(os.path.join(log_dir, f"{stage.name}.log"), "w", encoding="utf-8") as log:
+        result = subprocess.run(
+            [sys.executable, os.path.join(repo_dir, stage.command[0]), *stage.command[1:]],
+            stdout=log,
+            stderr=subprocess.STDOUT,
+        )
+    return result.returncode == 0, time.perf_counter() - start
+
+
+def run_pipeline(targets=None, force=(), dry_run=False, jobs=None):
+    """
+    依相依順序逐層執行；同一層中需要重跑的階段同時執行
+    targets: 只跑這些階段 (及其上游)；force: 不論指紋都重跑的階段
+    """
+    stages = {s.name: s for s in STAGES}
+    wanted = set(targets or stages)
+    pending = [s for s in STAGES if s.name in wanted or any(s.name in stages[t].deps for t in wanted)]
+    state = _load_state()
+    done, failed = set(), set()
+    # dry run 不會更新上游輸出，下游指紋仍是舊的：上游會重跑時下游也一定重跑
+    would_run = set()
+
+    while pending:
+        ready = [s for s in pending if all(d in done or d not in {p.name for p in pending} for d in s.deps)]
+        pending = [s for s in pending if s not in ready]
+
+        to_run = []
+        for stage in ready:
+            if any(d in failed for d in stage.deps):
+                print(f"[blocked] {stage.name}: upstream stage failed")
+                failed.add(stage.name)
+                continue
+            if any(d in would_run for d in stage.deps):
+                to_run.append(stage)
+                continue
+            fp = stage_fingerprint(stage, state["files"])
+            outputs_ok = all(os.path.exists(p) for p in stage.outputs)
+            if stage.name not in force and outputs_ok and state["stages"].get(stage.name) == fp:
+                print(f"[skip]    {stage.name}: inputs unchanged")
+                done.add(stage.name)
+            else:
+                to_run.append(stage)
+
+        if dry_run:
+            for stage in to_run:
+                print(f"[would run] {stage.name}")
+            would_run.update(s.name for s in to_run)
+            done.update(s.name for s in to_run)
+            continue
+
+        with ThreadPoolExecutor(max_workers=jobs or max(1, len(to_run))) as pool:
+            results = list(pool.map(run_stage, to_run))
+        for stage, (ok, seconds) in zip(to_run, results):
+            if ok:
+                # 記錄執行後的指紋 (上游 dataset 已是最新)
+                state["stages"][stage.name] = stage_fingerprint(stage, state["files"])
+                print(f"[ran]     {stage.name}: {seconds:.1f}s")
+                done.add(stage.name)
+            else:
+                state["stages"].pop(stage.name, None)
+                print(f"[failed]  {stage.name}: see {os.path.join(log_dir, stage.name + '.log')}")
+                failed.add(stage.name)
+        _save_state(state)
+
+    if not dry_run:
+        _save_state(state)
+    return not failed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the TTC delay pipeline, skipping unchanged stages")
+    parser.add_argument("stages", nargs="*", help=f"stages to run (default: all of {[s.name for s in STAGES]})")
+    parser.add_argument("--force", nargs="*", default=[], metavar="STAGE", help="rerun these stages regardless of inputs")
+    parser.add_argument("--dry-run", action="store_true", help="only report which stages would run")
+    parser.add_argument("--jobs", type=int, default=None, help="max stages running at once (default: all ready stages)")
+    args = parser.parse_args()
+    ok = run_pipeline(args.stages or None, force=set(args.force), dry_run=args.dry_run, jobs=args.jobs)
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,362 @@
+"""
+TTC 地鐵延遲數據 - 本機查詢服務 (asyncio HTTP，只用標準函式庫)
+啟動時載入一次資料、建好 DelayCube 放在記憶體中，之後每個查詢只是一次 cube roll-up，
+不必每次重新啟動腳本、解析 CSV。
+
+回應以 (dataset 版本, 路徑, 參數) 快取在記憶體 (LRU)；ETag 由同一組 key 算出，
+客戶端帶 If-None-Match 時直接回 304。清洗後資料更新 (_manifest.json 改變) 時自動重新載入，
+舊的 ETag 隨之失效。
+
+端點 (GET):
+    /aggregate  依 by 分組彙總，例如 /aggregate?by=Month,Line&line=Line 2 Bloor-Danforth
+    /totals     過濾後的度量總和
+    /answers    get_answers.py 的五個答案
+    /version    目前的 dataset 版本、cube 大小與快取命中數 (此回應不快取)
+
+過濾參數 (/aggregate, /totals)：
+    line / station / code / year   可重複，例如 station=KENNEDY&station=BLOOR
+    start / end                    日期範圍 (含兩端)，例如 start=2025-01-01&end=2025-03-31
+    period=peak|offpeak            只看尖峰 / 離峰；peak=<尖峰定義> 選擇定義 (預設 Is Peak Hour)
+    sort=<度量> / limit=<n>        (/aggregate) 依度量由大到小排序並取前 n 組
+
+用法:
+    python query_service.py --port 8765
+    curl "http://127.0.0.1:8765/aggregate?by=Month&period=peak&peak=Is Weekday Rush"
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+import pandas as pd
+
+from data_store import cleaned_csv, dataset_version, manifest_file
+from features import PEAK_DEFINITIONS, SCORING_PEAK
+from get_answers import answers
+from instrumentation import stage
+from report_engine import CUBE_COLUMNS, ReportEngine
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+# 記憶體中保留的回應數
+RESPONSE_CACHE_SIZE = 1024
+# 連線閒置多久後關閉 (秒)
+IDLE_TIMEOUT = 30
+MAX_HEADER_BYTES = 64 * 1024
+
+GROUP_LEVELS = [col for col in CUBE_COLUMNS if col not in ("Min Delay", "Weighted Delay", "Min Gap")]
+MEASURE_NAMES = ["Incidents", "Total Delay", "Weighted Delay", "Total Gap", "Avg Delay"]
+
+# 查詢參數 -> cube 層級
+MEMBER_FILTERS = {"line": "Line", "station": "Station", "code": "Code"}
+
+JSON_TYPE = "application/json; charset=utf-8"
+STATUS_TEXT = {200: "OK", 304: "Not Modified", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed"}
+
+
+class QueryError(ValueError):
+    """參數錯誤 (回 400)"""
+
+
+class RawResponse:
+    """handler 回傳非 JSON 包裝的內容時使用 (HTML、JS、已序列化的 figure JSON)"""
+
+    def __init__(self, body, content_type=JSON_TYPE):
+        self.body = body.encode("utf-8") if isinstance(body, str) else body
+        self.content_type = content_type
+
+
+def _json_default(value):
+    if isinstance(value, np.integer):
+        return int(value)
+    if isinstance(value, np.floating):
+        return None if np.isnan(value) else float(value)
+    if isinstance(value, np.bool_):
+        return bool(value)
+    if isinstance(value, (pd.Timestamp, np.datetime64)):
+        return pd.Timestamp(value).date().isoformat()
+    return str(value)
+
+
+def _records(frame, index=True):
+    """DataFrame -> list of dict (NaN 轉 null，日期轉 YYYY-MM-DD)"""
+    if index:
+        frame = frame.reset_index()
+    for col in frame.columns:
+        if pd.api.types.is_datetime64_any_dtype(frame[col]):
+            frame[col] = frame[col].dt.strftime("%Y-%m-%d")
+    frame = frame.astype(object).where(frame.notna(), None)
+    return frame.to_dict(orient="records")
+
+
+def _date(value, name):
+    try:
+        return pd.Timestamp(value).normalize()
+    except (ValueError, TypeError):
+        raise QueryError(f"{name}: invalid date {value!r}") from None
+
+
+def parse_filters(params):
+    """查詢參數 -> ReportEngine.aggregate 的 where dict"""
+    where = {}
+    for param, level in MEMBER_FILTERS.items():
+        if params.get(param):
+            where[level] = params[param]
+    if params.get("year"):
+        try:
+            where["Year"] = [int(y) for y in params["year"]]
+        except ValueError:
+            raise QueryError(f"year: expected integers, got {params['year']}") from None
+
+    start, end = params.get("start", [None])[0], params.get("end", [None])[0]
+    if start or end:
+        start = _date(start, "start") if start else None
+        end = _date(end, "end") if end else None
+        where["Date"] = slice(start, end)
+
+    definition = params.get("peak", [SCORING_PEAK])[0]
+    if definition not in PEAK_DEFINITIONS:
+        raise QueryError(f"peak: unknown definition {definition!r} (choose from {', '.join(PEAK_DEFINITIONS)})")
+    period = params.get("period", [None])[0]
+    if period is not None:
+        if period not in ("peak", "offpeak"):
+            raise QueryError("period: expected 'peak' or 'offpeak'")
+        where[definition] = period == "peak"
+    return where
+
+
+def _split(values):
+    return [v.strip() for value in values for v in value.split(",") if v.strip()]
+
+
+class QueryService:
+    """
+    持有目前版本的 ReportEngine 與回應快取
+    所有 cube 運算都在單一 worker thread 中執行 (engine 不是 thread-safe)，event loop 只負責 I/O
+    """
+
+    def __init__(self, cache_size=RESPONSE_CACHE_SIZE):
+        self.engine = None
+        self.version = None
+        self.cache_size = cache_size
+        self.responses = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._source_stamp = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ttc-query")
+
+    # ---------- dataset 版本 ----------
+
+    def _source_mtime(self):
+        for path in (manifest_file, cleaned_csv):
+            try:
+                return path, os.stat(path).st_mtime_ns
+            except OSError:
+                continue
+        return None
+
+    def _refresh(self):
+        """清洗後資料有變動時重新載入 (只在 manifest / CSV 的 mtime 改變時才重算版本)"""
+        stamp = self._source_mtime()
+        if self.engine is not None and stamp == self._source_stamp:
+            return
+        version = dataset_version(CUBE_COLUMNS)
+        if version is None and stamp is not None:
+            # 沒有 Parquet dataset：以 CSV 的 mtime 當版本
+            version = f"csv-{stamp[1]}"
+        self._source_stamp = stamp
+        if self.engine is not None and version == self.version:
+            return
+        with stage("service.load") as rec:
+            engine = ReportEngine()
+            rec["rows_out"] = len(engine.cube)
+        self.engine, self.version = engine, version
+        self.responses.clear()
+
+    def load(self):
+        self._refresh()
+        return self.version
+
+    # ---------- 查詢 ----------
+
+    def _aggregate(self, params):
+        by = _split(params.get("by", []))
+        unknown = [d for d in by if d not in GROUP_LEVELS]
+        if unknown:
+            raise QueryError(f"by: unknown dimension {unknown} (choose from {', '.join(GROUP_LEVELS)})")
+        where = parse_filters(params)
+        if not by:
+            return {"by": by, "rows": _records(self.engine.aggregate([], where), index=False)}
+        result = self.engine.aggregate(by, where)
+
+        sort = params.get("sort", [None])[0]
+        if sort is not None:
+            if sort not in MEASURE_NAMES:
+                raise QueryError(f"sort: unknown measure {sort!r} (choose from {', '.join(MEASURE_NAMES)})")
+            result = result.sort_values(sort, ascending=False, kind="stable")
+        limit = params.get("limit", [None])[0]
+        if limit is not None:
+            try:
+                result = result.head(int(limit))
+            except ValueError:
+                raise QueryError("limit: expected an integer") from None
+        return {"by": by, "rows": _records(result)}
+
+    def _totals(self, params):
+        return {"totals": _records(self.engine.aggregate([], parse_filters(params)), index=False)[0]}
+
+    def _answers(self, params):
+        return {"answers": answers(self.engine)}
+
+    def _version(self, params):
+        return {"cells": len(self.engine.cube), "levels": GROUP_LEVELS,
+                "cached_responses": len(self.responses), "hits": self.hits, "misses": self.misses}
+
+    ROUTES = {
+        "/aggregate": _aggregate,
+        "/totals": _totals,
+        "/answers": _answers,
+        "/version": _version,
+    }
+
+    def _etag(self, path, params):
+        payload = json.dumps([self.version, path, sorted(params.items())], default=str)
+        return '"' + hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32] + '"'
+
+    def handle(self, path, query, if_none_match=None):
+        """回傳 (status, body bytes, etag, content type)；在 worker thread 中執行"""
+        handler = self.ROUTES.get(path)
+        if handler is None:
+            return 404, _body({"error": f"unknown path {path}", "paths": sorted(self.ROUTES)}), None, JSON_TYPE
+
+        self._refresh()
+        params = {k: v for k, v in parse_qs(query, keep_blank_values=False).items()}
+        etag = self._etag(path, params)
+        if path == "/version":
+            return 200, _body({"version": self.version, **self._version(params)}), None, JSON_TYPE
+        if if_none_match and etag in [t.strip() for t in if_none_match.split(",")]:
+            self.hits += 1
+            return 304, b"", etag, JSON_TYPE
+
+        cached = self.responses.get(etag)
+        if cached is not None:
+            self.responses.move_to_end(etag)
+            self.hits += 1
+            return 200, cached[0], etag, cached[1]
+
+        self.misses += 1
+        try:
+            with stage("service.query", path=path):
+                result = handler(self, params)
+        except QueryError as exc:
+            return 400, _body({"error": str(exc)}), None, JSON_TYPE
+        if isinstance(result, RawResponse):
+            cached = (result.body, result.content_type)
+        else:
+            cached = (_body({"version": self.version, **result}), JSON_TYPE)
+        self.responses[etag] = cached
+        if len(self.responses) > self.cache_size:
+            self.responses.popitem(last=False)
+        return 200, cached[0], etag, cached[1]
+
+    async def run_in_worker(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+
+def _body(payload):
+    return json.dumps(payload, ensure_ascii=False, default=_json_default).encode("utf-8")
+
+
+# ---------- HTTP ----------
+
+async def _read_request(reader):
+    """讀取一個請求的 request line 與 headers；連線結束時回傳 None"""
+    try:
+        raw = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), IDLE_TIMEOUT)
+    except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError):
+        return None
+    except asyncio.LimitOverrunError:
+        raise QueryError("request headers too large") from None
+    lines = raw.decode("latin-1").split("\r\n")
+    try:
+        method, target, version = lines[0].split(" ", 2)
+    except ValueError:
+        raise QueryError("malformed request line") from None
+    headers = {}
+    for line in lines[1:]:
+        if ":" in line:
+            name, value = line.split(":", 1)
+            headers[name.strip().lower()] = value.strip()
+    return method, target, version, headers
+
+
+def _response(status, body, etag=None, keep_alive=True, head=False, content_type=JSON_TYPE):
+    headers = [
+        f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}",
+        f"Content-Type: {content_type}",
+        f"Content-Length: {len(body)}",
+        "Cache-Control: no-cache",
+        f"Connection: {'keep-alive' if keep_alive else 'close'}",
+    ]
+    if etag:
+        headers.append(f"ETag: {etag}")
+    data = ("\r\n".join(headers) + "\r\n\r\n").encode("latin-1")
+    return data if head else data + body
+
+
+async def _serve_connection(service, reader, writer):
+    try:
+        while True:
+            try:
+                request = await _read_request(reader)
+            except QueryError as exc:
+                writer.write(_response(400, _body({"error": str(exc)}), keep_alive=False))
+                break
+            if request is None:
+                break
+            method, target, version, headers = request
+            keep_alive = headers.get("connection", "").lower() != "close" and version == "HTTP/1.1"
+
+            if method not in ("GET", "HEAD"):
+                status, body, etag, content_type = 405, _body({"error": "only GET is supported"}), None, JSON_TYPE
+            else:
+                url = urlsplit(target)
+                status, body, etag, content_type = await service.run_in_worker(
+                    service.handle, url.path.rstrip("/") or "/", url.query, headers.get("if-none-match"))
+            writer.write(_response(status, body, etag, keep_alive, method == "HEAD", content_type))
+            await writer.drain()
+            if not keep_alive:
+                break
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, service=None):
+    service = service or QueryService()
+    # 啟動前先載入資料，第一個請求就不必等
+    version = await service.run_in_worker(service.load)
+    server = await asyncio.start_server(
+        lambda r, w: _serve_connection(service, r, w), host, port, limit=MAX_HEADER_BYTES)
+    print(f"Serving dataset {version} ({len(service.engine.cube)} cells) on http://{host}:{port}")
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve TTC delay aggregates over HTTP from memory")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port))
+    except KeyboardInterrupt:
+        print("Stopped")
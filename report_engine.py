@@ -0,0 +1,170 @@
+"""
+TTC 地鐵延遲數據 - 統一報表引擎
+載入一次資料、建一次 DelayCube (single aggregation sweep)，
+所有文字報表與圖表都從 cube roll-up 並快取，而不是各自重新載入 + groupby。
+
+用法:
+    python report_engine.py     # 一次產生 analysis / metrics / answers / charts
+"""
+
+from collections import OrderedDict
+
+from delay_cube import ATTRIBUTES, DIMENSIONS, MEASURES, DelayCube
+from delay_query import DelayQuery
+from instrumentation import stage
+from memo_cache import get_cache
+
+# cube 需要的欄位 (其餘欄位不從儲存層讀取)
+CUBE_COLUMNS = [*DIMENSIONS, *ATTRIBUTES, *MEASURES.values()]
+# 記憶體中最多保留幾組 roll-up (query service / 儀表板會送進任意 filter 組合)
+MAX_CACHED_ROLLUPS = 256
+
+
+def _freeze(where):
+    """把 filter dict 轉成可當 cache key 的 tuple"""
+    if not where:
+        return ()
+    items = []
+    for col, value in sorted(where.items()):
+        if isinstance(value, (list, tuple, set)):
+            value = tuple(sorted(value))
+        elif isinstance(value, slice):
+            value = ("slice", value.start, value.stop)
+        items.append((col, value))
+    return tuple(items)
+
+
+class ReportEngine:
+    """
+    共用彙總快取
+
+    aggregate(dims, where) 回傳以 dims 為 index 的 DataFrame，欄位為
+    Incidents / Total Delay / Weighted Delay / Total Gap / Avg Delay；
+    結果由 cube roll-up 而來，並以 (維度組合, filter) 為 key 快取 (LRU，最多 max_cached 組)。
+
+    讀取預設 dataset 時，沒有 filter 的彙總結果另外存到磁碟 (memo_cache)：
+    資料沒變時直接讀回，第一次真的需要原始資料 / cube 時才載入。
+    有 filter 的 roll-up 只留在記憶體，避免任意 filter 組合把磁碟寫滿。
+    """
+
+    def __init__(self, df=None, query=None, memo=None, max_cached=MAX_CACHED_ROLLUPS):
+        self._df = df
+        self._query = query
+        self._cube = None
+        self._cache = OrderedDict()
+        self.max_cached = max_cached
+        # 只有預設 dataset 的內容版本可知 (自帶 DataFrame 或 query 時不用磁碟快取)
+        if memo is None and df is None and query is None:
+            memo = get_cache()
+        self.memo_cache = memo
+
+    @property
+    def df(self):
+        if self._df is None:
+            # 只讀 cube 需要的欄位；query 可再加上過濾條件 (例如只看某條線)
+            with stage("engine.load_rows") as rec:
+                self._df = (self._query or DelayQuery()).select(*CUBE_COLUMNS).rows()
+                rec["rows_out"] = len(self._df)
+        return self._df
+
+    @property
+    def cube(self):
+        if self._cube is None:
+            # 唯一一次掃過原始資料
+            df = self.df
+            with stage("engine.build_cube", rows_in=len(df)) as rec:
+                self._cube = DelayCube.from_frame(df)
+                rec["rows_out"] = len(self._cube)
+        return self._cube
+
+    def memo(self, name, params, compute):
+        """
+        命名彙總的磁碟快取：key 為 (dataset 版本, name, params)，compute(engine) 只在未命中時執行
+        params 須包含所有影響結果的參數 (門檻、排除關鍵字、權重...)
+        """
+        if self.memo_cache is None:
+            return compute(self)
+        return self.memo_cache.memoize(name, params, lambda: compute(self), columns=CUBE_COLUMNS)
+
+    def aggregate(self, dims, where=None):
+        dims = list(dims)
+        key = (tuple(dims), _freeze(where))
+        if key in self._cache:
+            self._cache.move_to_end(key)
+        else:
+            if where:
+                # 有 filter (含 callable 條件) 的結果不寫磁碟
+                self._cache[key] = self.cube.rollup(dims, where)
+            else:
+                self._cache[key] = self.memo("rollup", list(key), lambda e: e.cube.rollup(dims))
+            while len(self._cache) > self.max_cached:
+                self._cache.popitem(last=False)
+        return self._cache[key].copy()
+
+    def totals(self, where=None):
+        """全體 (或 filter 後) 的度量總和，回傳 dict (保留整數型別)"""
+        result = self.aggregate([], where)
+        return {col: result[col].iloc[0] for col in result.columns}
+
+    def rows_query(self, where=None):
+        """明細查詢 (DelayQuery)：只在需要個別事故時使用，條件下推到儲存層"""
+        return (self._query or DelayQuery()).filter(where)
+
+    def filtered(self, where):
+        """只看符合 where 的資料 (例如一條線、一段日期) 的檢視，介面與 ReportEngine 相同"""
+        return FilteredEngine(self, where)
+
+
+class FilteredEngine:
+    """
+    ReportEngine 的過濾檢視 (互動儀表板用)：aggregate / totals / cube / memo 都先套用 where，
+    所以同一組 prepare_* 函式可以直接畫出任意過濾條件下的圖。
+    共用原 engine 的 cube 與記憶體快取；有過濾條件時 memo 不寫磁碟。
+    """
+
+    def __init__(self, engine, where):
+        self.engine = engine
+        self.where = dict(where or {})
+        self._cube = None
+
+    @property
+    def cube(self):
+        if self._cube is None:
+            self._cube = self.engine.cube.slice(self.where) if self.where else self.engine.cube
+        return self._cube
+
+    def memo(self, name, params, compute):
+        if not self.where:
+            return self.engine.memo(name, params, lambda e: compute(self))
+        # 過濾後的結果不寫磁碟 (filter 組合無上限)
+        return compute(self)
+
+    def aggregate(self, dims, where=None):
+        return self.engine.aggregate(dims, {**self.where, **(where or {})})
+
+    def totals(self, where=None):
+        result = self.aggregate([], where)
+        return {col: result[col].iloc[0] for col in result.columns}
+
+    def rows_query(self, where=None):
+        return self.engine.rows_query({**self.where, **(where or {})})
+
+
+def main():
+    # 延遲 import，避免與各報表腳本互相 import
+    import advanced_metrics
+    import analyze_delays
+    import get_answers
+    import interactive_charts
+
+    engine = ReportEngine()
+    print(f"Loaded {len(engine.df)} rows, cube has {len(engine.cube)} cells")
+
+    analyze_delays.analyze(engine)
+    advanced_metrics.calculate_metrics(engine)
+    get_answers.get_answers(engine)
+    interactive_charts.main(engine)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+TTC 地鐵延遲數據 - 滾動視窗可靠性 (每日 30 / 90 天 Reliability Score)
+
+先從 cube 取出 [實體 × 日期 × 小時] 延遲表，依 ScoringConfig 加權成每日 Weighted Delay 與事故次數，
+再逐日推進視窗：加入新的一天、移除超出視窗的那一天 (RollingWindow)，
+每一天只做 O(實體數) 的加減，不必每個視窗從頭重算。
+
+每日分數 = 100 - (視窗內 Penalty / 當天所有列入評分實體的最大 Penalty × 100)，
+列入評分的實體與全期評分相同 (scoring.reliability 有分數者)；視窗未滿的日子分數為 NaN。
+"""
+
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from scoring import DEFAULT_CONFIG, reliability, scored
+
+ROLLING_WINDOWS = (30, 90)
+
+
+class RollingWindow:
+    """
+    固定天數的滑動視窗：push(每日數值) 加入新的一天，超過 size 天時扣掉最舊的一天
+    sums 為目前視窗內的總和 (任意形狀的陣列)
+    """
+
+    def __init__(self, size, shape):
+        self.size = size
+        self.days = deque()
+        self.sums = np.zeros(shape, dtype="float64")
+
+    def push(self, values):
+        self.days.append(values)
+        self.sums += values
+        if len(self.days) > self.size:
+            self.sums -= self.days.popleft()
+        return self.sums
+
+    @property
+    def full(self):
+        return len(self.days) == self.size
+
+
+def daily_table(engine, entity, config=DEFAULT_CONFIG):
+    """
+    每日每個實體的加權延遲與事故次數 (沒有事故的日子補 0)
+    回傳 (entities, dates, weighted[日期 × 實體], incidents[日期 × 實體])
+    """
+    delay, (entities, dates, hours) = engine.cube.dense([entity, "Date", "Hour"], "Total Delay")
+    counts, _ = engine.cube.dense([entity, "Date"], "Incidents")
+
+    dates = pd.DatetimeIndex(dates)
+    weights = config.weights(dates.day_name(), hours)
+    weighted = (delay * weights[None, :, :]).sum(axis=2)
+
+    calendar = pd.date_range(dates.min(), dates.max(), freq="D")
+    position = calendar.get_indexer(dates)
+    full_weighted = np.zeros((len(calendar), len(entities)))
+    full_counts = np.zeros((len(calendar), len(entities)))
+    full_weighted[position] = weighted.T
+    full_counts[position] = counts.T
+    return list(entities), calendar, full_weighted, full_counts
+
+
+def _rolling_scores(engine, entity, windows, config):
+    entities, calendar, weighted, counts = daily_table(engine, entity, config)
+    eligible = set(scored(reliability(engine, entity, config))[entity])
+    eligible = np.array([e in eligible for e in entities])
+
+    frames = []
+    for size in windows:
+        window = RollingWindow(size, (2, len(entities)))
+        penalty = np.full((len(calendar), len(entities)), np.nan)
+        incidents = np.full((len(calendar), len(entities)), np.nan)
+        for day in range(len(calendar)):
+            sums = window.push(np.stack([weighted[day], counts[day]]))
+            if window.full:
+                penalty[day], incidents[day] = sums
+
+        # 每天以當天列入評分實體中最大的 Penalty 正規化
+        peak = np.nanmax(np.where(eligible, penalty, np.nan), axis=1, initial=0, keepdims=True)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            score = np.where(eligible & (peak > 0), 100 - penalty / peak * 100, np.nan)
+
+        # 只輸出列入評分的實體
+        keep = np.flatnonzero(eligible)
+        frames.append(pd.DataFrame({
+            "Date": np.repeat(calendar, len(keep)),
+            entity: np.tile(np.asarray(entities, dtype=object)[keep], len(calendar)),
+            "Window": size,
+            "Weighted Delay": penalty[:, keep].ravel(),
+            "Incidents": incidents[:, keep].ravel(),
+            "Reliability Score": score[:, keep].ravel(),
+        }))
+    return pd.concat(frames, ignore_index=True)
+
+
+def rolling_reliability(engine, entity, windows=ROLLING_WINDOWS, config=DEFAULT_CONFIG):
+    """
+    每日滾動視窗評分 (長表格，只含列入評分的實體)：
+    [Date, entity, Window, Weighted Delay, Incidents, Reliability Score]
+    結果依 (entity, 視窗, 評分設定) 快取在磁碟
+    """
+    windows = tuple(int(w) for w in windows)
+    return engine.memo(
+        "rolling_reliability", {"entity": entity, "windows": list(windows), **config.params()},
+        lambda e: _rolling_scores(e, entity, windows, config),
+    )
@@ -0,0 +1,217 @@
+"""
+TTC 地鐵延遲數據 - 相對損害評分 (Relative Impact Score) 引擎
+
+    Penalty           = Σ(Min Delay × 時段權重)      時段權重：尖峰 x multiplier，離峰 x 1.0
+    Reliability Score = 100 - (Penalty / 系統最大 Penalty × 100)
+
+評分參數 (尖峰倍率、尖峰時段、是否只算平日、車站門檻、排除關鍵字) 集中在 ScoringConfig。
+計算從 cube 的 [實體 × 星期 × 小時] 延遲表出發：每個設定是一個 (星期 × 小時) 權重向量，
+多個設定疊成權重矩陣後，一次矩陣乘法就得到所有設定 × 所有實體的 Penalty，
+不需要重新清洗或重掃原始資料即可做敏感度分析。
+
+用法:
+    python scoring.py      # 尖峰倍率 / 時段的敏感度分析 -> scoring_sensitivity.txt
+"""
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+from config import get_data_dir
+from features import PEAK_WEIGHT, PEAK_WINDOWS, valid_station_mask
+
+data_dir = get_data_dir()
+output_file = os.path.join(data_dir, "scoring_sensitivity.txt")
+
+# 車站評分門檻：事故次數 >= 50 才列入
+MIN_INCIDENT_THRESHOLD = 50
+# 剔除非正式車站記錄 (區間、軌道位置、機廠...)
+STATION_EXCLUDE_KEYWORDS = (
+    "APPROACHING", " TO ", "BUILDING", "TRACK LEVEL",
+    "CENTRE TRACK", "TAIL TRACK", "CROSSOVER",
+    "YARD", "LOOP", "SIDING", "POCKET",
+)
+
+WEEKEND = ("Saturday", "Sunday")
+
+
+class ScoringConfig:
+    """
+    multiplier:       尖峰權重
+    windows:          尖峰時段 ((起始小時, 結束小時), ...)，結束不含
+    weekdays_only:    只有平日的尖峰時段加權
+    min_incidents:    車站最低事故次數 (路線不過濾)
+    exclude_keywords: 車站名稱含這些字樣時不列入
+    """
+
+    def __init__(self, multiplier=PEAK_WEIGHT, windows=PEAK_WINDOWS, weekdays_only=False,
+                 min_incidents=MIN_INCIDENT_THRESHOLD, exclude_keywords=STATION_EXCLUDE_KEYWORDS):
+        self.multiplier = float(multiplier)
+        self.windows = tuple(tuple(w) for w in windows)
+        self.weekdays_only = bool(weekdays_only)
+        self.min_incidents = int(min_incidents)
+        self.exclude_keywords = tuple(exclude_keywords)
+
+    def params(self):
+        """所有參數 (快取 key / 報表用)"""
+        return {
+            "multiplier": self.multiplier,
+            "windows": [list(w) for w in self.windows],
+            "weekdays_only": self.weekdays_only,
+            "min_incidents": self.min_incidents,
+            "exclude_keywords": list(self.exclude_keywords),
+        }
+
+    def replace(self, **changes):
+        return ScoringConfig(**{**self.params(), **changes})
+
+    def label(self):
+        windows = ",".join(f"{s:02d}-{e:02d}" for s, e in self.windows)
+        return f"x{self.multiplier:g} {windows}{' weekdays' if self.weekdays_only else ''}"
+
+    def weights(self, days, hours):
+        """(星期 × 小時) 權重表"""
+        h = np.asarray(hours, dtype="float64")
+        peak = np.zeros(len(h), dtype=bool)
+        for start, end in self.windows:
+            peak |= (h >= start) & (h < end)
+        peak = np.broadcast_to(peak, (len(days), len(h)))
+        if self.weekdays_only:
+            peak = peak & ~np.isin(np.asarray(days, dtype=object), WEEKEND)[:, None]
+        return np.where(peak, self.multiplier, 1.0)
+
+
+DEFAULT_CONFIG = ScoringConfig()
+
+
+def entity_hour_table(engine, entity):
+    """
+    cube -> [實體 × 星期 × 小時] 的延遲分鐘與事故次數 (dense)
+    回傳 (entities, days, hours, delay, incidents)
+    """
+    delay, (entities, days, hours) = engine.cube.dense([entity, "DayOfWeek", "Hour"], "Total Delay")
+    incidents, _ = engine.cube.dense([entity, "DayOfWeek", "Hour"], "Incidents")
+    return entities, days, hours, delay, incidents
+
+
+def _eligible(entity, entities, incidents, config):
+    """每個實體是否列入評分 (只有車站套用門檻與排除關鍵字)"""
+    if entity != "Station":
+        return np.ones(len(entities), dtype=bool)
+    return (incidents >= config.min_incidents) & np.asarray(
+        valid_station_mask(pd.Series(entities), config.exclude_keywords), dtype=bool
+    )
+
+
+def sweep(engine, entity, configs):
+    """
+    一次評估多個設定
+    權重矩陣 W (設定數 × 星期·小時) 乘上延遲表 D (實體數 × 星期·小時) 的轉置 -> Penalty (設定數 × 實體數)；
+    不列入評分的實體分數為 NaN。回傳 (penalties, scores) 兩個 DataFrame，index 為設定、columns 為實體
+    """
+    configs = list(configs)
+    entities, days, hours, delay, incidents = entity_hour_table(engine, entity)
+    flat = delay.reshape(len(entities), -1).astype("float64")
+    weights = np.stack([c.weights(days, hours).ravel() for c in configs])
+    penalties = weights @ flat.T
+
+    counts = incidents.reshape(len(entities), -1).sum(axis=1)
+    eligible = np.stack([_eligible(entity, entities, counts, c) for c in configs])
+    masked = np.where(eligible, penalties, np.nan)
+    # 沒有任何實體列入評分的設定 (例如過濾後只剩一個車站) 整列為 NaN，不對全 NaN 取 max
+    none_eligible = ~eligible.any(axis=1, keepdims=True)
+    peak = np.nanmax(np.where(none_eligible, 0, masked), axis=1, keepdims=True)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        scores = np.where(peak > 0, 100 - masked / peak * 100, np.nan)
+
+    index = pd.Index([c.label() for c in configs], name="Config")
+    columns = pd.Index(entities, name=entity)
+    return pd.DataFrame(penalties, index=index, columns=columns), pd.DataFrame(scores, index=index, columns=columns)
+
+
+def _reliability(engine, entity, config):
+    stats = engine.aggregate([entity])[["Total Delay", "Incidents"]].reset_index()
+    stats.columns = [entity, "Total Delay", "Incident Count"]
+    penalties, scores = sweep(engine, entity, [config])
+    stats["Weighted Penalty"] = penalties.iloc[0].reindex(stats[entity]).to_numpy()
+    stats["Reliability Score"] = scores.iloc[0].reindex(stats[entity]).to_numpy()
+    stats["Avg Delay"] = stats["Total Delay"] / stats["Incident Count"]
+    return stats
+
+
+def reliability(engine, entity, config=DEFAULT_CONFIG):
+    """
+    單一設定的評分表：[entity, Total Delay, Incident Count, Weighted Penalty, Reliability Score, Avg Delay]
+    含所有實體 (不列入評分的 Reliability Score 為 NaN)；結果依設定快取在磁碟
+    """
+    return engine.memo(
+        "reliability", {"entity": entity, **config.params()},
+        lambda e: _reliability(e, entity, config),
+    )
+
+
+def scored(stats):
+    """只保留有分數 (列入評分) 的實體"""
+    return stats[stats["Reliability Score"].notna()].copy()
+
+
+# ---------- 敏感度分析 ----------
+
+SWEEP_MULTIPLIERS = (1.0, 1.25, 1.5, 2.0, 3.0)
+SWEEP_WINDOWS = {
+    "default": PEAK_WINDOWS,
+    "wide": ((6, 10), (15, 19)),
+    "pm only": ((16, 19),),
+}
+
+
+def sensitivity_configs(base=DEFAULT_CONFIG):
+    return [
+        base.replace(multiplier=m, windows=w, weekdays_only=weekdays)
+        for w in SWEEP_WINDOWS.values()
+        for weekdays in (False, True)
+        for m in SWEEP_MULTIPLIERS
+    ]
+
+
+def _worst(scores, n):
+    """每個設定分數最低的 n 個實體"""
+    return [list(row.dropna().nsmallest(n).index) for _, row in scores.iterrows()]
+
+
+def sensitivity_report(engine=None, n=10):
+    if engine is None:
+        from report_engine import ReportEngine
+        engine = ReportEngine()
+
+    configs = sensitivity_configs()
+    with open(output_file, "w", encoding="utf-8") as f:
+        sys.stdout = f
+        print("=" * 60)
+        print("  RELIABILITY SCORE SENSITIVITY (尖峰權重 / 時段敏感度)")
+        print("=" * 60)
+        print(f"基準設定: {DEFAULT_CONFIG.label()}")
+        print(f"比較 {len(configs)} 組設定；與基準最不可靠 Top {n} 的重疊數與排名相關 (Spearman)")
+
+        for entity in ("Line", "Station"):
+            _, scores = sweep(engine, entity, configs + [DEFAULT_CONFIG])
+            base_scores = scores.iloc[-1]
+            scores = scores.iloc[:-1]
+            k = min(n, int(base_scores.notna().sum()))
+            base_worst = set(base_scores.dropna().nsmallest(k).index)
+
+            print(f"\n[{entity}]")
+            print("-" * 60)
+            for (label, row), worst in zip(scores.iterrows(), _worst(scores, k)):
+                valid = row.notna() & base_scores.notna()
+                rho = row[valid].rank().corr(base_scores[valid].rank()) if valid.sum() > 1 else float("nan")
+                print(f"  {label:<32} 重疊 {len(base_worst & set(worst))}/{k}  rho={rho:.3f}  最差: {worst[0]}")
+
+    sys.stdout = sys.__stdout__
+    print(f"Sensitivity analysis saved to {output_file}")
+
+
+if __name__ == "__main__":
+    sensitivity_report()
@@ -0,0 +1,199 @@
+"""
+TTC 地鐵延遲數據 - 車站名稱標準化
+原始 Station 欄位有大小寫、"STATION" 字尾 (含截斷與拼錯)、路線後綴 (ST GEORGE BD / YUS)、
+舊名與縮寫 (VMC、NORTH YORK CTR) 等各種寫法。
+
+對每個「不重複」的原始名稱依序嘗試：
+    1. 別名表 (station_aliases.json)
+    2. 標準站名 (忽略標點，例如 ST GEORGE = ST. GEORGE)
+    3. 去掉路線後綴 (BD / YUS ...) 後再查 1、2
+    4. 模糊比對：與標準站名逐字 (token) 比對相似度
+都對不到的名稱 (區間、機廠、軌道位置等) 只去掉 STATION 字尾，保持原樣。
+解析結果快取在 station_name_cache.json，再以 categorical remap 廣播回每一列。
+"""
+
+import hashlib
+import json
+import os
+import re
+from difflib import SequenceMatcher
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from config import get_data_dir
+
+data_dir = get_data_dir()
+alias_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), "station_aliases.json")
+cache_file = os.path.join(data_dir, "station_name_cache.json")
+
+# 解析規則改變時 +1，讓 station_name_cache.json 的舊結果失效
+RESOLVER_VERSION = 2
+# 每個 token 的最低相似度 (SequenceMatcher ratio)
+FUZZY_THRESHOLD = 0.8
+# 含這些字樣的是區間或位置描述，不做模糊比對
+SEGMENT_MARKERS = (" TO ", " - ", "(", "/", " AND ", "TOWARD")
+
+
+def _tokens(name):
+    """大寫、去掉 . 與 '，再以非英數字元切開"""
+    return re.findall(r"[A-Z0-9]+", name.upper().replace("'", "").replace(".", ""))
+
+
+def _key(name):
+    return " ".join(_tokens(name))
+
+
+def _is_station_word(token):
+    """
+    STATION / STN / 截斷 (STATIO, STAT) / 拼錯 (STATON, STAITON)
+    模糊比對只接受長度差 1 以內的拼錯：SUBSTATION 等設施名稱不是 STATION 字尾
+    """
+    if token == "STN" or (len(token) >= 4 and "STATION".startswith(token)):
+        return True
+    if abs(len(token) - len("STATION")) > 1:
+        return False
+    return SequenceMatcher(None, token, "STATION").ratio() >= FUZZY_THRESHOLD
+
+
+def _token_similarity(a, b):
+    """token 數相同時逐一比對，回傳最低相似度 (長度 <= 2 的 token 必須完全相同)"""
+    if len(a) != len(b):
+        return 0.0
+    scores = []
+    for x, y in zip(a, b):
+        if min(len(x), len(y)) <= 2:
+            scores.append(1.0 if x == y else 0.0)
+        else:
+            scores.append(SequenceMatcher(None, x, y).ratio())
+    return min(scores)
+
+
+class StationNormalizer:
+    """
+    stations: 標準站名清單
+    aliases:  {別名: 標準站名}
+    line_suffixes: 轉乘站用來區分月台的路線後綴
+    """
+
+    def __init__(self, stations, aliases, line_suffixes=()):
+        self.stations = list(stations)
+        self.aliases = dict(aliases)
+        self.line_suffixes = set(line_suffixes)
+
+        self._exact = {_key(s): s for s in self.stations}
+        self._exact.update({_key(a): c for a, c in self.aliases.items()})
+        self._station_tokens = [(s, _tokens(s)) for s in self.stations]
+
+        table = json.dumps(
+            [RESOLVER_VERSION, self.stations, self.aliases, sorted(self.line_suffixes)], sort_keys=True
+        )
+        self.version = hashlib.sha256(table.encode("utf-8")).hexdigest()
+        self._resolved = {}
+        self._dirty = False
+
+    @classmethod
+    def load(cls, path=alias_file):
+        with open(path, "r", encoding="utf-8") as fh:
+            table = json.load(fh)
+        normalizer = cls(table["stations"], table["aliases"], table.get("line_suffixes", ()))
+        normalizer._load_cache()
+        return normalizer
+
+    # ---------- 快取 ----------
+
+    def _load_cache(self):
+        if not os.path.exists(cache_file):
+            return
+        try:
+            with open(cache_file, "r", encoding="utf-8") as fh:
+                cached = json.load(fh)
+        except (OSError, ValueError):
+            return
+        # 別名表或解析規則改變後舊的解析結果全部作廢
+        if cached.get("version") == self.version:
+            self._resolved.update(cached["names"])
+
+    def save_cache(self):
+        """有新解析的名稱時寫回快取檔"""
+        if not self._dirty or not os.path.isdir(os.path.dirname(cache_file)):
+            return
+        tmp = f"{cache_file}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump({"version": self.version, "names": self._resolved}, fh, indent=2, sort_keys=True)
+        os.replace(tmp, cache_file)
+        self._dirty = False
+
+    # ---------- 解析 ----------
+
+    def _lookup(self, tokens):
+        key = " ".join(tokens)
+        if key in self._exact:
+            return self._exact[key]
+        if len(tokens) > 1 and tokens[-1] in self.line_suffixes:
+            return self._exact.get(" ".join(tokens[:-1]))
+        return None
+
+    def _fuzzy(self, tokens):
+        scored = [(_token_similarity(tokens, t), s) for s, t in self._station_tokens]
+        scored = [(score, s) for score, s in scored if score >= FUZZY_THRESHOLD]
+        if not scored:
+            return None
+        top = max(score for score, _ in scored)
+        best = [s for score, s in scored if score == top]
+        # 同分 -> 不確定，不猜
+        return best[0] if len(best) == 1 else None
+
+    def _resolve(self, name):
+        tokens = _tokens(name)
+        if len(tokens) > 1 and _is_station_word(tokens[-1]):
+            tokens = tokens[:-1]
+        if not tokens:
+            return name
+
+        match = self._lookup(tokens)
+        if match is None and not any(m in f" {name} " for m in SEGMENT_MARKERS):
+            match = self._fuzzy(tokens)
+        if match is not None:
+            return match
+        # 非車站的位置描述：維持原本只去掉 " STATION" 字尾的行為
+        return re.sub(r"\s+STATION$", "", name)
+
+    def resolve(self, raw):
+        """單一原始名稱 -> 標準站名 (缺值回傳 None)"""
+        if raw is None or (isinstance(raw, float) and np.isnan(raw)):
+            return None
+        name = " ".join(str(raw).upper().split())
+        if name in ("", "NAN", "NONE"):
+            return None
+        if name not in self._resolved:
+            self._resolved[name] = self._resolve(name)
+            self._dirty = True
+        return self._resolved[name]
+
+    def normalize(self, stations):
+        """
+        整欄站名 -> 標準站名 (categorical)
+        只對不重複名稱呼叫 resolve，再以整數 code 對應回每一列
+        """
+        stations = pd.Series(stations)
+        codes, uniques = pd.factorize(stations)
+        canonical = pd.Series([self.resolve(u) for u in uniques], dtype=object)
+        new_codes, categories = pd.factorize(canonical)
+        remap = np.append(new_codes, -1)  # 原本的缺值 (-1) 仍為缺值
+        values = pd.Categorical.from_codes(remap[codes], categories=categories)
+        return pd.Series(values, index=stations.index, name=stations.name)
+
+
+@lru_cache(maxsize=None)
+def get_normalizer():
+    """共用的 StationNormalizer (每個 process 載入一次)"""
+    return StationNormalizer.load()
+
+
+def normalize_stations(stations):
+    normalizer = get_normalizer()
+    result = normalizer.normalize(stations)
+    normalizer.save_cache()
+    return result
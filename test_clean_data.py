@@ -0,0 +1,72 @@
+"""
+clean_data.py 的回歸測試：在暫存資料夾 (TTC_DATA_DIR) 中以子行程執行清洗
+    python -m pytest test_clean_data.py
+"""
+
+import os
+import shutil
+import subprocess
+import sys
+
+import pandas as pd
+import pytest
+
+from config import DATA_DIR_ENV, get_data_dir
+
+repo_dir = os.path.dirname(os.path.abspath(__file__))
+source_name = "TTC Subway Delay Data since 2025.csv"
+cleaned_name = "TTC_Subway_Delay_Data_Combined_Cleaned.csv"
+CODE_FILES = ["Code Descriptions.csv", "ttc-subway-delay-codes.xlsx"]
+
+
+def _source_rows():
+    for directory in (get_data_dir(), repo_dir):
+        path = os.path.join(directory, source_name)
+        if os.path.exists(path):
+            return path, pd.read_csv(path)
+    pytest.skip(f"{source_name} not available")
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    for name in CODE_FILES:
+        shutil.copy(os.path.join(repo_dir, name), tmp_path / name)
+    return tmp_path
+
+
+def run_clean(data_dir, *args):
+    proc = subprocess.run(
+        [sys.executable, os.path.join(repo_dir, "clean_data.py"), *args],
+        cwd=data_dir, env={**os.environ, DATA_DIR_ENV: str(data_dir), "TTC_TRACE": "0"},
+        capture_output=True, text=True,
+    )
+    assert proc.returncode == 0, proc.stdout[-2000:] + proc.stderr[-2000:]
+    return pd.read_csv(data_dir / cleaned_name)
+
+
+def test_incremental_append_of_zero_delay_rows(data_dir):
+    _, raw = _source_rows()
+    head = raw.iloc[:300]
+    tail = raw.iloc[300:][raw.iloc[300:]["Min Delay"] == 0].head(50)
+    source = data_dir / source_name
+    head.to_csv(source, index=False)
+    before = run_clean(data_dir, "--incremental")
+    assert len(before) > 0
+
+    # 只有 Min Delay = 0 的新列：清洗後全部被刪除，合併結果不變
+    tail.to_csv(source, mode="a", header=False, index=False)
+    after = run_clean(data_dir, "--incremental")
+    assert len(after) == len(before)
+    pd.testing.assert_frame_equal(after, run_clean(data_dir))
+
+
+def test_streaming_small_chunks_matches_batch(data_dir):
+    _, raw = _source_rows()
+    raw.iloc[:300].to_csv(data_dir / source_name, index=False)
+    run_clean(data_dir)
+    batch = (data_dir / cleaned_name).read_bytes()
+
+    # chunk 小到很多 chunk 沒有任何保留的列 (全為 Min Delay = 0)
+    run_clean(data_dir, "--streaming", "--chunk-size", "5")
+    assert (data_dir / cleaned_name).read_bytes() == batch
+    assert not os.path.exists(data_dir / (cleaned_name + ".tmp"))
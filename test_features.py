@@ -0,0 +1,28 @@
+"""
+features.py 的回歸測試
+    python -m pytest test_features.py
+"""
+
+import numpy as np
+import pandas as pd
+
+from features import extract_hour, extract_minutes, map_code_descriptions
+
+
+def test_time_parsing():
+    times = pd.Series(["07:45", "16:05", "7", None, "bad"])
+    np.testing.assert_array_equal(extract_hour(times), [7, 16, 7, np.nan, np.nan])
+    np.testing.assert_array_equal(extract_minutes(times), [465, 965, 420, np.nan, np.nan])
+
+
+def test_time_parsing_empty_and_all_missing():
+    for times in (pd.Series([], dtype=object), pd.Series([None, np.nan], dtype=object)):
+        for extract in (extract_hour, extract_minutes):
+            result = extract(times)
+            assert len(result) == len(times)
+            assert np.isnan(result).all()
+
+
+def test_code_descriptions_all_missing():
+    result = map_code_descriptions(pd.Series([None, np.nan], dtype=object), {"MUIS": "Injured"})
+    assert list(result) == ["Unknown Code", "Unknown Code"]
@@ -0,0 +1,24 @@
+"""
+station_names.py 的回歸測試
+    python -m pytest test_station_names.py
+"""
+
+from station_names import StationNormalizer, _is_station_word
+
+
+def _normalizer():
+    return StationNormalizer(["BAYVIEW", "ISLINGTON", "ST GEORGE"], {}, ["BD", "YUS"])
+
+
+def test_station_suffix_variants_are_stripped():
+    normalizer = _normalizer()
+    for raw in ("BAYVIEW STATION", "BAYVIEW STN", "BAYVIEW STATIO", "BAYVIEW STAITON", "bayview station"):
+        assert normalizer.resolve(raw) == "BAYVIEW"
+    assert normalizer.resolve("ST. GEORGE YUS STATION") == "ST GEORGE"
+
+
+def test_substation_is_not_a_station_suffix():
+    assert not _is_station_word("SUBSTATION")
+    normalizer = _normalizer()
+    assert normalizer.resolve("BAYVIEW SUBSTATION") == "BAYVIEW SUBSTATION"
+    assert normalizer.resolve("ISLINGTON SUBSTATION") == "ISLINGTON SUBSTATION"
@@ -0,0 +1,121 @@
+"""
+TTC 地鐵延遲數據 - 事故時間軸 (Level of Detail)
+時間 × 車站的散佈圖，依視窗內的事故數決定細節層級：
+    - 事故數 <= MAX_POINTS：畫個別事故 (明細只讀視窗內的列，日期 / 路線條件下推到 Parquet)
+    - 否則：從 cube 的 [日期 × 小時 × 車站 × 路線] 彙總分箱，每個 (時間箱, 車站, 路線) 一個點
+時間箱寬度依視窗長度自動選擇 (最多 MAX_BINS 個箱)，車站只列視窗內事故最多的 TOP_STATIONS 個，
+其餘併成一列 OTHER_STATIONS，所以不論資料量多大，輸出的點數都有上限。
+互動儀表板縮放時以新的視窗重新計算 (放大到事故數夠少時就換成個別事故)。
+"""
+
+import numpy as np
+import pandas as pd
+
+# 視窗內事故數不超過此值時畫個別事故，否則改畫分箱
+MAX_POINTS = 20_000
+# 分箱模式的時間箱數上限
+MAX_BINS = 300
+# 可用的箱寬 (由小到大)；cube 的時間粒度為小時
+BIN_WIDTHS = ["1h", "3h", "6h", "12h", "1D", "7D", "28D"]
+# y 軸的車站數 (視窗內事故最多的幾個)，其餘併成一列
+TOP_STATIONS = 40
+OTHER_STATIONS = "(other stations)"
+
+INCIDENT_COLUMNS = ["Timestamp", "Station", "Line", "Min Delay", "Code Description"]
+
+
+def data_window(engine):
+    """資料的完整時間範圍 [start, end)"""
+    days = pd.DatetimeIndex(engine.aggregate(["Date"]).index)
+    return days.min(), days.max() + pd.Timedelta(days=1)
+
+
+def bin_width(start, end, max_bins=MAX_BINS):
+    """箱數不超過 max_bins 的最小箱寬"""
+    span = end - start
+    for width in BIN_WIDTHS:
+        if span / pd.Timedelta(width) <= max_bins:
+            return width
+    return BIN_WIDTHS[-1]
+
+
+def _date_filter(start, end):
+    # 以日期 (含兩端) 過濾 cube / 明細，邊界當天再以時間戳精確裁切
+    return {"Date": slice(start.normalize(), (end - pd.Timedelta(1, "ns")).normalize())}
+
+
+def _hourly(engine, start, end):
+    """視窗內每個 (小時, 車站, 路線) 的事故數與延遲 (來自 cube)"""
+    cells = engine.aggregate(["Date", "Hour", "Station", "Line"], _date_filter(start, end))
+    cells = cells[["Incidents", "Total Delay"]].reset_index()
+    cells["Timestamp"] = pd.DatetimeIndex(cells["Date"]) + pd.to_timedelta(cells["Hour"].astype("int64"), unit="h")
+    return cells[(cells["Timestamp"] >= start) & (cells["Timestamp"] < end)]
+
+
+def _top_stations(hourly, top=TOP_STATIONS):
+    """視窗內事故最多的 top 個車站 (由多到少)"""
+    counts = hourly.groupby("Station", observed=True)["Incidents"].sum().sort_values(ascending=False, kind="stable")
+    return list(counts.index[:top]), len(counts) > top
+
+
+def _group_stations(stations, keep):
+    """不在 keep 中的車站改成 OTHER_STATIONS"""
+    stations = stations.astype(object)
+    return stations.where(stations.isin(keep), OTHER_STATIONS)
+
+
+def _bins(engine, start, end, width):
+    hourly = _hourly(engine, start, end)
+    keep, _ = _top_stations(hourly)
+    hourly = hourly.assign(
+        Bin=hourly["Timestamp"].dt.floor(width),
+        Station=_group_stations(hourly["Station"], keep),
+        Line=hourly["Line"].astype(object),
+    )
+    return hourly.groupby(["Bin", "Station", "Line"], sort=True)[["Incidents", "Total Delay"]].sum().reset_index()
+
+
+def incident_timeline(engine, window=None, max_points=MAX_POINTS):
+    """
+    時間軸資料 (dict)：
+        mode       "points" (個別事故) 或 "bins" (分箱)
+        window     (start, end) 實際的時間範圍
+        width      箱寬 (points 模式為 None)
+        incidents  視窗內的事故數
+        stations   y 軸車站順序 (事故多的在上)
+        data       points: Timestamp / Station / Line / Min Delay / Code Description
+                   bins:   Bin / Station / Line / Incidents / Total Delay
+    window 為 None 時是資料全期；engine 可為 ReportEngine 或 FilteredEngine
+    """
+    full_start, full_end = data_window(engine)
+    start, end = window or (full_start, full_end)
+    start, end = max(pd.Timestamp(start), full_start), min(pd.Timestamp(end), full_end)
+
+    hourly = _hourly(engine, start, end)
+    incidents = int(hourly["Incidents"].sum())
+    keep, has_other = _top_stations(hourly)
+    stations = keep + ([OTHER_STATIONS] if has_other else [])
+
+    if incidents <= max_points:
+        rows = engine.rows_query(_date_filter(start, end)).select(*INCIDENT_COLUMNS).rows()
+        rows = rows[(rows["Timestamp"] >= start) & (rows["Timestamp"] < end)].sort_values("Timestamp", kind="stable")
+        rows = rows.assign(Station=_group_stations(rows["Station"], keep), Line=rows["Line"].astype(object))
+        return {"mode": "points", "window": (start, end), "width": None, "incidents": incidents,
+                "stations": stations, "data": rows.reset_index(drop=True)}
+
+    width = bin_width(start, end)
+    data = engine.memo(
+        "timeline_bins", {"start": start, "end": end, "width": width, "top": TOP_STATIONS},
+        lambda e: _bins(e, start, end, width),
+    )
+    return {"mode": "bins", "window": (start, end), "width": width, "incidents": incidents,
+            "stations": stations, "data": data}
+
+
+def marker_sizes(values, smallest=4, largest=24):
+    """數值 -> 點的大小 (面積與數值成正比)"""
+    values = np.asarray(values, dtype="float64")
+    peak = values.max() if len(values) else 0
+    if peak <= 0:
+        return np.full(len(values), smallest, dtype="float64")
+    return smallest + (largest - smallest) * np.sqrt(values / peak)